@@ -0,0 +1,158 @@
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Try to import zstandard; zlib is always available as a fallback
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+# zlib only looks back 32 KiB, so a larger preset dictionary is wasted
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+DEFAULT_DICT_SIZE = 32 * 1024
+
+# Splits payloads into lines and JSON members for zlib dictionary training
+_FRAGMENT_RE = re.compile(r'[^\n,]+[\n,]?')
+
+# FEEDBACK_COMPRESSION setting -> codec it resolved to, so each setting is checked and warned about once
+_resolved_codecs: Dict[str, str] = {}
+
+def get_configured_codec() -> str:
+    """
+    Get the codec new feedback rows should be written with.
+    
+    Reads FEEDBACK_COMPRESSION ("none", "zlib" or "zstd"). Falls back to
+    zlib when zstd is requested but the zstandard package is missing. Each
+    setting is resolved once, so a misconfiguration is only warned about
+    once rather than on every save.
+    
+    Returns:
+        Codec name
+    """
+    setting = os.environ.get("FEEDBACK_COMPRESSION", CODEC_NONE)
+    if setting not in _resolved_codecs:
+        _resolved_codecs[setting] = _resolve_codec(setting)
+    return _resolved_codecs[setting]
+
+def _resolve_codec(setting: str) -> str:
+    """Map a FEEDBACK_COMPRESSION setting to an available codec, warning if it cannot be used."""
+    codec = setting.strip().lower() or CODEC_NONE
+    if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+        print("WARNING: zstandard package not available. Falling back to zlib feedback compression.")
+        return CODEC_ZLIB
+    if codec not in (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD):
+        print(f"WARNING: Unknown FEEDBACK_COMPRESSION '{codec}'. Storing feedback uncompressed.")
+        return CODEC_NONE
+    return codec
+
+def compress(text: str, codec: str, dictionary: Optional[bytes] = None) -> bytes:
+    """
+    Compress a string with the given codec.
+    
+    Args:
+        text: Text to compress
+        codec: "zlib" or "zstd"
+        dictionary: Optional shared dictionary trained with train_dictionary
+    
+    Returns:
+        Compressed bytes
+    """
+    data = text.encode("utf-8")
+    if codec == CODEC_ZLIB:
+        if dictionary:
+            compressor = zlib.compressobj(level=9, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(level=9)
+        return compressor.compress(data) + compressor.flush()
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard package is not installed")
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=10, dict_data=dict_data).compress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+def decompress(blob: bytes, codec: str, dictionary: Optional[bytes] = None) -> str:
+    """
+    Decompress bytes produced by compress.
+    
+    Args:
+        blob: Compressed bytes
+        codec: Codec the bytes were written with
+        dictionary: The dictionary used at compression time, if any
+    
+    Returns:
+        Original string
+    """
+    if codec == CODEC_ZLIB:
+        if dictionary:
+            decompressor = zlib.decompressobj(zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        data = decompressor.decompress(blob) + decompressor.flush()
+    elif codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard package is not installed")
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        data = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(blob)
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    return data.decode("utf-8")
+
+def train_dictionary(samples: List[str], codec: str, size: int = DEFAULT_DICT_SIZE) -> Optional[bytes]:
+    """
+    Build a shared compression dictionary from existing payloads.
+    
+    zstd uses its own trainer. For zlib the dictionary is the most common
+    fragments (lines, or comma-separated JSON members) across the samples,
+    least common first, since zlib favours matches closest to the end of
+    the preset dictionary.
+    
+    Args:
+        samples: Representative payloads (submitted code, feedback JSON)
+        codec: Codec the dictionary is for
+        size: Target dictionary size in bytes
+    
+    Returns:
+        Dictionary bytes, or None if there are too few samples to train on
+    """
+    if len(samples) < 8:
+        return None
+    
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard package is not installed")
+        try:
+            trained = zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples])
+            return trained.as_bytes()
+        except zstandard.ZstdError:
+            return None
+    
+    if codec == CODEC_ZLIB:
+        size = min(size, ZLIB_MAX_DICT_SIZE)
+        fragment_counts = Counter(
+            fragment for sample in samples for fragment in set(_FRAGMENT_RE.findall(sample))
+        )
+        chunks = []
+        total = 0
+        for fragment, count in fragment_counts.most_common():
+            if count < 2:
+                break
+            encoded = fragment.encode("utf-8")
+            if total + len(encoded) > size:
+                continue
+            chunks.append(encoded)
+            total += len(encoded)
+        if not chunks:
+            return None
+        return b"".join(reversed(chunks))
+    
+    raise ValueError(f"Unknown codec: {codec}")
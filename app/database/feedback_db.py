@@ -1,20 +1,55 @@
 import sqlite3
 import os
 import json
-from typing import List, Dict, Any
+import base64
+import re
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime
 
+from .compression import (
+    CODEC_NONE,
+    compress,
+    decompress,
+    get_configured_codec,
+    train_dictionary,
+)
+
 # Database file path
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database", "feedback.db")
 
 # Ensure database directory exists
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# Columns returned by summary-only history listings (no payload decompression)
+SUMMARY_COLUMNS = "id, exercise_id, timestamp, correctness, summary"
+
+# Maximum length of the stored plain-text feedback summary
+SUMMARY_LENGTH = 280
+
+# Path the schema was last initialized for, so init_db is cheap after the first call
+_initialized_path: Optional[str] = None
+
+# Search result pages a cursor can lead to; each page ranks every match
+MAX_SEARCH_PAGES = 50
+
+# Whether this SQLite build supports FTS5 full-text search (set by init_db)
+FTS_AVAILABLE = False
+
+# Cache of compression dictionaries keyed by (database path, dictionary id)
+_dictionary_cache: Dict[Tuple[str, int], bytes] = {}
+
 async def init_db():
     """Initialize the database with required tables."""
+    global _initialized_path
+    if _initialized_path == DB_PATH:
+        return
+    
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    # Takes effect only on a new, empty database; see maintenance._compact
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     # Create feedback table if it doesn't exist
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS feedback (
@@ -26,21 +61,260 @@ async def init_db():
     )
     ''')
     
+    # Shared dictionaries used by compressed rows
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS feedback_dictionaries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codec TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created TEXT NOT NULL
+    )
+    ''')
+    
+    # Monthly per-exercise counts of rows moved to the archive by maintenance
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS feedback_monthly (
+        month TEXT NOT NULL,
+        exercise_id TEXT NOT NULL,
+        submissions INTEGER NOT NULL DEFAULT 0,
+        correct INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, exercise_id)
+    )
+    ''')
+    
+    # Columns added after the original schema. A NULL codec means the code
+    # and feedback columns hold plain text; otherwise they hold compressed BLOBs.
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(feedback)')}
+    added = []
+    for column, column_type in (
+        ("codec", "TEXT"),
+        ("dict_id", "INTEGER"),
+        ("correctness", "TEXT"),
+        ("summary", "TEXT"),
+        ("model", "TEXT"),
+    ):
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE feedback ADD COLUMN {column} {column_type}')
+            added.append(column)
+    
+    # Backfill summaries for rows written before the summary columns existed
+    if "summary" in added:
+        rows = cursor.execute('SELECT id, feedback FROM feedback').fetchall()
+        for row_id, feedback_json in rows:
+            try:
+                feedback = json.loads(feedback_json)
+            except (TypeError, ValueError):
+                # One malformed historical row must not stop the app from starting
+                feedback = None
+            correctness, summary = _summarize(feedback)
+            cursor.execute(
+                'UPDATE feedback SET correctness = ?, summary = ? WHERE id = ?',
+                (correctness, summary, row_id)
+            )
+    
+    # Index backing keyset pagination of an exercise's history
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_feedback_exercise_timestamp
+    ON feedback (exercise_id, timestamp DESC, id DESC)
+    ''')
+    
+    # Index backing time-range exports across all exercises
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_feedback_timestamp
+    ON feedback (timestamp)
+    ''')
+    
+    _init_search_index(conn)
+    
     conn.commit()
     conn.close()
+    
+    _initialized_path = DB_PATH
+
+def _init_search_index(conn: sqlite3.Connection):
+    """
+    Create the FTS5 index over feedback text and backfill it on first creation.
+    
+    The index keeps its own plain-text copy of the feedback (the feedback
+    table may hold compressed payloads), keyed by rowid = feedback.id.
+    Inserts are indexed by save_feedback_to_db; deletes are mirrored by a trigger.
+    """
+    global FTS_AVAILABLE
+    
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'feedback_fts'"
+    ).fetchone() is not None
+    
+    try:
+        conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+            exercise_id UNINDEXED,
+            content,
+            tokenize = 'porter unicode61'
+        )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"WARNING: SQLite FTS5 not available, feedback search disabled: {str(e)}")
+        FTS_AVAILABLE = False
+        return
+    
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON feedback
+    BEGIN
+        DELETE FROM feedback_fts WHERE rowid = old.id;
+    END
+    ''')
+    FTS_AVAILABLE = True
+    
+    if exists:
+        return
+    
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute('SELECT * FROM feedback')
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            break
+        conn.executemany(
+            'INSERT INTO feedback_fts (rowid, exercise_id, content) VALUES (?, ?, ?)',
+            [(row['id'], row['exercise_id'], _backfill_text(conn, row)) for row in rows]
+        )
+
+def _backfill_text(conn: sqlite3.Connection, row: sqlite3.Row) -> str:
+    """Get the searchable text of an existing row; malformed JSON is indexed as it is."""
+    try:
+        return _feedback_text(_row_to_record(conn, row)['feedback'])
+    except ValueError:
+        # One malformed historical row must not stop the app from starting
+        return row['feedback'] if isinstance(row['feedback'], str) else ""
+
+def _feedback_text(feedback: Any) -> str:
+    """Collect every string in the AI feedback into one searchable document."""
+    if isinstance(feedback, str):
+        return feedback
+    if isinstance(feedback, dict):
+        return "\n".join(filter(None, (_feedback_text(value) for value in feedback.values())))
+    if isinstance(feedback, list):
+        return "\n".join(filter(None, (_feedback_text(value) for value in feedback)))
+    return ""
+
+def _summarize(feedback: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract the correctness verdict and a short summary from AI feedback.
+    
+    Handles both the model's {"correctness", "overall_feedback", ...} shape
+    and the {"correct", "feedback", "error"} fallback that openai_service
+    returns when the OpenAI client is unavailable.
+    
+    Args:
+        feedback: Parsed feedback from the AI
+    
+    Returns:
+        (correctness, summary) tuple; either may be None
+    """
+    if not isinstance(feedback, dict):
+        return None, None
+    
+    correctness = feedback.get("correctness")
+    if correctness is None and "correct" in feedback:
+        if feedback.get("error"):
+            correctness = "ERROR"
+        else:
+            correctness = "CORRECT" if feedback["correct"] else "INCORRECT"
+    summary = feedback.get("overall_feedback") or feedback.get("feedback") or feedback.get("error")
+    if isinstance(summary, str):
+        summary = summary[:SUMMARY_LENGTH]
+    else:
+        summary = None
+    
+    return (str(correctness) if correctness is not None else None), summary
+
+def _latest_dictionary(conn: sqlite3.Connection, codec: str) -> Tuple[Optional[int], Optional[bytes]]:
+    """Get the newest trained dictionary for a codec, if any."""
+    row = conn.execute(
+        'SELECT id, data FROM feedback_dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1',
+        (codec,)
+    ).fetchone()
+    if row is None:
+        return None, None
+    _dictionary_cache[(DB_PATH, row[0])] = row[1]
+    return row[0], row[1]
+
+def _get_dictionary(conn: sqlite3.Connection, dict_id: Optional[int]) -> Optional[bytes]:
+    """Get a dictionary by id, loading it into the cache on first use."""
+    if dict_id is None:
+        return None
+    key = (DB_PATH, dict_id)
+    if key not in _dictionary_cache:
+        row = conn.execute('SELECT data FROM feedback_dictionaries WHERE id = ?', (dict_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Compression dictionary {dict_id} is missing")
+        _dictionary_cache[key] = row[0]
+    return _dictionary_cache[key]
+
+def _encode_payload(
+    conn: sqlite3.Connection,
+    code: str,
+    feedback_json: str,
+    codec: str
+) -> Tuple[Any, Any, Optional[str], Optional[int]]:
+    """
+    Encode the code and feedback columns for storage.
+    
+    Returns:
+        (code, feedback, codec, dict_id) column values
+    """
+    if codec == CODEC_NONE:
+        return code, feedback_json, None, None
+    
+    dict_id, dictionary = _latest_dictionary(conn, codec)
+    return (
+        compress(code, codec, dictionary),
+        compress(feedback_json, codec, dictionary),
+        codec,
+        dict_id
+    )
+
+def _row_to_record(conn: sqlite3.Connection, row: sqlite3.Row) -> Dict[str, Any]:
+    """
+    Convert a feedback row to a record, decompressing and parsing the payload.
+    
+    Summary-only rows (no code/feedback columns) are returned as they are.
+    """
+    record = dict(row)
+    codec = record.pop('codec', None)
+    dict_id = record.pop('dict_id', None)
+    
+    if 'feedback' not in record:
+        return record
+    
+    if codec:
+        dictionary = _get_dictionary(conn, dict_id)
+        record['code'] = decompress(record['code'], codec, dictionary)
+        record['feedback'] = decompress(record['feedback'], codec, dictionary)
+    
+    record['feedback'] = json.loads(record['feedback'])
+    return record
 
 async def save_feedback_to_db(
     exercise_id: str,
     code: str,
-    feedback: Dict[str, Any]
+    feedback: Dict[str, Any],
+    model: Optional[str] = None
 ) -> int:
     """
     Save feedback to the database.
     
+    The code and feedback payloads are compressed when FEEDBACK_COMPRESSION
+    is set; the correctness verdict and summary are always stored as plain
+    text so history listings can skip the payload.
+    
     Args:
         exercise_id: Identifier for the exercise
         code: User's submitted code
         feedback: Feedback from the AI
+        model: Model that produced the feedback
     
     Returns:
         ID of the inserted record
@@ -53,19 +327,30 @@ async def save_feedback_to_db(
     
     timestamp = datetime.now().isoformat()
     feedback_json = json.dumps(feedback)
+    correctness, summary = _summarize(feedback)
+    stored_code, stored_feedback, codec, dict_id = _encode_payload(
+        conn, code, feedback_json, get_configured_codec()
+    )
     
     cursor.execute(
         '''
         INSERT INTO feedback
-        (exercise_id, code, feedback, timestamp)
-        VALUES (?, ?, ?, ?)
+        (exercise_id, code, feedback, timestamp, codec, dict_id, correctness, summary, model)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''',
-        (exercise_id, code, feedback_json, timestamp)
+        (exercise_id, stored_code, stored_feedback, timestamp, codec, dict_id, correctness, summary, model)
     )
     
     # Get the ID of the inserted record
     feedback_id = cursor.lastrowid
     
+    # Index the feedback text in the same transaction
+    if FTS_AVAILABLE:
+        cursor.execute(
+            'INSERT INTO feedback_fts (rowid, exercise_id, content) VALUES (?, ?, ?)',
+            (feedback_id, exercise_id, _feedback_text(feedback))
+        )
+    
     conn.commit()
     conn.close()
     
@@ -95,12 +380,454 @@ async def get_feedback_from_db(exercise_id: str) -> List[Dict[str, Any]]:
     rows = cursor.fetchall()
     
     # Convert rows to dictionaries and parse JSON feedback
-    result = []
-    for row in rows:
-        record = dict(row)
-        record['feedback'] = json.loads(record['feedback'])
-        result.append(record)
+    result = [_row_to_record(conn, row) for row in rows]
+    
+    conn.close()
+    
+    return result
+
+def encode_cursor(timestamp: str, feedback_id: int) -> str:
+    """
+    Encode a (timestamp, id) position as an opaque pagination cursor.
+    
+    Args:
+        timestamp: Timestamp of the last record on the page
+        feedback_id: ID of the last record on the page
+    
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps([timestamp, feedback_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor: Opaque cursor string
+    
+    Returns:
+        (timestamp, id) tuple
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, feedback_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(timestamp, str) or not isinstance(feedback_id, int):
+            raise ValueError
+        return timestamp, feedback_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+async def get_feedback_page(
+    exercise_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    summary_only: bool = False
+) -> Dict[str, Any]:
+    """
+    Get one page of feedback for an exercise, newest first.
+    
+    Uses keyset pagination on (timestamp, id), so each page costs the same
+    index range scan no matter how deep into the history it is.
+    
+    Args:
+        exercise_id: Identifier for the exercise
+        limit: Maximum number of records to return
+        cursor: Cursor returned with the previous page, or None for the first page
+        summary_only: Return only the plain-text summary columns, without
+            reading or decompressing the code and feedback payloads
+    
+    Returns:
+        Dictionary with the page "items" and the "next_cursor" (None on the last page)
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    
+    columns = SUMMARY_COLUMNS if summary_only else "*"
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        rows = conn.execute(
+            f'''
+            SELECT {columns} FROM feedback
+            WHERE exercise_id = ? AND (timestamp, id) < (?, ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            ''',
+            (exercise_id, timestamp, last_id, limit + 1)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            f'''
+            SELECT {columns} FROM feedback
+            WHERE exercise_id = ?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            ''',
+            (exercise_id, limit + 1)
+        ).fetchall()
+    
+    # The extra row only tells us whether another page exists
+    has_more = len(rows) > limit
+    items = [_row_to_record(conn, row) for row in rows[:limit]]
+    
+    conn.close()
+    
+    next_cursor = None
+    if has_more and items:
+        next_cursor = encode_cursor(items[-1]['timestamp'], items[-1]['id'])
+    
+    return {"items": items, "next_cursor": next_cursor}
+
+async def get_feedback_by_id(
+    feedback_id: int,
+    exercise_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Get a single feedback record by primary key.
+    
+    Args:
+        feedback_id: ID of the feedback record
+        exercise_id: If given, the record must also belong to this exercise
+    
+    Returns:
+        The feedback record, or None if not found
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    
+    if exercise_id is None:
+        row = conn.execute('SELECT * FROM feedback WHERE id = ?', (feedback_id,)).fetchone()
+    else:
+        row = conn.execute(
+            'SELECT * FROM feedback WHERE id = ? AND exercise_id = ?',
+            (feedback_id, exercise_id)
+        ).fetchone()
+    
+    record = _row_to_record(conn, row) if row is not None else None
+    
+    conn.close()
+    
+    return record
+
+def build_match_query(query: str) -> str:
+    """
+    Turn user search text into an FTS5 MATCH expression.
+    
+    Every whitespace-separated term (or "quoted phrase") becomes a quoted
+    phrase, so punctuation such as the hyphens in "off-by-one" is matched
+    literally instead of being parsed as FTS5 syntax. Terms are ANDed.
+    
+    Args:
+        query: Search text entered by the user
+    
+    Returns:
+        FTS5 query string
+    
+    Raises:
+        ValueError: If the query contains no searchable terms
+    """
+    phrases = []
+    for term in re.findall(r'"[^"]*"|\S+', query):
+        term = term.strip('"').strip()
+        if term:
+            phrases.append('"' + term.replace('"', '""') + '"')
+    if not phrases:
+        raise ValueError("Search query is empty")
+    return " ".join(phrases)
+
+def encode_search_cursor(score: float, feedback_id: int, snapshot: int, page: int) -> str:
+    """
+    Encode a search position as an opaque pagination cursor.
+    
+    Args:
+        score: bm25 score of the last result on the page
+        feedback_id: ID of the last result on the page
+        snapshot: Highest feedback ID when the first page was fetched
+        page: Number of the page the cursor leads to, counting from 1
+    
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps([score, feedback_id, snapshot, page]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int, int, int]:
+    """
+    Decode a cursor produced by encode_search_cursor.
+    
+    Args:
+        cursor: Opaque cursor string
+    
+    Returns:
+        (score, id, snapshot, page) tuple
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, feedback_id, snapshot, page = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            raise ValueError
+        if not all(isinstance(value, int) for value in (feedback_id, snapshot, page)):
+            raise ValueError
+        return float(score), feedback_id, snapshot, page
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+async def search_feedback(
+    query: str,
+    exercise_id: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Full-text search over feedback, best matches first.
+    
+    Uses keyset pagination on (bm25 score, id) rather than OFFSET. The
+    cursor also pins the highest feedback ID seen by the first page, and
+    later pages only search rows up to it, so feedback saved while paging
+    is not mixed into the results. bm25 depends on index-wide statistics,
+    which saves and deletes change, so each page rescores the previous
+    page's last row and continues after its current score rather than the
+    stored one. That keeps the boundary in place when scores shift
+    together; the cursor is only fully stable while the index is
+    unchanged, since changes can also reorder close matches. Ranking
+    scores every match, so each page costs about as much as the first;
+    paging stops after MAX_SEARCH_PAGES pages, by which point the query
+    should be refined.
+    
+    Args:
+        query: Search text, e.g. 'off-by-one' or '"mutable default"'
+        exercise_id: Only search feedback for this exercise
+        limit: Maximum number of results
+        cursor: Cursor returned with the previous page, or None for the first page
+    
+    Returns:
+        Dictionary with ranked "items" (summary columns plus a highlighted
+        "snippet" and bm25 "score") and the "next_cursor" (None on the last page)
+    
+    Raises:
+        ValueError: If the query or cursor is malformed
+        RuntimeError: If SQLite was built without FTS5
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    if not FTS_AVAILABLE:
+        raise RuntimeError("Full-text search is not available in this SQLite build")
+    
+    match = build_match_query(query)
+    params: List[Any] = [match]
+    filters = ""
+    if exercise_id is not None:
+        # feedback_fts.exercise_id is UNINDEXED; filter on the joined table instead
+        filters += " AND feedback.exercise_id = ?"
+        params.append(exercise_id)
+    page = 1
+    if cursor:
+        score, last_id, snapshot, page = decode_search_cursor(cursor)
+        if not 1 < page <= MAX_SEARCH_PAGES:
+            raise ValueError(f"Invalid cursor: {cursor}")
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    
+    if cursor:
+        # Rescore the previous page's last row under the current index
+        # statistics, so a shift that moves every score alike does not
+        # move the page boundary; the stored score covers a deleted row
+        anchor = conn.execute(
+            'SELECT bm25(feedback_fts) FROM feedback_fts WHERE feedback_fts MATCH ? AND rowid = ?',
+            (match, last_id)
+        ).fetchone()
+        if anchor is not None:
+            score = anchor[0]
+        filters += " AND (bm25(feedback_fts), feedback.id) > (?, ?)"
+        params.extend([score, last_id])
+    else:
+        snapshot = conn.execute('SELECT COALESCE(MAX(rowid), 0) FROM feedback_fts').fetchone()[0]
+    # A rowid range the FTS5 table applies itself, before ranking
+    filters += " AND feedback_fts.rowid <= ?"
+    params.extend([snapshot, limit + 1])
+    
+    rows = conn.execute(
+        f'''
+        SELECT feedback.id, feedback.exercise_id, feedback.timestamp,
+               feedback.correctness, feedback.summary,
+               snippet(feedback_fts, 1, '<mark>', '</mark>', '…', 16) AS snippet,
+               bm25(feedback_fts) AS score
+        FROM feedback_fts
+        JOIN feedback ON feedback.id = feedback_fts.rowid
+        WHERE feedback_fts MATCH ?{filters}
+        ORDER BY score, feedback.id
+        LIMIT ?
+        ''',
+        params
+    ).fetchall()
+    
+    conn.close()
+    
+    # The extra row only tells us whether another page exists
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and items and page < MAX_SEARCH_PAGES:
+        next_cursor = encode_search_cursor(items[-1]['score'], items[-1]['id'], snapshot, page + 1)
+    
+    return {"items": items, "next_cursor": next_cursor}
+
+def iter_feedback_records(
+    exercise_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    model: Optional[str] = None,
+    batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream decoded feedback records in timestamp order, batch by batch.
+    
+    A synchronous generator holding one open cursor, so memory use does not
+    grow with the number of rows. Call init_db before iterating. SQLite
+    connections are tied to their thread: advance and close the generator
+    on a single thread (see export_service.stream_in_thread).
+    
+    Args:
+        exercise_id: Only records for this exercise
+        since: Only records at or after this ISO timestamp
+        until: Only records before this ISO timestamp
+        model: Only records produced by this model
+        batch_size: Rows fetched from SQLite at a time
+    
+    Yields:
+        Feedback records with decompressed code and parsed feedback
+    """
+    conditions = []
+    params: List[Any] = []
+    for column, operator, value in (
+        ("exercise_id", "=", exercise_id),
+        ("timestamp", ">=", since),
+        ("timestamp", "<", until),
+        ("model", "=", model),
+    ):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    # A second connection decodes rows, so dictionary lookups never disturb the streaming cursor
+    lookup_conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.execute(f'SELECT * FROM feedback {where} ORDER BY timestamp, id', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_record(lookup_conn, row)
+    finally:
+        lookup_conn.close()
+        conn.close()
+
+async def compress_existing_feedback(
+    codec: Optional[str] = None,
+    sample_size: int = 1000,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """
+    Train a shared dictionary on existing rows and compress all plain-text rows.
+    
+    Rows already compressed are left untouched; they keep decoding with the
+    dictionary they were written with.
+    
+    Args:
+        codec: Codec to use, defaults to FEEDBACK_COMPRESSION
+        sample_size: Number of recent rows to train the dictionary on
+        batch_size: Number of rows rewritten per transaction
+    
+    Returns:
+        Statistics: rows compressed, payload bytes before and after, dictionary id
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    codec = codec or get_configured_codec()
+    if codec == CODEC_NONE:
+        return {"codec": codec, "rows": 0, "bytes_before": 0, "bytes_after": 0, "dict_id": None}
+    
+    conn = sqlite3.connect(DB_PATH)
+    
+    # Train on the most recent plain-text rows
+    samples = []
+    for code, feedback_json in conn.execute(
+        'SELECT code, feedback FROM feedback WHERE codec IS NULL ORDER BY id DESC LIMIT ?',
+        (sample_size,)
+    ):
+        samples.append(code)
+        samples.append(feedback_json)
+    
+    dict_id = None
+    dictionary = train_dictionary(samples, codec)
+    if dictionary:
+        cursor = conn.execute(
+            'INSERT INTO feedback_dictionaries (codec, data, created) VALUES (?, ?, ?)',
+            (codec, dictionary, datetime.now().isoformat())
+        )
+        dict_id = cursor.lastrowid
+        conn.commit()
+        _dictionary_cache[(DB_PATH, dict_id)] = dictionary
+    
+    rows = 0
+    bytes_before = 0
+    bytes_after = 0
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            '''
+            SELECT id, code, feedback FROM feedback
+            WHERE codec IS NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+            ''',
+            (last_id, batch_size)
+        ).fetchall()
+        if not batch:
+            break
+        
+        updates = []
+        for row_id, code, feedback_json in batch:
+            stored_code = compress(code, codec, dictionary)
+            stored_feedback = compress(feedback_json, codec, dictionary)
+            bytes_before += len(code.encode("utf-8")) + len(feedback_json.encode("utf-8"))
+            bytes_after += len(stored_code) + len(stored_feedback)
+            updates.append((stored_code, stored_feedback, codec, dict_id, row_id))
+        
+        conn.executemany(
+            'UPDATE feedback SET code = ?, feedback = ?, codec = ?, dict_id = ? WHERE id = ?',
+            updates
+        )
+        conn.commit()
+        
+        rows += len(batch)
+        last_id = batch[-1][0]
     
     conn.close()
     
-    return result 
\ No newline at end of file
+    return {
+        "codec": codec,
+        "rows": rows,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "dict_id": dict_id
+    }
@@ -0,0 +1,362 @@
+import sqlite3
+import os
+import json
+import gzip
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+
+from . import feedback_db, token_db
+
+# Directory holding the compressed archive files, one per month of each batch
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database", "archive")
+
+# Rows older than this many days are moved to the archive
+DEFAULT_RETENTION_DAYS = int(os.environ.get("DB_RETENTION_DAYS", "180"))
+
+# Rows archived and deleted per transaction, so request handlers are never locked out for long
+BATCH_SIZE = 1000
+
+# Only one maintenance run at a time
+_lock = threading.Lock()
+
+# Report of the most recent completed run
+_last_report: Optional[Dict[str, Any]] = None
+
+def is_running() -> bool:
+    """Check whether a maintenance run is in progress."""
+    return _lock.locked()
+
+def get_last_report() -> Optional[Dict[str, Any]]:
+    """Get the report of the most recent maintenance run, if any."""
+    return _last_report
+
+def _file_size(path: str) -> int:
+    """Get the on-disk size of a database, including its WAL file."""
+    size = 0
+    for candidate in (path, path + "-wal"):
+        if os.path.exists(candidate):
+            size += os.path.getsize(candidate)
+    return size
+
+def _stage_archive(kind: str, month: str, records: List[Dict[str, Any]]) -> str:
+    """
+    Write one batch's records for a month to a new archive file, as a pending file.
+    
+    Each batch gets its own {kind}-{month}.{first_id}.jsonl.gz file, so
+    archiving never rewrites earlier batches; concatenating a month's files
+    in id order (gzip readers accept the concatenation) gives one JSON-lines
+    stream. The first id in the name also lets _recover_staged tell whether
+    the rows were deleted. Nothing is visible until _publish_staged renames it.
+    
+    Returns:
+        Path of the pending file
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"{kind}-{month}.{records[0]['id']}.jsonl.gz")
+    pending = f"{path}.pending"
+    with gzip.open(pending, "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    with open(pending, "ab") as f:
+        os.fsync(f.fileno())
+    return pending
+
+def _published_path(pending: str) -> str:
+    """The archive file a pending file becomes."""
+    return pending[:-len(".pending")]
+
+def _publish_staged(staged: List[str]) -> None:
+    """Move pending archive files into place, once their rows are deleted."""
+    for pending in staged:
+        os.replace(pending, _published_path(pending))
+
+def _discard_staged(staged: List[str]) -> None:
+    """Remove pending archive files whose rows were not deleted."""
+    for pending in staged:
+        if os.path.exists(pending):
+            os.remove(pending)
+
+def _recover_staged(conn: sqlite3.Connection, kind: str, table: str) -> None:
+    """
+    Finish what a run that stopped midway left pending.
+    
+    A pending file whose first row is gone was committed, and is moved into
+    place; otherwise the rows are still in the table and it is removed.
+    """
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    for name in sorted(os.listdir(ARCHIVE_DIR)):
+        if not (name.startswith(f"{kind}-") and name.endswith(".pending")):
+            continue
+        pending = os.path.join(ARCHIVE_DIR, name)
+        first_id = int(name[:-len(".jsonl.gz.pending")].rsplit(".", 1)[1])
+        if conn.execute(f'SELECT 1 FROM {table} WHERE id = ?', (first_id,)).fetchone() is None:
+            _publish_staged([pending])
+        else:
+            _discard_staged([pending])
+
+def _stage_groups(kind: str, groups: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """Stage every month of a batch; on failure nothing is left pending."""
+    staged: List[str] = []
+    try:
+        for month, month_records in groups.items():
+            staged.append(_stage_archive(kind, month, month_records))
+    except BaseException:
+        _discard_staged(staged)
+        raise
+    return staged
+
+def _group_by_month(records: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group records by the YYYY-MM prefix of their timestamp."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(record["timestamp"][:7], []).append(record)
+    return groups
+
+def _archive_feedback(cutoff: str, batch_size: int) -> int:
+    """
+    Move feedback rows older than cutoff to the archive.
+    
+    Archived records are written decompressed, so archive files can be read
+    without the compression dictionaries. Each batch is staged to pending
+    files, deleted in one transaction, then published, so a failure at any
+    point never archives the same rows twice.
+    
+    Returns:
+        Number of rows archived
+    """
+    conn = sqlite3.connect(feedback_db.DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    archived = 0
+    
+    try:
+        _recover_staged(conn, "feedback", "feedback")
+        while True:
+            rows = conn.execute(
+                'SELECT * FROM feedback WHERE timestamp < ? ORDER BY id LIMIT ?',
+                (cutoff, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            
+            records = [feedback_db._row_to_record(conn, row) for row in rows]
+            groups = _group_by_month(records)
+            staged = _stage_groups("feedback", groups)
+            try:
+                with conn:
+                    for month, month_records in groups.items():
+                        counts: Dict[str, List[int]] = {}
+                        for record in month_records:
+                            entry = counts.setdefault(record["exercise_id"], [0, 0])
+                            entry[0] += 1
+                            entry[1] += 1 if record.get("correctness") == "CORRECT" else 0
+                        conn.executemany(
+                            '''
+                            INSERT INTO feedback_monthly (month, exercise_id, submissions, correct)
+                            VALUES (?, ?, ?, ?)
+                            ON CONFLICT (month, exercise_id) DO UPDATE SET
+                                submissions = submissions + excluded.submissions,
+                                correct = correct + excluded.correct
+                            ''',
+                            [(month, exercise_id, n, correct) for exercise_id, (n, correct) in counts.items()]
+                        )
+                    conn.executemany(
+                        'DELETE FROM feedback WHERE id = ?',
+                        [(record["id"],) for record in records]
+                    )
+            except BaseException:
+                _discard_staged(staged)
+                raise
+            _publish_staged(staged)
+            
+            archived += len(records)
+    finally:
+        conn.close()
+    
+    return archived
+
+def _archive_token_usage(cutoff: str, batch_size: int) -> int:
+    """
+    Move token usage rows older than cutoff to the archive.
+    
+    Their totals are folded into token_usage_monthly as monthly history;
+    the running totals in token_usage_totals already include them. Batches
+    are staged, deleted and published as in _archive_feedback.
+    
+    Returns:
+        Number of rows archived
+    """
+    conn = sqlite3.connect(token_db.DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    archived = 0
+    
+    try:
+        _recover_staged(conn, "token_usage", "token_usage")
+        while True:
+            rows = conn.execute(
+                'SELECT * FROM token_usage WHERE timestamp < ? ORDER BY id LIMIT ?',
+                (cutoff, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            
+            records = [dict(row) for row in rows]
+            groups = _group_by_month(records)
+            staged = _stage_groups("token_usage", groups)
+            try:
+                with conn:
+                    for month, month_records in groups.items():
+                        totals: Dict[str, List[int]] = {}
+                        for record in month_records:
+                            entry = totals.setdefault(record["model"], [0, 0, 0, 0, 0.0])
+                            entry[0] += record["prompt_tokens"]
+                            entry[1] += record["completion_tokens"]
+                            entry[2] += record["total_tokens"]
+                            entry[3] += 1
+                            entry[4] += record.get("cost_usd") or 0
+                        conn.executemany(
+                            '''
+                            INSERT INTO token_usage_monthly
+                            (month, model, prompt_tokens, completion_tokens, total_tokens, requests, cost_usd)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT (month, model) DO UPDATE SET
+                                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                                completion_tokens = completion_tokens + excluded.completion_tokens,
+                                total_tokens = total_tokens + excluded.total_tokens,
+                                requests = requests + excluded.requests,
+                                cost_usd = cost_usd + excluded.cost_usd
+                            ''',
+                            [(month, model, *values) for model, values in totals.items()]
+                        )
+                    conn.executemany(
+                        'DELETE FROM token_usage WHERE id = ?',
+                        [(record["id"],) for record in records]
+                    )
+            except BaseException:
+                _discard_staged(staged)
+                raise
+            _publish_staged(staged)
+            
+            archived += len(records)
+    finally:
+        conn.close()
+    
+    return archived
+
+def _compact(path: str, switch_mode: bool = False) -> bool:
+    """
+    Return free pages of a database to the filesystem.
+    
+    Databases created by init_db use incremental auto-vacuum, which frees
+    pages in short steps. Older databases need one full VACUUM to switch
+    modes, which rewrites the whole file under an exclusive lock that makes
+    request handlers fail with "database is locked"; it only runs when
+    switch_mode is set, and should be treated as an offline step.
+    
+    Returns:
+        True if free pages were reclaimed, False if the database is not in
+        incremental mode and switch_mode was not set
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            if not switch_mode:
+                return False
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        conn.execute('PRAGMA incremental_vacuum').fetchall()
+        return True
+    finally:
+        conn.close()
+
+def run_maintenance(
+    retention_days: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    switch_vacuum_mode: bool = False
+) -> Dict[str, Any]:
+    """
+    Archive old feedback and token usage rows, then compact both databases.
+    
+    Blocking; use run_maintenance_async from request handlers.
+    
+    Args:
+        retention_days: Keep rows newer than this many days (defaults to DB_RETENTION_DAYS)
+        batch_size: Rows archived per transaction
+        switch_vacuum_mode: Run the one-off full VACUUM that switches older
+            databases to incremental auto-vacuum. It locks the database for
+            the whole rewrite, so only ask for it while the app is idle.
+    
+    Returns:
+        Report with rows archived and bytes reclaimed per database
+    
+    Raises:
+        RuntimeError: If another maintenance run is in progress
+    """
+    global _last_report
+    
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError("Maintenance is already running")
+    
+    try:
+        if retention_days is None:
+            retention_days = DEFAULT_RETENTION_DAYS
+        started = datetime.now()
+        cutoff = (started - timedelta(days=retention_days)).isoformat()
+        
+        report: Dict[str, Any] = {
+            "started": started.isoformat(),
+            "retention_days": retention_days,
+            "cutoff": cutoff,
+            "databases": {}
+        }
+        
+        for name, path, archive in (
+            ("feedback", feedback_db.DB_PATH, _archive_feedback),
+            ("token_usage", token_db.DB_PATH, _archive_token_usage),
+        ):
+            bytes_before = _file_size(path)
+            rows_archived = archive(cutoff, batch_size)
+            compacted = _compact(path, switch_vacuum_mode)
+            bytes_after = _file_size(path)
+            report["databases"][name] = {
+                "rows_archived": rows_archived,
+                "compacted": compacted,
+                "bytes_before": bytes_before,
+                "bytes_after": bytes_after,
+                "bytes_reclaimed": max(bytes_before - bytes_after, 0)
+            }
+        
+        report["bytes_reclaimed"] = sum(db["bytes_reclaimed"] for db in report["databases"].values())
+        report["finished"] = datetime.now().isoformat()
+        _last_report = report
+        return report
+    finally:
+        _lock.release()
+
+async def run_maintenance_async(
+    retention_days: Optional[int] = None,
+    switch_vacuum_mode: bool = False
+) -> Dict[str, Any]:
+    """
+    Run maintenance in a worker thread so the event loop keeps serving requests.
+    """
+    # Make sure both schemas (including the rollup tables) exist first
+    await feedback_db.init_db()
+    await token_db.init_db()
+    return await asyncio.to_thread(run_maintenance, retention_days, BATCH_SIZE, switch_vacuum_mode)
+
+async def maintenance_loop(interval_hours: float) -> None:
+    """
+    Run maintenance every interval_hours until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            report = await run_maintenance_async()
+            print(f"Database maintenance reclaimed {report['bytes_reclaimed']} bytes")
+        except RuntimeError as e:
+            print(f"Skipping scheduled database maintenance: {str(e)}")
+        except Exception as e:
+            print(f"Error in database maintenance: {str(e)}")
@@ -1,7 +1,7 @@
 import sqlite3
 import os
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from datetime import datetime
 
 # Database file path
@@ -10,11 +10,35 @@ DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__)
 # Ensure database directory exists
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# Seed pricing versions: (model prefix, USD per 1K prompt tokens,
+# USD per 1K completion tokens, effective from). The longest matching
+# prefix wins, e.g. "gpt-4o-mini" over "gpt-4o" over "gpt-4".
+DEFAULT_PRICING = [
+    ("gpt-4", 0.03, 0.06, "2023-03-14"),
+    ("gpt-4-32k", 0.06, 0.12, "2023-03-14"),
+    ("gpt-4-turbo", 0.01, 0.03, "2023-11-06"),
+    ("gpt-4o", 0.005, 0.015, "2024-05-13"),
+    ("gpt-4o", 0.0025, 0.01, "2024-10-01"),
+    ("gpt-4o-mini", 0.00015, 0.0006, "2024-07-18"),
+    ("gpt-3.5-turbo", 0.0015, 0.002, "2023-06-13"),
+    ("gpt-3.5-turbo", 0.0005, 0.0015, "2024-01-25"),
+]
+
+# Path the schema was last initialized for, so init_db is cheap after the first call
+_initialized_path: Optional[str] = None
+
 async def init_db():
     """Initialize the database with required tables."""
+    global _initialized_path
+    if _initialized_path == DB_PATH:
+        return
+    
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    # Takes effect only on a new, empty database; see maintenance._compact
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     # Create token usage table if it doesn't exist
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS token_usage (
@@ -28,15 +52,209 @@ async def init_db():
     )
     ''')
     
+    # Versioned per-model prices
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS model_pricing (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_prefix TEXT NOT NULL,
+        prompt_per_1k REAL NOT NULL,
+        completion_per_1k REAL NOT NULL,
+        effective_from TEXT NOT NULL,
+        UNIQUE (model_prefix, effective_from)
+    )
+    ''')
+    cursor.executemany(
+        '''
+        INSERT OR IGNORE INTO model_pricing
+        (model_prefix, prompt_per_1k, completion_per_1k, effective_from)
+        VALUES (?, ?, ?, ?)
+        ''',
+        DEFAULT_PRICING
+    )
+    
+    # Columns added after the original schema
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(token_usage)')}
+    if "exercise_id" not in existing:
+        cursor.execute('ALTER TABLE token_usage ADD COLUMN exercise_id TEXT')
+    if "cost_usd" not in existing:
+        cursor.execute('ALTER TABLE token_usage ADD COLUMN cost_usd REAL')
+        rows = cursor.execute(
+            'SELECT id, model, timestamp, prompt_tokens, completion_tokens FROM token_usage'
+        ).fetchall()
+        for row_id, model, timestamp, prompt_tokens, completion_tokens in rows:
+            cursor.execute(
+                'UPDATE token_usage SET cost_usd = ? WHERE id = ?',
+                (_compute_cost(cursor, model, timestamp, prompt_tokens, completion_tokens), row_id)
+            )
+    
+    # Index backing time-range exports
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_token_usage_timestamp
+    ON token_usage (timestamp)
+    ''')
+    
+    # Monthly per-model totals of rows moved to the archive by maintenance
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS token_usage_monthly (
+        month TEXT NOT NULL,
+        model TEXT NOT NULL,
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        total_tokens INTEGER NOT NULL DEFAULT 0,
+        requests INTEGER NOT NULL DEFAULT 0,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, model)
+    )
+    ''')
+    monthly_columns = {row[1] for row in cursor.execute('PRAGMA table_info(token_usage_monthly)')}
+    if "cost_usd" not in monthly_columns:
+        cursor.execute('ALTER TABLE token_usage_monthly ADD COLUMN cost_usd REAL NOT NULL DEFAULT 0')
+        rows = cursor.execute(
+            'SELECT month, model, prompt_tokens, completion_tokens FROM token_usage_monthly'
+        ).fetchall()
+        for month, model, prompt_tokens, completion_tokens in rows:
+            cursor.execute(
+                'UPDATE token_usage_monthly SET cost_usd = ? WHERE month = ? AND model = ?',
+                (_compute_cost(cursor, model, f"{month}-01", prompt_tokens, completion_tokens) or 0, month, model)
+            )
+    
+    # Running per-model totals, updated on every insert and never archived
+    totals_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'token_usage_totals'"
+    ).fetchone() is not None
+    if not totals_exists:
+        cursor.execute('''
+        CREATE TABLE token_usage_totals (
+            model TEXT PRIMARY KEY,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            requests INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        INSERT INTO token_usage_totals
+        (model, prompt_tokens, completion_tokens, total_tokens, requests, cost_usd)
+        SELECT model, SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens),
+               SUM(requests), SUM(cost_usd)
+        FROM (
+            SELECT model, prompt_tokens, completion_tokens, total_tokens,
+                   1 AS requests, COALESCE(cost_usd, 0) AS cost_usd
+            FROM token_usage
+            UNION ALL
+            SELECT model, prompt_tokens, completion_tokens, total_tokens, requests, cost_usd
+            FROM token_usage_monthly
+        )
+        GROUP BY model
+        ''')
+    
     conn.commit()
     conn.close()
+    
+    _initialized_path = DB_PATH
+
+def _find_pricing(
+    cursor: sqlite3.Cursor,
+    model: str,
+    timestamp: str
+) -> Optional[Tuple[float, float]]:
+    """
+    Find the prices in effect for a model at a point in time.
+    
+    Uses the longest matching model prefix, and the newest version that is
+    effective at the timestamp (or the oldest version for earlier usage).
+    
+    Returns:
+        (prompt_per_1k, completion_per_1k), or None if the model is not priced
+    """
+    row = cursor.execute(
+        '''
+        SELECT prompt_per_1k, completion_per_1k FROM model_pricing
+        WHERE substr(?, 1, length(model_prefix)) = model_prefix
+        ORDER BY length(model_prefix) DESC,
+                 effective_from <= ? DESC,
+                 CASE WHEN effective_from <= ? THEN effective_from END DESC,
+                 effective_from ASC
+        LIMIT 1
+        ''',
+        (model, timestamp, timestamp)
+    ).fetchone()
+    return (row[0], row[1]) if row else None
+
+def _compute_cost(
+    cursor: sqlite3.Cursor,
+    model: str,
+    timestamp: str,
+    prompt_tokens: int,
+    completion_tokens: int
+) -> Optional[float]:
+    """Compute the USD cost of one usage record, or None if the model is not priced."""
+    pricing = _find_pricing(cursor, model, timestamp)
+    if pricing is None:
+        return None
+    prompt_per_1k, completion_per_1k = pricing
+    return (prompt_tokens / 1000) * prompt_per_1k + (completion_tokens / 1000) * completion_per_1k
+
+def _insert_usage(cursor: sqlite3.Cursor, record: Dict[str, Any], timestamp: str) -> int:
+    """
+    Insert one usage record with its cost and add it to the running totals.
+    
+    Must run inside the caller's transaction.
+    
+    Returns:
+        ID of the inserted record
+    """
+    cost = _compute_cost(
+        cursor, record["model"], timestamp, record["prompt_tokens"], record["completion_tokens"]
+    )
+    cursor.execute(
+        '''
+        INSERT INTO token_usage 
+        (prompt_tokens, completion_tokens, total_tokens, model, endpoint, timestamp, exercise_id, cost_usd)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+        (
+            record["prompt_tokens"],
+            record["completion_tokens"],
+            record["total_tokens"],
+            record["model"],
+            record.get("endpoint"),
+            timestamp,
+            record.get("exercise_id"),
+            cost
+        )
+    )
+    usage_id = cursor.lastrowid
+    cursor.execute(
+        '''
+        INSERT INTO token_usage_totals
+        (model, prompt_tokens, completion_tokens, total_tokens, requests, cost_usd)
+        VALUES (?, ?, ?, ?, 1, ?)
+        ON CONFLICT (model) DO UPDATE SET
+            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+            completion_tokens = completion_tokens + excluded.completion_tokens,
+            total_tokens = total_tokens + excluded.total_tokens,
+            requests = requests + 1,
+            cost_usd = cost_usd + excluded.cost_usd
+        ''',
+        (
+            record["model"],
+            record["prompt_tokens"],
+            record["completion_tokens"],
+            record["total_tokens"],
+            cost or 0
+        )
+    )
+    return usage_id
 
 async def save_token_usage(
     prompt_tokens: int,
     completion_tokens: int,
     total_tokens: int,
     model: str,
-    endpoint: str = None
+    endpoint: str = None,
+    exercise_id: Optional[str] = None
 ) -> int:
     """
     Save token usage to the database.
@@ -47,6 +265,7 @@ async def save_token_usage(
         total_tokens: Total tokens used
         model: OpenAI model used
         endpoint: API endpoint that was called
+        exercise_id: Exercise the call was made for, if any
     
     Returns:
         ID of the inserted record
@@ -59,23 +278,56 @@ async def save_token_usage(
     
     timestamp = datetime.now().isoformat()
     
-    cursor.execute(
-        '''
-        INSERT INTO token_usage 
-        (prompt_tokens, completion_tokens, total_tokens, model, endpoint, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''',
-        (prompt_tokens, completion_tokens, total_tokens, model, endpoint, timestamp)
+    # Insert the record, priced at today's rates, and update the running totals
+    usage_id = _insert_usage(
+        cursor,
+        {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "model": model,
+            "endpoint": endpoint,
+            "exercise_id": exercise_id
+        },
+        timestamp
     )
     
-    # Get the ID of the inserted record
-    usage_id = cursor.lastrowid
-    
     conn.commit()
     conn.close()
     
     return usage_id
 
+async def save_token_usage_batch(records: List[Dict[str, Any]]) -> List[int]:
+    """
+    Save many token usage records in a single transaction.
+    
+    Args:
+        records: Dictionaries with the save_token_usage arguments
+    
+    Returns:
+        IDs of the inserted records, in input order
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    timestamp = datetime.now().isoformat()
+    usage_ids = []
+    
+    try:
+        for record in records:
+            usage_ids.append(_insert_usage(cursor, record, timestamp))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return usage_ids
+
 async def get_token_usage() -> List[Dict[str, Any]]:
     """
     Get all token usage records from the database.
@@ -104,6 +356,9 @@ async def get_total_tokens() -> int:
     """
     Get the total number of tokens used across all records.
     
+    Reads the running per-model totals, so it includes archived rows and
+    does not scan the usage table.
+    
     Returns:
         Total token count
     """
@@ -113,9 +368,150 @@ async def get_total_tokens() -> int:
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute('SELECT SUM(total_tokens) FROM token_usage')
+    cursor.execute('SELECT SUM(total_tokens) FROM token_usage_totals')
     total = cursor.fetchone()[0] or 0
     
     conn.close()
     
-    return total 
\ No newline at end of file
+    return total
+
+async def get_model_totals() -> Dict[str, Dict[str, Any]]:
+    """
+    Get running token and cost totals per model, including archived rows.
+    
+    Returns:
+        Mapping of model name to its prompt, completion and total tokens,
+        request count and cost in USD
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    
+    rows = conn.execute('SELECT * FROM token_usage_totals ORDER BY model').fetchall()
+    totals = {row["model"]: {key: row[key] for key in row.keys() if key != "model"} for row in rows}
+    
+    conn.close()
+    
+    return totals
+
+async def get_pricing() -> List[Dict[str, Any]]:
+    """
+    Get all pricing versions, newest first within each model prefix.
+    
+    Returns:
+        List of pricing records
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    
+    rows = conn.execute(
+        'SELECT * FROM model_pricing ORDER BY model_prefix, effective_from DESC'
+    ).fetchall()
+    result = [dict(row) for row in rows]
+    
+    conn.close()
+    
+    return result
+
+async def add_pricing(
+    model_prefix: str,
+    prompt_per_1k: float,
+    completion_per_1k: float,
+    effective_from: str
+) -> int:
+    """
+    Add a new pricing version.
+    
+    Costs are fixed when usage is recorded, so a new version only affects
+    usage recorded after it is added.
+    
+    Args:
+        model_prefix: Model name prefix the prices apply to
+        prompt_per_1k: USD per 1K prompt tokens
+        completion_per_1k: USD per 1K completion tokens
+        effective_from: ISO date the prices take effect
+    
+    Returns:
+        ID of the pricing record
+    """
+    # Ensure database is initialized
+    await init_db()
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        '''
+        INSERT INTO model_pricing (model_prefix, prompt_per_1k, completion_per_1k, effective_from)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (model_prefix, effective_from) DO UPDATE SET
+            prompt_per_1k = excluded.prompt_per_1k,
+            completion_per_1k = excluded.completion_per_1k
+        ''',
+        (model_prefix, prompt_per_1k, completion_per_1k, effective_from)
+    )
+    pricing_id = cursor.execute(
+        'SELECT id FROM model_pricing WHERE model_prefix = ? AND effective_from = ?',
+        (model_prefix, effective_from)
+    ).fetchone()[0]
+    
+    conn.commit()
+    conn.close()
+    
+    return pricing_id
+
+def iter_token_usage(
+    exercise_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    model: Optional[str] = None,
+    batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream token usage records in timestamp order, batch by batch.
+    
+    A synchronous generator holding one open cursor, so memory use does not
+    grow with the number of rows. Call init_db before iterating. SQLite
+    connections are tied to their thread: advance and close the generator
+    on a single thread (see export_service.stream_in_thread).
+    
+    Args:
+        exercise_id: Only records for this exercise
+        since: Only records at or after this ISO timestamp
+        until: Only records before this ISO timestamp
+        model: Only records for this model
+        batch_size: Rows fetched from SQLite at a time
+    
+    Yields:
+        Token usage records
+    """
+    conditions = []
+    params: List[Any] = []
+    for column, operator, value in (
+        ("exercise_id", "=", exercise_id),
+        ("timestamp", ">=", since),
+        ("timestamp", "<", until),
+        ("model", "=", model),
+    ):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.execute(f'SELECT * FROM token_usage {where} ORDER BY timestamp, id', params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
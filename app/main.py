@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from dotenv import load_dotenv
 import os
+import asyncio
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,7 +13,8 @@ if not os.environ.get("OPENAI_API_KEY"):
     print("WARNING: OPENAI_API_KEY environment variable not set. AI-assisted features will not work.")
 
 # Import routes
-from app.routes import code_execution, exercises, notes, feedback, token_tracking
+from app.routes import code_execution, exercises, notes, feedback, token_tracking, maintenance, export
+from app.database.maintenance import maintenance_loop
 
 app = FastAPI(
     title="Python Learning Platform API",
@@ -35,6 +37,15 @@ app.include_router(exercises.router, prefix="/api", tags=["Exercises"])
 app.include_router(notes.router, prefix="/api", tags=["Notes"])
 app.include_router(feedback.router, prefix="/api", tags=["Feedback"])
 app.include_router(token_tracking.router, prefix="/api", tags=["Token Tracking"])
+app.include_router(maintenance.router, prefix="/api", tags=["Maintenance"])
+app.include_router(export.router, prefix="/api", tags=["Export"])
+
+@app.on_event("startup")
+async def schedule_maintenance():
+    """Start periodic database archiving and compaction (disable with MAINTENANCE_INTERVAL_HOURS=0)."""
+    interval_hours = float(os.environ.get("MAINTENANCE_INTERVAL_HOURS", "24"))
+    if interval_hours > 0:
+        app.state.maintenance_task = asyncio.create_task(maintenance_loop(interval_hours))
 
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -1,106 +1,482 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import subprocess
-import sys
-import tempfile
-import os
-import ast
-import re
-from typing import Optional, Dict, Any, Union
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+import asyncio
+from typing import Optional, Dict, Any, List
+
+from execution_engine import (
+    ExecutionRequest,
+    ExecutionResult,
+    Job,
+    MODE_RUN,
+    MODE_PROFILE,
+    MODE_MEMORY,
+    MODE_TRACE,
+    JobQueueFull,
+    STATUS_SUCCESS,
+    STATUS_TIMEOUT,
+    STATUS_CANCELLED,
+    Submission,
+    TestCase,
+    get_engine,
+    grade_batch,
+    get_job_queue,
+    metrics,
+)
+from ..services.export_service import stream_ndjson
 
 router = APIRouter()
 
+# Longest a single run may take, in seconds
+MAX_TIMEOUT = 60
+
+# Longest a single test case may take, in seconds
+MAX_CASE_TIMEOUT = 10
+
 class CodeExecution(BaseModel):
     code: str
-    timeout: Optional[int] = 5  # Default timeout of 5 seconds
-
-def is_expression(line: str) -> bool:
-    """Check if a line of code is just an expression (like a variable name)."""
-    line = line.strip()
-    if not line or line.startswith('#'):
-        return False
-        
-    try:
-        tree = ast.parse(line)
-        return (len(tree.body) == 1 and 
-                isinstance(tree.body[0], ast.Expr) and 
-                not isinstance(tree.body[0].value, ast.Call))
-    except SyntaxError:
-        return False
+    timeout: float = Field(5, gt=0, le=MAX_TIMEOUT)  # Seconds before the run is stopped
+    stdin: Optional[str] = None  # Input for programs that call input()
+    backend: Optional[str] = None  # Engine backend, e.g. "dry_run" for a syntax check
+    profile: Optional[bool] = False  # Return per-line hit counts and times
+    memory_profile: Optional[bool] = False  # Return peak memory, top allocating lines and objects by type
+    trace: Optional[bool] = False  # Return the lines run with their variables, for stepping through
+    max_trace_events: Optional[int] = None  # Trace events kept (the last ones); default 10,000
+
+class TestCaseInput(BaseModel):
+    name: Optional[str] = None
+    stdin: Optional[str] = None  # Input for programs that call input()
+    call: Optional[str] = None  # Function to call after the module has run
+    args: List[Any] = []
+    kwargs: Dict[str, Any] = {}
+    expected_output: Optional[str] = None
+    expected_return: Any = None  # Compared with the call's result when given
+    timeout: Optional[float] = Field(None, gt=0, le=MAX_CASE_TIMEOUT)  # Seconds for this case
+
+class TestExecution(BaseModel):
+    code: str
+    cases: List[TestCaseInput]
+    timeout: float = Field(2, gt=0, le=MAX_CASE_TIMEOUT)  # Default seconds per case
+    backend: Optional[str] = None
+
+class BatchSubmission(BaseModel):
+    student: str  # Shown with the student's result
+    code: str
+
+class BatchGrading(BaseModel):
+    submissions: List[BatchSubmission]
+    cases: List[TestCaseInput]
+    timeout: float = Field(2, gt=0, le=MAX_CASE_TIMEOUT)  # Default seconds per case
+    backend: Optional[str] = None
+
+class ComplexityAnalysis(BaseModel):
+    code: str
+    function: str  # Function to time
+    generator: str  # Expression in n giving the argument, or a tuple of arguments, e.g. "(list(range(n)), -1)"
+    budget: Optional[float] = 2  # Seconds to spend timing
+    backend: Optional[str] = None
+
+class CompareExecution(BaseModel):
+    code: str
+    reference: str  # The exercise's reference solution
+    stdin: Optional[str] = None  # Input given to both programs
+    budget: Optional[float] = 3  # Seconds to spend timing
+    backend: Optional[str] = None
+
+# Most test cases accepted in one request
+MAX_TEST_CASES = 200
+
+# Most submissions accepted in one batch grading request
+MAX_BATCH_SUBMISSIONS = 1000
+
+# Most test cases accepted in one batch grading request; every unique submission runs them all
+MAX_BATCH_CASES = 50
+
+# Most trace events a request may ask to keep
+MAX_TRACE_EVENTS = 100000
+
+# Longest timing budget accepted for a complexity analysis or comparison, in seconds
+MAX_COMPLEXITY_BUDGET = 10
+
+def format_result(result: ExecutionResult, timeout: float) -> Dict[str, Any]:
+    """Shape an engine result into this API's response format."""
+    response = _format_status(result, timeout)
+    for key in ("profile", "memory", "trace", "hang"):
+        if key in result.details:
+            response[key] = result.details[key]
+    return response
+
+def _format_status(result: ExecutionResult, timeout: float) -> Dict[str, Any]:
+    if result.status == STATUS_TIMEOUT:
+        error = f"Code execution timed out after {timeout} seconds"
+        stack = result.details.get("hang", {}).get("stack")
+        if stack:
+            error += f" while running line {stack[-1]['line']}: {stack[-1]['source']}"
+        return {"status": "error", "error": error, "usage": result.usage()}
+    
+    if result.status == STATUS_CANCELLED:
+        return {"status": "error", "error": "Code execution was cancelled", "usage": result.usage()}
+    
+    if result.status != STATUS_SUCCESS:
+        return {"status": "error", "error": result.stderr, "usage": result.usage()}
+    
+    if result.expression is not None:
+        return {
+            "status": "success", 
+            "output": result.stdout,
+            "jupyter_display": True,
+            "expression": result.expression,
+            "expression_value": result.expression_value,
+            "usage": result.usage()
+        }
+    
+    return {"status": "success", "output": result.stdout, "usage": result.usage()}
+
+def build_request(execution: CodeExecution) -> ExecutionRequest:
+    """
+    Build the engine request for a code execution body.
+    
+    Raises:
+        HTTPException: If more than one of profile, memory_profile and
+            trace is requested, or max_trace_events is out of range
+    """
+    if sum(bool(flag) for flag in (execution.profile, execution.memory_profile, execution.trace)) > 1:
+        raise HTTPException(status_code=400, detail="Choose one of profile, memory_profile and trace")
+    mode = MODE_RUN
+    options = {}
+    if execution.profile:
+        mode = MODE_PROFILE
+    elif execution.memory_profile:
+        mode = MODE_MEMORY
+    elif execution.trace:
+        mode = MODE_TRACE
+        if execution.max_trace_events is not None:
+            if not 0 < execution.max_trace_events <= MAX_TRACE_EVENTS:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"max_trace_events must be between 1 and {MAX_TRACE_EVENTS}"
+                )
+            options["max_events"] = execution.max_trace_events
+    return ExecutionRequest(
+        code=execution.code,
+        timeout=execution.timeout,
+        stdin=execution.stdin or "",
+        backend=execution.backend,
+        # The display code would show up in a profile as extra lines
+        display_last_expression=mode == MODE_RUN,
+        mode=mode,
+        options=options
+    )
+
+def build_cases(cases: List[TestCaseInput]) -> List[TestCase]:
+    """
+    Build the engine test cases for a request body.
+    
+    Raises:
+        HTTPException: If there are no cases or more than MAX_TEST_CASES
+    """
+    if not cases:
+        raise HTTPException(status_code=400, detail="At least one test case is required")
+    if len(cases) > MAX_TEST_CASES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TEST_CASES} test cases are allowed")
+    return [
+        TestCase(
+            name=case.name or f"case {index + 1}",
+            stdin=case.stdin or "",
+            call=case.call,
+            args=case.args,
+            kwargs=case.kwargs,
+            expected_output=case.expected_output,
+            expected_return=case.expected_return,
+            check_return="expected_return" in case.model_fields_set,
+            timeout=case.timeout
+        )
+        for index, case in enumerate(cases)
+    ]
+
+def format_job(job: Job) -> Dict[str, Any]:
+    """Shape a job into this API's response format."""
+    response = {
+        "job_id": job.id,
+        "status": job.status,
+        "created": job.created,
+        "started": job.started,
+        "finished": job.finished
+    }
+    if job.result is not None:
+        response["result"] = format_result(job.result, job.request.timeout)
+    elif job.error is not None:
+        response["result"] = {"status": "error", "error": job.error}
+    return response
 
 @router.post("/execute_code")
 async def execute_code(execution: CodeExecution):
     """
     Execute Python code and return the output or error.
     The code is executed in a sandboxed environment with restrictions.
+    
+    With "profile" set, the response includes per-line hit counts and
+    cumulative times under "profile", for rendering as gutter heat. With
+    "memory_profile" set, it includes peak memory, the lines holding the
+    most memory and the program's objects by type under "memory". With
+    "trace" set, it includes the lines run with their variables under
+    "trace": the last max_trace_events events, each listing only the
+    variables that changed since the previous event in the same call.
+    """
+    request = build_request(execution)
+    
+    try:
+        result = await asyncio.to_thread(get_engine().execute, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    
+    return format_result(result, execution.timeout)
+
+@router.get("/execute_code/metrics")
+async def get_execution_metrics():
+    """
+    Get execution counts and timings per backend for this process.
+    """
+    snapshot = metrics.snapshot()
+    snapshot["jobs"] = get_job_queue().stats()
+    cache = get_engine().cache
+    snapshot["cache"] = cache.stats() if cache is not None else None
+    return snapshot
+
+@router.post("/execute_tests")
+async def execute_tests(execution: TestExecution):
+    """
+    Run code against several test cases in one sandboxed interpreter.
+    
+    Each case runs with fresh module state, its own stdin and its own time
+    limit, and reports pass/fail, output and timing.
+    """
+    cases = build_cases(execution.cases)
+    
+    try:
+        result = await asyncio.to_thread(
+            get_engine().run_tests,
+            execution.code,
+            cases,
+            execution.timeout,
+            execution.backend
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    
+    if "tests" not in result.details:
+        # The code did not compile, or the whole run was stopped
+        return format_result(result, round(result.duration, 1))
+    
+    return {
+        "status": "success",
+        "passed": result.details["passed"],
+        "total": result.details["total"],
+        "cases": result.details["tests"],
+        "usage": result.usage()
+    }
+
+@router.post("/grade_batch")
+async def grade_submissions(grading: BatchGrading):
+    """
+    Grade a whole class's submissions for one exercise against its test cases.
+    
+    Submissions that differ only in comments or formatting are run once.
+    The rest run concurrently, one per CPU core. The response streams
+    newline-delimited JSON: one "result" record per student (passed, total,
+    score and per-case outcomes) as each finishes, then a "summary" record
+    with the throughput in submissions per second.
+    """
+    if not grading.submissions:
+        raise HTTPException(status_code=400, detail="At least one submission is required")
+    if len(grading.submissions) > MAX_BATCH_SUBMISSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SUBMISSIONS} submissions are allowed")
+    if len(grading.cases) > MAX_BATCH_CASES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_CASES} test cases are allowed when grading a batch")
+    cases = build_cases(grading.cases)
+    engine = get_engine()
+    backend = grading.backend or engine.default_backend
+    if backend not in engine.backends:
+        raise HTTPException(status_code=400, detail=f"Unknown execution backend: {backend}")
+    
+    records = grade_batch(
+        [Submission(submission.student, submission.code) for submission in grading.submissions],
+        cases,
+        grading.timeout,
+        backend,
+        engine=engine
+    )
+    # A plain iterator is run in a worker thread, so waiting on runs does not block the event loop
+    return StreamingResponse(stream_ndjson(records), media_type="application/x-ndjson")
+
+@router.post("/execute_complexity")
+async def execute_complexity(analysis: ComplexityAnalysis):
+    """
+    Estimate a function's time complexity empirically.
+    
+    The function is timed at geometrically growing input sizes within the
+    budget, and the timings are fitted against O(1), O(log n), O(n),
+    O(n log n) and O(n^2). Returns the best fit, every fit and the raw samples.
+    """
+    budget = analysis.budget or 2
+    if budget <= 0 or budget > MAX_COMPLEXITY_BUDGET:
+        raise HTTPException(status_code=400, detail=f"Budget must be between 0 and {MAX_COMPLEXITY_BUDGET} seconds")
+    
+    try:
+        result = await asyncio.to_thread(
+            get_engine().measure_complexity,
+            analysis.code,
+            analysis.function,
+            analysis.generator,
+            budget,
+            analysis.backend
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    
+    complexity = result.details.get("complexity")
+    if complexity is None:
+        # The code, function or generator could not be used
+        return format_result(result, round(result.duration, 1))
+    
+    response = {
+        "status": "success",
+        "function": complexity["function"],
+        "best_fit": complexity["best_fit"],
+        "fits": complexity["fits"],
+        "samples": complexity["samples"],
+        "stopped": complexity["stopped"],
+        "usage": result.usage()
+    }
+    for key in ("reason", "error", "error_size"):
+        if key in complexity:
+            response[key] = complexity[key]
+    return response
+
+def describe_comparison(comparison: Dict[str, Any]) -> str:
+    """One sentence a learner can read, e.g. "Your solution is 2.3x slower than the reference"."""
+    ratio = comparison["ratio"]
+    if comparison["rounds"] < 3:
+        return "Too few timing rounds fit in the budget for a reliable comparison"
+    if ratio is None or not comparison["significant"]:
+        return "Your solution and the reference run at about the same speed"
+    if ratio > 1:
+        return f"Your solution is {ratio:.1f}x slower than the reference"
+    return f"Your solution is {1 / ratio:.1f}x faster than the reference"
+
+@router.post("/execute_compare")
+async def execute_compare(execution: CompareExecution):
+    """
+    Time a solution against the exercise's reference solution.
+    
+    Both run in the same sandbox with identical timeit-style repetition,
+    interleaved and after warmup. Returns median and interquartile range
+    per program, the speed ratio and whether the difference exceeds the noise.
     """
-    tmp_name = None
-    jupyter_mode = False
-    last_expression = None
+    budget = execution.budget or 3
+    if budget <= 0 or budget > MAX_COMPLEXITY_BUDGET:
+        raise HTTPException(status_code=400, detail=f"Budget must be between 0 and {MAX_COMPLEXITY_BUDGET} seconds")
     
     try:
-        # Check if the last non-empty line is an expression (like a variable name)
-        code_lines = execution.code.strip().split('\n')
-        non_empty_lines = [line for line in code_lines if line.strip() and not line.strip().startswith('#')]
-        
-        if non_empty_lines:
-            last_line = non_empty_lines[-1]
-            if is_expression(last_line):
-                jupyter_mode = True
-                last_expression = last_line.strip()
-                # Add code to print the value of the expression
-                code_with_eval = execution.code + f"\n\nprint('\\n__EXPRESSION_RESULT__:')\nprint(repr({last_expression}))"
-            else:
-                code_with_eval = execution.code
-        else:
-            code_with_eval = execution.code
-        
-        # Create a temporary file to store the code
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as tmp:
-            tmp.write(code_with_eval.encode())
-            tmp_name = tmp.name
-        
-        # Execute the code using subprocess with a timeout
-        result = subprocess.run(
-            [sys.executable, tmp_name],
-            capture_output=True,
-            text=True,
-            timeout=execution.timeout
+        result = await asyncio.to_thread(
+            get_engine().compare,
+            execution.code,
+            execution.reference,
+            execution.stdin or "",
+            budget,
+            execution.backend
         )
-        
-        # Clean up the temporary file
-        os.unlink(tmp_name)
-        
-        # Return the output or error
-        if result.returncode == 0:
-            output = result.stdout
-            
-            # If in jupyter mode, extract the expression result
-            if jupyter_mode and "__EXPRESSION_RESULT__:" in output:
-                parts = output.split("__EXPRESSION_RESULT__:")
-                regular_output = parts[0].strip()
-                expr_value = parts[1].strip() if len(parts) > 1 else ""
-                
-                return {
-                    "status": "success", 
-                    "output": regular_output,
-                    "jupyter_display": True,
-                    "expression": last_expression,
-                    "expression_value": expr_value
-                }
-            else:
-                return {"status": "success", "output": output}
-        else:
-            return {"status": "error", "error": result.stderr}
-            
-    except subprocess.TimeoutExpired:
-        # Clean up the temporary file if timeout occurs
-        if tmp_name and os.path.exists(tmp_name):
-            os.unlink(tmp_name)
-        return {"status": "error", "error": f"Code execution timed out after {execution.timeout} seconds"}
-        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Clean up the temporary file if any other exception occurs
-        if tmp_name and os.path.exists(tmp_name):
-            os.unlink(tmp_name)
-        return {"status": "error", "error": str(e)} 
\ No newline at end of file
+        return {"status": "error", "error": str(e)}
+    
+    comparison = result.details.get("compare")
+    if comparison is None:
+        # A program did not compile, or the whole run was stopped
+        return format_result(result, round(result.duration, 1))
+    if "submission" not in comparison:
+        error = comparison.get("error") or f"Not enough time to measure within {budget} seconds"
+        return {"status": "error", "error": error, "failed": comparison.get("failed"), "usage": result.usage()}
+    
+    response = {
+        "status": "success",
+        "submission": comparison["submission"],
+        "reference": comparison["reference"],
+        "ratio": comparison["ratio"],
+        "significant": comparison["significant"],
+        "same_output": comparison["same_output"],
+        "rounds": comparison["rounds"],
+        "message": describe_comparison(comparison),
+        "usage": result.usage()
+    }
+    if "error" in comparison:
+        response["error"] = comparison["error"]
+    return response
+
+@router.post("/execute_jobs", status_code=202)
+async def submit_execution_job(execution: CodeExecution):
+    """
+    Queue code for execution and return a job id without waiting.
+    
+    Poll GET /execute_jobs/{job_id} or connect to the job's WebSocket for the result.
+    """
+    request = build_request(execution)
+    if request.backend is not None and request.backend not in get_engine().backends:
+        raise HTTPException(status_code=400, detail=f"Unknown execution backend: {request.backend}")
+    
+    try:
+        job = get_job_queue().submit(request)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return format_job(job)
+
+@router.get("/execute_jobs/{job_id}")
+async def get_execution_job(job_id: str):
+    """
+    Get a job's status, and its result once it has finished.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return format_job(job)
+
+@router.delete("/execute_jobs/{job_id}")
+async def cancel_execution_job(job_id: str):
+    """
+    Cancel a queued or running job.
+    """
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return format_job(job)
+
+@router.websocket("/execute_jobs/{job_id}/ws")
+async def watch_execution_job(websocket: WebSocket, job_id: str):
+    """
+    Send the job's state on every status change, then close once it is done.
+    """
+    await websocket.accept()
+    job_queue = get_job_queue()
+    last_status = None
+    try:
+        while True:
+            job = await asyncio.to_thread(job_queue.wait, job_id, 1.0)
+            if job is None:
+                await websocket.send_json({"job_id": job_id, "status": "not_found"})
+                break
+            if job.status != last_status:
+                last_status = job.status
+                await websocket.send_json(format_job(job))
+            if job.is_done:
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Iterator, Optional
+from datetime import datetime
+from ..database import feedback_db, token_db
+from ..services.export_service import (
+    EXPORT_FORMATS,
+    PYARROW_AVAILABLE,
+    stream_ndjson,
+    stream_csv,
+    stream_parquet,
+    stream_in_thread,
+)
+
+router = APIRouter()
+
+# Exported columns and their Parquet types
+FEEDBACK_EXPORT_SCHEMA = {
+    "id": "int",
+    "exercise_id": "string",
+    "timestamp": "string",
+    "model": "string",
+    "correctness": "string",
+    "summary": "string",
+    "code": "string",
+    "feedback": "string",
+}
+
+TOKEN_USAGE_EXPORT_SCHEMA = {
+    "id": "int",
+    "timestamp": "string",
+    "model": "string",
+    "endpoint": "string",
+    "exercise_id": "string",
+    "prompt_tokens": "int",
+    "completion_tokens": "int",
+    "total_tokens": "int",
+    "cost_usd": "float",
+}
+
+def _validate_timestamp(name: str, value: Optional[str]) -> Optional[str]:
+    """Check that a time-range filter is an ISO timestamp."""
+    if value is None:
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} timestamp: {value}")
+    return value
+
+def _export_response(
+    records: Iterator[Dict[str, Any]],
+    schema: Dict[str, str],
+    format: str,
+    filename: str
+) -> StreamingResponse:
+    """
+    Wrap a record iterator in a streaming response of the requested format.
+    
+    The records are read and encoded on one dedicated thread (see stream_in_thread).
+    """
+    if format == "ndjson":
+        body = stream_ndjson(records)
+    elif format == "csv":
+        body = stream_csv(records, list(schema))
+    else:
+        body = stream_parquet(records, schema)
+    
+    return StreamingResponse(
+        stream_in_thread(body),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
+
+def _check_format(format: str):
+    """Reject unknown formats, and Parquet when pyarrow is missing."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    if format == "parquet" and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Parquet export requires the pyarrow package")
+
+@router.get("/export/feedback")
+async def export_feedback(
+    format: str = Query("ndjson"),
+    exercise_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    model: Optional[str] = None
+):
+    """
+    Stream all matching feedback records as NDJSON, CSV or Parquet.
+    
+    Rows are read from a single database cursor and encoded as they are
+    read, so memory use stays flat regardless of the export size.
+    """
+    _check_format(format)
+    since = _validate_timestamp("since", since)
+    until = _validate_timestamp("until", until)
+    
+    await feedback_db.init_db()
+    records = feedback_db.iter_feedback_records(
+        exercise_id=exercise_id, since=since, until=until, model=model
+    )
+    return _export_response(records, FEEDBACK_EXPORT_SCHEMA, format, "feedback")
+
+@router.get("/export/token_usage")
+async def export_token_usage(
+    format: str = Query("ndjson"),
+    exercise_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    model: Optional[str] = None
+):
+    """
+    Stream all matching token usage records as NDJSON, CSV or Parquet.
+    """
+    _check_format(format)
+    since = _validate_timestamp("since", since)
+    until = _validate_timestamp("until", until)
+    
+    await token_db.init_db()
+    records = token_db.iter_token_usage(
+        exercise_id=exercise_id, since=since, until=until, model=model
+    )
+    return _export_response(records, TOKEN_USAGE_EXPORT_SCHEMA, format, "token_usage")
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 import os
 import json
 from datetime import datetime
 import sqlite3
-from ..services.openai_service import get_code_evaluation
-from ..database.feedback_db import save_feedback_to_db, get_feedback_from_db
+from ..services.openai_service import get_code_evaluation, EVALUATION_MODEL
+from ..database.feedback_db import save_feedback_to_db, get_feedback_page, get_feedback_by_id, search_feedback
 
 router = APIRouter()
 
@@ -36,7 +36,8 @@ async def mark_exercise(request: ExerciseFeedbackRequest):
         feedback_id = await save_feedback_to_db(
             exercise_id=request.exercise_id,
             code=request.code,
-            feedback=feedback
+            feedback=feedback,
+            model=EVALUATION_MODEL
         )
         
         return {
@@ -49,14 +50,58 @@ async def mark_exercise(request: ExerciseFeedbackRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/feedback/search")
+async def search_feedback_history(
+    q: str,
+    exercise_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Search all feedback text, ranked by relevance, with highlighted snippets.
+    
+    Declared before /feedback/{exercise_id} so "search" is not taken as an exercise ID.
+    """
+    try:
+        results = await search_feedback(q, exercise_id=exercise_id, limit=limit, cursor=cursor)
+        return {
+            "query": q,
+            "results": results["items"],
+            "has_more": results["next_cursor"] is not None,
+            "next_cursor": results["next_cursor"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/feedback/{exercise_id}")
-async def get_feedback(exercise_id: str):
+async def get_feedback(
+    exercise_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    summary_only: bool = False
+):
     """
-    Get all feedback history for a specific exercise.
+    Get feedback history for a specific exercise, newest first.
+    
+    Pass the returned next_cursor back as `cursor` to fetch the next page.
+    With summary_only, entries carry only the correctness verdict and a short
+    summary, and the stored code and feedback payloads are never decoded.
     """
     try:
-        feedback_history = await get_feedback_from_db(exercise_id)
-        return {"exercise_id": exercise_id, "feedback_history": feedback_history}
+        page = await get_feedback_page(
+            exercise_id, limit=limit, cursor=cursor, summary_only=summary_only
+        )
+        return {
+            "exercise_id": exercise_id,
+            "feedback_history": page["items"],
+            "next_cursor": page["next_cursor"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -66,10 +111,11 @@ async def get_specific_feedback(exercise_id: str, feedback_id: int):
     Get a specific feedback entry for an exercise.
     """
     try:
-        feedback_history = await get_feedback_from_db(exercise_id)
-        for feedback in feedback_history:
-            if feedback.get("id") == feedback_id:
-                return feedback
-        raise HTTPException(status_code=404, detail=f"Feedback with ID {feedback_id} not found")
+        feedback = await get_feedback_by_id(feedback_id, exercise_id=exercise_id)
+        if feedback is None:
+            raise HTTPException(status_code=404, detail=f"Feedback with ID {feedback_id} not found")
+        return feedback
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
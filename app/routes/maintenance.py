@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from typing import Optional
+from ..database.maintenance import run_maintenance_async, is_running, get_last_report
+
+router = APIRouter()
+
+async def _run_in_background(retention_days: Optional[int], switch_vacuum_mode: bool):
+    try:
+        await run_maintenance_async(retention_days, switch_vacuum_mode)
+    except Exception as e:
+        print(f"Error in database maintenance: {str(e)}")
+
+@router.post("/maintenance/run")
+async def run_database_maintenance(
+    background_tasks: BackgroundTasks,
+    retention_days: Optional[int] = Query(None, ge=1),
+    switch_vacuum_mode: bool = False
+):
+    """
+    Archive old feedback and token usage rows and compact the databases.
+    
+    The job runs in the background; poll /maintenance/status for the report.
+    Databases created before incremental auto-vacuum are only compacted when
+    switch_vacuum_mode is set: a one-off full VACUUM that locks each database
+    while it is rewritten, so run it while the app is idle.
+    """
+    if is_running():
+        raise HTTPException(status_code=409, detail="Maintenance is already running")
+    
+    background_tasks.add_task(_run_in_background, retention_days, switch_vacuum_mode)
+    return {"status": "scheduled"}
+
+@router.get("/maintenance/status")
+async def get_maintenance_status():
+    """
+    Get whether maintenance is running and the report of the last run.
+    """
+    return {"running": is_running(), "last_report": get_last_report()}
@@ -1,13 +1,152 @@
 from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+import asyncio
 import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from execution_engine import SessionClosed, get_session_manager
 
 router = APIRouter()
 
 # Directory where notebooks are stored
 NOTEBOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "notebooks")
 
+# Longest a single cell may run, in seconds
+MAX_CELL_TIMEOUT = 60
+
+class CellExecution(BaseModel):
+    code: str
+    timeout: Optional[float] = 5  # Default timeout of 5 seconds
+    stdin: Optional[str] = None  # Input for cells that call input()
+
+def format_cell(session_id: str, outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a cell outcome like an execute_code response."""
+    response: Dict[str, Any] = {
+        "session_id": session_id,
+        "execution_count": outcome.get("execution_count"),
+        "session_alive": outcome["session_alive"],
+        "usage": {
+            "duration": outcome.get("duration"),
+            "cpu_time": outcome.get("cpu_time"),
+            "memory_bytes": outcome.get("memory_bytes")
+        }
+    }
+    if outcome["status"] != "success":
+        response.update(status="error", error=outcome.get("error"), output=outcome.get("stdout", ""))
+        return response
+    
+    response.update(status="success", output=outcome["stdout"])
+    if outcome.get("stderr"):
+        response["stderr"] = outcome["stderr"]
+    if "expression_value" in outcome:
+        response["jupyter_display"] = True
+        response["expression_value"] = outcome["expression_value"]
+    return response
+
+def cell_timeout(cell: CellExecution) -> float:
+    """Validate a cell's timeout, defaulting to 5 seconds."""
+    timeout = cell.timeout or 5
+    if timeout <= 0 or timeout > MAX_CELL_TIMEOUT:
+        raise HTTPException(status_code=400, detail=f"Cell timeout must be between 0 and {MAX_CELL_TIMEOUT} seconds")
+    return timeout
+
+def format_cells(session_id: str, cell_id: str, outcomes) -> Dict[str, Any]:
+    """Shape the cells run after an edit: the edited cell (if run) and its dependents."""
+    return {
+        "session_id": session_id,
+        "cell_id": cell_id,
+        "results": [
+            dict(format_cell(session_id, outcome), cell_id=outcome["cell_id"])
+            for outcome in outcomes
+        ],
+        "session_alive": all(outcome["session_alive"] for outcome in outcomes)
+    }
+
+@router.post("/notes/sessions", status_code=201)
+async def create_session():
+    """
+    Start a persistent interpreter for running notebook cells one at a time.
+    
+    Variables defined by a cell stay available to later cells. Idle
+    sessions are closed after a while, and the least recently used session
+    is closed when too many are open.
+    """
+    try:
+        session = await asyncio.to_thread(get_session_manager().create)
+    except (RuntimeError, SessionClosed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return session.to_dict()
+
+@router.get("/notes/sessions")
+async def list_sessions():
+    """
+    List live sessions.
+    """
+    manager = get_session_manager()
+    return {
+        "sessions": [session.to_dict() for session in manager.sessions()],
+        "stats": manager.stats()
+    }
+
+@router.post("/notes/sessions/{session_id}/execute")
+async def execute_cell(session_id: str, cell: CellExecution):
+    """
+    Run a cell in a session, against the state left by earlier cells.
+    """
+    timeout = cell_timeout(cell)
+    outcome = await asyncio.to_thread(
+        get_session_manager().execute,
+        session_id,
+        cell.code,
+        cell.stdin or "",
+        timeout
+    )
+    if outcome is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return format_cell(session_id, outcome)
+
+@router.put("/notes/sessions/{session_id}/cells/{cell_id}")
+async def run_notebook_cell(session_id: str, cell_id: str, cell: CellExecution):
+    """
+    Add or edit a notebook cell and run it, then re-run only the later
+    cells that read names it defines (directly or through other re-run
+    cells). Cells are ordered by when they were first added.
+    """
+    timeout = cell_timeout(cell)
+    outcomes = await asyncio.to_thread(
+        get_session_manager().run_cell,
+        session_id,
+        cell_id,
+        cell.code,
+        cell.stdin or "",
+        timeout
+    )
+    if outcomes is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return format_cells(session_id, cell_id, outcomes)
+
+@router.delete("/notes/sessions/{session_id}/cells/{cell_id}")
+async def delete_notebook_cell(session_id: str, cell_id: str):
+    """
+    Remove a notebook cell, drop the names it defined and re-run the cells
+    that depended on them.
+    """
+    outcomes = await asyncio.to_thread(get_session_manager().delete_cell, session_id, cell_id)
+    if outcomes is None:
+        raise HTTPException(status_code=404, detail=f"Cell {cell_id} not found in session {session_id}")
+    return format_cells(session_id, cell_id, outcomes)
+
+@router.delete("/notes/sessions/{session_id}")
+async def close_session(session_id: str):
+    """
+    End a session and free its interpreter.
+    """
+    closed = await asyncio.to_thread(get_session_manager().close, session_id)
+    if not closed:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"session_id": session_id, "closed": True}
+
 @router.get("/notes/{notebook_name}")
 async def get_notes(notebook_name: str):
     """
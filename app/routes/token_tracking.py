@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
-from ..database.token_db import save_token_usage, get_token_usage, get_total_tokens
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Any, Optional, List
+from datetime import date
+from ..database.token_db import save_token_usage, save_token_usage_batch, get_token_usage, get_total_tokens, get_model_totals, get_pricing, add_pricing
 
 router = APIRouter()
 
@@ -11,6 +12,19 @@ class TokenUsage(BaseModel):
     total_tokens: int
     model: str
     endpoint: Optional[str] = None
+    exercise_id: Optional[str] = None
+
+class ModelPricing(BaseModel):
+    # Allow the model_prefix field name, which pydantic reserves by default
+    model_config = {"protected_namespaces": ()}
+    
+    model_prefix: str
+    prompt_per_1k: float
+    completion_per_1k: float
+    effective_from: date
+
+# Maximum number of records accepted by one batch request
+MAX_BATCH_SIZE = 1000
 
 @router.post("/track_tokens")
 async def track_tokens(token_usage: TokenUsage):
@@ -24,12 +38,54 @@ async def track_tokens(token_usage: TokenUsage):
             completion_tokens=token_usage.completion_tokens,
             total_tokens=token_usage.total_tokens,
             model=token_usage.model,
-            endpoint=token_usage.endpoint
+            endpoint=token_usage.endpoint,
+            exercise_id=token_usage.exercise_id
         )
         return {"id": usage_id, "message": "Token usage recorded successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/track_tokens/batch")
+async def track_tokens_batch(records: List[Any]):
+    """
+    Record many token usage entries in one request.
+    
+    Each record is validated on its own; valid records are inserted in a
+    single transaction. Results are returned in input order, each with
+    either the new "id" or the validation "error".
+    """
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} records")
+    
+    results: List[Dict[str, Any]] = []
+    valid = []
+    for index, record in enumerate(records):
+        try:
+            usage = TokenUsage.model_validate(record)
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error['loc'] else error['msg']
+                for error in e.errors()
+            )
+            results.append({"index": index, "error": errors})
+            continue
+        results.append({"index": index})
+        valid.append((len(results) - 1, usage.model_dump()))
+    
+    try:
+        usage_ids = await save_token_usage_batch([record for _, record in valid])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    for (position, _), usage_id in zip(valid, usage_ids):
+        results[position]["id"] = usage_id
+    
+    return {
+        "inserted": len(usage_ids),
+        "failed": len(records) - len(usage_ids),
+        "results": results
+    }
+
 @router.get("/token_usage")
 async def get_token_usage_stats():
     """
@@ -51,35 +107,50 @@ async def get_token_usage_stats():
 async def get_token_usage_summary():
     """
     Get a summary of token usage statistics.
+    
+    Costs are computed when usage is recorded, using the prices in effect
+    at that time, and read from running per-model totals.
     """
     try:
-        # Get token usage from database
-        usage_data = await get_token_usage()
-        total = await get_total_tokens()
+        # Get per-model running totals (including archived usage) from database
+        model_totals = await get_model_totals()
+        
+        model_usage = {model: totals["total_tokens"] for model, totals in model_totals.items()}
+        model_costs = {model: round(totals["cost_usd"], 4) for model, totals in model_totals.items()}
+        cost_total = sum(totals["cost_usd"] for totals in model_totals.values())
         
-        # Calculate summary statistics
-        model_usage = {}
-        for entry in usage_data:
-            model = entry.get("model", "unknown")
-            if model not in model_usage:
-                model_usage[model] = 0
-            model_usage[model] += entry.get("total_tokens", 0)
-            
-        # Calculate rough cost estimate (approximate, not exact)
-        # Pricing as of 2023 - this would need updates as OpenAI changes pricing
-        cost_estimate = 0
-        for model, tokens in model_usage.items():
-            if "gpt-4" in model:
-                # Approx $0.03 per 1K tokens for GPT-4
-                cost_estimate += (tokens / 1000) * 0.03
-            elif "gpt-3.5" in model:
-                # Approx $0.002 per 1K tokens for GPT-3.5
-                cost_estimate += (tokens / 1000) * 0.002
-                
         return {
-            "total_tokens": total,
+            "total_tokens": sum(model_usage.values()),
             "model_breakdown": model_usage,
-            "estimated_cost_usd": round(cost_estimate, 4)
+            "cost_breakdown_usd": model_costs,
+            "estimated_cost_usd": round(cost_total, 4)
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/token_usage/pricing")
+async def get_token_pricing():
+    """
+    Get all model pricing versions.
+    """
+    try:
+        return {"pricing": await get_pricing()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/token_usage/pricing")
+async def add_token_pricing(pricing: ModelPricing):
+    """
+    Add a pricing version. It applies to usage recorded from now on;
+    already-recorded costs are not changed.
+    """
+    try:
+        pricing_id = await add_pricing(
+            model_prefix=pricing.model_prefix,
+            prompt_per_1k=pricing.prompt_per_1k,
+            completion_per_1k=pricing.completion_per_1k,
+            effective_from=pricing.effective_from.isoformat()
+        )
+        return {"id": pricing_id, "message": "Pricing recorded successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,156 @@
+import io
+import csv
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional
+
+# Try to import pyarrow; Parquet export is only offered when it is installed
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# CSV output is flushed to the client once this many bytes are buffered
+CSV_CHUNK_SIZE = 64 * 1024
+
+# Rows per Parquet row group; each row group is flushed to the client as it fills
+PARQUET_ROW_GROUP_SIZE = 5000
+
+# Encoded bytes gathered on the export thread before they are handed to the client
+THREAD_BATCH_SIZE = 64 * 1024
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize nested values (such as parsed feedback) as JSON strings for tabular formats."""
+    return {
+        key: json.dumps(value) if isinstance(value, (dict, list)) else value
+        for key, value in record.items()
+    }
+
+def stream_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Encode records as newline-delimited JSON, one line per record.
+    """
+    for record in records:
+        yield (json.dumps(record) + "\n").encode("utf-8")
+
+def stream_csv(records: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[bytes]:
+    """
+    Encode records as CSV with a header row, flushed in CSV_CHUNK_SIZE chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(_flatten(record))
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the caller in chunks."""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_parquet(records: Iterable[Dict[str, Any]], schema: Dict[str, str]) -> Iterator[bytes]:
+    """
+    Encode records as Parquet, flushing one row group at a time.
+    
+    Args:
+        records: Records to encode
+        schema: Column name to type ("int", "float" or "string")
+    
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    
+    types = {"int": pa.int64(), "float": pa.float64(), "string": pa.string()}
+    arrow_schema = pa.schema([(name, types[kind]) for name, kind in schema.items()])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, arrow_schema)
+    
+    batch: List[Dict[str, Any]] = []
+    try:
+        for record in records:
+            batch.append(_flatten(record))
+            if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=arrow_schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=arrow_schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _next_batch(chunks: Iterator[bytes]) -> Optional[bytes]:
+    """Gather chunks up to THREAD_BATCH_SIZE bytes; None once the iterator is exhausted."""
+    batch: List[bytes] = []
+    size = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk)
+        if size >= THREAD_BATCH_SIZE:
+            break
+    else:
+        if not batch:
+            return None
+    return b"".join(batch)
+
+async def stream_in_thread(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Advance a blocking chunk iterator on one dedicated thread.
+    
+    StreamingResponse would advance a plain iterator on whichever worker
+    thread is free, but the SQLite connections behind the record iterators
+    can only be used on the thread that opened them. Here every step, and
+    the final close, runs on the same thread.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, _next_batch, chunks)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            # Also when the client disconnects: release the cursor on its own thread
+            await asyncio.shield(loop.run_in_executor(executor, close))
+        executor.shutdown(wait=False)
@@ -15,6 +15,9 @@ except ImportError:
 
 from ..database.token_db import save_token_usage
 
+# Model used for code evaluation
+EVALUATION_MODEL = "gpt-4"
+
 async def get_code_evaluation(
     code: str,
     exercise_id: str,
@@ -83,7 +86,7 @@ async def get_code_evaluation(
         
         # Call OpenAI API
         response = await client.chat.completions.create(
-            model="gpt-4",  # Using GPT-4 for best evaluation quality
+            model=EVALUATION_MODEL,  # Using GPT-4 for best evaluation quality
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -101,8 +104,9 @@ async def get_code_evaluation(
             prompt_tokens=response.usage.prompt_tokens,
             completion_tokens=response.usage.completion_tokens,
             total_tokens=response.usage.total_tokens,
-            model="gpt-4",
-            endpoint="mark_exercise"
+            model=EVALUATION_MODEL,
+            endpoint="mark_exercise",
+            exercise_id=exercise_id
         )
         
         return feedback
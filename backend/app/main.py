@@ -2,7 +2,9 @@
 Main application file for the Python Learning Platform backend.
 """
 import os
+import sys
 import time
+import asyncio
 import traceback
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,8 +14,12 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Make the shared execution_engine package at the repository root importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 # Import routers
 from app.routes import health, exercises, chapters, token_tracking, execute
+from app.utils.token_store import store as token_store
 
 # Create FastAPI app
 app = FastAPI(
@@ -31,6 +37,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def flush_token_counters():
+    """Periodically write this worker's pending token counts to the shared store."""
+    while True:
+        await asyncio.sleep(token_store.flush_interval)
+        try:
+            await asyncio.to_thread(token_store.flush)
+        except Exception as e:
+            print(f"ERROR flushing token counters: {str(e)}")
+
+@app.on_event("startup")
+async def start_token_flusher():
+    """Start the background token counter flusher."""
+    app.state.token_flusher = asyncio.create_task(flush_token_counters())
+
+@app.on_event("shutdown")
+async def stop_token_flusher():
+    """Write any pending token counts before the worker exits."""
+    app.state.token_flusher.cancel()
+    await asyncio.to_thread(token_store.flush)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -82,6 +108,15 @@ async def tokens_update_redirect(request: Request):
     from app.routes.token_tracking import update_token_usage
     return await update_token_usage(request, data)
 
+@app.post("/api/tokens/batch")
+async def tokens_batch_redirect(request: Request):
+    """Redirect batched token updates to token_tracking router."""
+    records = await request.json()
+    if not isinstance(records, list):
+        return JSONResponse(status_code=422, content={"detail": "Expected a JSON array of usage records"})
+    from app.routes.token_tracking import update_token_usage_batch
+    return await update_token_usage_batch(request, records)
+
 # Import monitoring endpoints
 try:
     from monitor import monitor
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import subprocess
-import tempfile
-import os
-import uuid
+from pydantic import BaseModel, Field
+import asyncio
 import logging
+from typing import Optional
+
+from execution_engine import ExecutionRequest, STATUS_SUCCESS, STATUS_TIMEOUT, get_engine, metrics
 
 router = APIRouter()
 
@@ -12,55 +12,53 @@ router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Longest a single run may take, in seconds
+MAX_TIMEOUT = 60
+
 class CodeExecution(BaseModel):
     code: str
+    timeout: float = Field(5, gt=0, le=MAX_TIMEOUT)  # Seconds before the run is stopped
+    stdin: Optional[str] = None  # Input for programs that call input()
 
 @router.post("/execute-code")
 async def execute_code(code_execution: CodeExecution):
     """
     Execute Python code and return the output.
     
-    This endpoint creates a temporary file with the provided code,
-    executes it in a subprocess with a timeout, and returns the output.
+    The code is run by the shared execution engine with a timeout.
     """
+    request = ExecutionRequest(
+        code=code_execution.code,
+        timeout=code_execution.timeout,
+        stdin=code_execution.stdin or ""
+    )
+    
     try:
-        # Generate a unique filename to avoid collisions
-        file_id = str(uuid.uuid4())
-        
-        # Create a temporary file with the code
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code_execution.code.encode('utf-8'))
-        
-        logger.info(f"Executing code in temporary file: {temp_file_path}")
-        
-        # Execute the code with a timeout
-        try:
-            # Run the Python code in a subprocess
-            process = subprocess.run(
-                ['python', temp_file_path],
-                capture_output=True,
-                text=True,
-                timeout=5  # 5 second timeout to prevent long-running code
-            )
-            
-            # Check if there was an error
-            if process.returncode != 0:
-                return {"error": process.stderr}
-            
-            # Return the output
-            return {"output": process.stdout}
-            
-        except subprocess.TimeoutExpired:
-            return {"error": "Code execution timed out. Please optimize your code or reduce the input size."}
-        except Exception as e:
-            logger.error(f"Error executing code: {str(e)}")
-            return {"error": f"Error executing code: {str(e)}"}
-        
+        result = await asyncio.to_thread(get_engine().execute, request)
     except Exception as e:
         logger.error(f"Error in execute_code endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path) 
\ No newline at end of file
+    
+    if result.status == STATUS_TIMEOUT:
+        response = {
+            "error": "Code execution timed out. Please optimize your code or reduce the input size.",
+            "usage": result.usage()
+        }
+        if "hang" in result.details:
+            # Where the code was stuck and which lines it spent its time on
+            response["hang"] = result.details["hang"]
+        return response
+    
+    # Check if there was an error
+    if result.status != STATUS_SUCCESS:
+        return {"error": result.stderr, "usage": result.usage()}
+    
+    # Return the output, with CPU time and peak memory of the run
+    return {"output": result.stdout, "usage": result.usage()}
+
+@router.get("/execute-code/metrics")
+async def get_execution_metrics():
+    """
+    Get execution counts and timings per backend for this process.
+    """
+    return metrics.snapshot()
@@ -1,38 +1,79 @@
 """
 API routes for token usage tracking.
 """
-from fastapi import APIRouter, Request
-from typing import Dict, Any
+from fastapi import APIRouter, Request, HTTPException
+import asyncio
+from typing import Dict, Any, List
+
+from app.utils.token_store import store
 
 router = APIRouter()
 
-# Simple in-memory token usage storage
-token_usage = {
-    "prompt_tokens": 0,
-    "completion_tokens": 0,
-    "total_tokens": 0,
-    "requests": 0
-}
+# Maximum number of records accepted by one batch request
+MAX_BATCH_SIZE = 1000
+
+# Counters a usage record may carry
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
 
 @router.get("", name="get_token_usage")
 async def get_token_usage(request: Request) -> Dict[str, Any]:
     """
-    Get current token usage statistics.
+    Get current token usage statistics, aggregated across all workers.
     """
-    return token_usage
+    return await asyncio.to_thread(store.totals)
 
 @router.post("", name="update_token_usage")
 async def update_token_usage(request: Request, data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Update token usage statistics.
     """
-    if "prompt_tokens" in data:
-        token_usage["prompt_tokens"] += data["prompt_tokens"]
-    if "completion_tokens" in data:
-        token_usage["completion_tokens"] += data["completion_tokens"]
-    if "total_tokens" in data:
-        token_usage["total_tokens"] += data["total_tokens"]
+    due = store.add(
+        prompt_tokens=data.get("prompt_tokens", 0),
+        completion_tokens=data.get("completion_tokens", 0),
+        total_tokens=data.get("total_tokens", 0),
+        requests=1
+    )
+    if due:
+        await asyncio.to_thread(store.flush)
+    
+    return await asyncio.to_thread(store.totals, False)
+
+@router.post("/batch", name="update_token_usage_batch")
+async def update_token_usage_batch(request: Request, records: List[Any]) -> Dict[str, Any]:
+    """
+    Update token usage statistics from many usage records at once.
+    
+    Records are validated individually; the valid ones are added to the
+    counters as one increment. Returns per-record results in input order.
+    """
+    if len(records) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} records")
+    
+    totals = dict.fromkeys(TOKEN_FIELDS, 0)
+    results = []
+    accepted = 0
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            results.append({"index": index, "error": "record must be an object"})
+            continue
+        invalid = [
+            field for field in TOKEN_FIELDS
+            if field in record and (not isinstance(record[field], int) or isinstance(record[field], bool) or record[field] < 0)
+        ]
+        if invalid:
+            results.append({"index": index, "error": f"invalid token counts: {', '.join(invalid)}"})
+            continue
+        for field in TOKEN_FIELDS:
+            totals[field] += record.get(field, 0)
+        accepted += 1
+        results.append({"index": index, "status": "ok"})
     
-    token_usage["requests"] += 1
+    if accepted and store.add(requests=accepted, **totals):
+        await asyncio.to_thread(store.flush)
     
-    return token_usage 
\ No newline at end of file
+    return {
+        "accepted": accepted,
+        "failed": len(records) - accepted,
+        "results": results,
+        "usage": await asyncio.to_thread(store.totals, False)
+    }
@@ -0,0 +1,166 @@
+"""
+Shared token usage counters backed by SQLite.
+
+Every uvicorn worker process accumulates increments in memory and
+periodically adds them to a single counters row with one atomic
+``UPDATE ... SET x = x + ?`` statement. Request handlers never wait on
+another worker: an increment is a local addition, and the writes and
+WAL snapshot reads run in a thread, off the event loop.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Counter names, in column order
+COUNTERS = ("prompt_tokens", "completion_tokens", "total_tokens", "requests")
+
+# Default database location (override with TOKEN_STORE_PATH)
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data",
+    "token_counters.db"
+)
+
+# Pending increments are written once this many updates or seconds have accumulated
+FLUSH_BATCH = int(os.getenv("TOKEN_FLUSH_BATCH", "50"))
+FLUSH_INTERVAL = float(os.getenv("TOKEN_FLUSH_INTERVAL", "1.0"))
+
+class TokenCounterStore:
+    """
+    Token counters shared by all worker processes through one SQLite file.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        flush_batch: int = FLUSH_BATCH,
+        flush_interval: float = FLUSH_INTERVAL
+    ):
+        self.db_path = db_path
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        # Guards the pending counts; never held while the database is used
+        self._lock = threading.Lock()
+        # Serializes use of the shared connection
+        self._db_lock = threading.Lock()
+        self._pending = dict.fromkeys(COUNTERS, 0)
+        self._pending_updates = 0
+        self._last_flush = time.monotonic()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this process's connection, creating the schema on first use."""
+        # Connections must not be shared across fork()
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=10,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS token_counters (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                total_tokens INTEGER NOT NULL DEFAULT 0,
+                requests INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            conn.execute('INSERT OR IGNORE INTO token_counters (id) VALUES (1)')
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def add(self, **increments: int) -> bool:
+        """
+        Add to the counters. Only touches memory, never the database.
+
+        Args:
+            increments: Counter name to amount, e.g. prompt_tokens=12
+
+        Returns:
+            True if a flush is due; the caller should then run flush(),
+            off the event loop
+        """
+        with self._lock:
+            for name, amount in increments.items():
+                if name in self._pending:
+                    self._pending[name] += int(amount)
+            self._pending_updates += 1
+            return (
+                self._pending_updates >= self.flush_batch
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+    def flush(self) -> None:
+        """
+        Write pending increments with a single atomic UPDATE.
+
+        The pending counts are swapped out under the counter lock and
+        written after it is released, so add() never waits on the database.
+        This blocks for up to the busy timeout while another worker holds
+        the write lock: call it from a thread, not the event loop.
+        """
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_updates:
+                return
+            pending = self._pending
+            updates = self._pending_updates
+            self._pending = dict.fromkeys(COUNTERS, 0)
+            self._pending_updates = 0
+
+        try:
+            with self._db_lock:
+                self._connection().execute(
+                    '''
+                    UPDATE token_counters SET
+                        prompt_tokens = prompt_tokens + ?,
+                        completion_tokens = completion_tokens + ?,
+                        total_tokens = total_tokens + ?,
+                        requests = requests + ?
+                    WHERE id = 1
+                    ''',
+                    [pending[name] for name in COUNTERS]
+                )
+        except sqlite3.Error:
+            # Put the increments back so the next flush retries them
+            with self._lock:
+                for name in COUNTERS:
+                    self._pending[name] += pending[name]
+                self._pending_updates += updates
+            raise
+
+    def totals(self, flush: bool = True) -> Dict[str, int]:
+        """
+        Get the aggregate counters across all workers.
+
+        Blocks on the database like flush(): call it from a thread.
+
+        Args:
+            flush: Write this worker's pending increments first. Otherwise
+                they are added to the stored totals in the result.
+
+        Returns:
+            Counter name to value
+        """
+        if flush:
+            self.flush()
+        with self._db_lock:
+            row = self._connection().execute(
+                'SELECT prompt_tokens, completion_tokens, total_tokens, requests FROM token_counters WHERE id = 1'
+            ).fetchone()
+        result = dict(zip(COUNTERS, row))
+        with self._lock:
+            for name in COUNTERS:
+                result[name] += self._pending[name]
+        return result
+
+# Store shared by the routes of this process
+store = TokenCounterStore(os.getenv("TOKEN_STORE_PATH", DEFAULT_DB_PATH))
@@ -0,0 +1,81 @@
+"""
+Shared code execution engine for the app/ and backend/ services.
+
+Both HTTP routers are thin adapters: they build an ExecutionRequest, run it
+through get_engine(), and shape the ExecutionResult into their own
+response format.
+"""
+from .schema import (
+    ExecutionRequest,
+    ExecutionResult,
+    ResourceLimits,
+    TestCase,
+    MODE_RUN,
+    MODE_TESTS,
+    MODE_PROFILE,
+    MODE_COMPLEXITY,
+    MODE_COMPARE,
+    MODE_MEMORY,
+    MODE_SESSION,
+    MODE_TRACE,
+    STATUS_SUCCESS,
+    STATUS_ERROR,
+    STATUS_TIMEOUT,
+    STATUS_CANCELLED,
+)
+from .backends import ExecutionBackend, SubprocessBackend, WarmPoolBackend, DryRunBackend, ForkServerBackend
+from .engine import ExecutionEngine, ENGINE_VERSION, get_engine
+from .metrics import ExecutionMetrics, metrics
+from .cache import ResultCache, is_deterministic
+from .complexity import fit_complexity
+from .broker import Broker, SQLiteBroker, broker_from_url
+from .jobs import Job, JobQueue, BrokerJobQueue, JobQueueFull, get_job_queue
+from .sessions import Session, SessionManager, SessionClosed, get_session_manager
+from .grading import Submission, fingerprint, grade_batch
+
+__all__ = [
+    "ExecutionRequest",
+    "ExecutionResult",
+    "ResourceLimits",
+    "TestCase",
+    "MODE_RUN",
+    "MODE_TESTS",
+    "MODE_PROFILE",
+    "MODE_COMPLEXITY",
+    "MODE_COMPARE",
+    "MODE_MEMORY",
+    "MODE_SESSION",
+    "MODE_TRACE",
+    "STATUS_SUCCESS",
+    "STATUS_ERROR",
+    "STATUS_TIMEOUT",
+    "STATUS_CANCELLED",
+    "ExecutionBackend",
+    "SubprocessBackend",
+    "WarmPoolBackend",
+    "DryRunBackend",
+    "ForkServerBackend",
+    "ExecutionEngine",
+    "ENGINE_VERSION",
+    "get_engine",
+    "ExecutionMetrics",
+    "metrics",
+    "ResultCache",
+    "is_deterministic",
+    "fit_complexity",
+    "Job",
+    "JobQueue",
+    "BrokerJobQueue",
+    "JobQueueFull",
+    "get_job_queue",
+    "Broker",
+    "SQLiteBroker",
+    "broker_from_url",
+    "Session",
+    "SessionManager",
+    "SessionClosed",
+    "get_session_manager",
+    "Submission",
+    "fingerprint",
+    "grade_batch",
+]
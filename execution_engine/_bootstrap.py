@@ -0,0 +1,1249 @@
+"""
+Child-side entry point for sandboxed runs.
+
+Started as ``python -I _bootstrap.py [--report-fd N]``. Reads one JSON
+header line from stdin, then the submission source (header["source_length"]
+bytes), applies the header's resource limits and runs the source in the
+header's mode:
+
+- "run" (default): execute it as ``__main__``. Anything left on stdin is
+  the program's input.
+- "tests": run it once per test case, each with a fresh namespace, its own
+  stdin and captured output, and a per-case time limit.
+- "profile": like "run", under a line profiler; per-line hit counts and
+  times are added to the report.
+- "complexity": time one of its functions at growing input sizes, for
+  fitting against complexity classes by the parent.
+- "compare": time it against a reference program, interleaved in this
+  one process.
+- "memory": like "run", under tracemalloc; peak memory, the lines holding
+  the most memory and the program's objects by type are added to the report.
+- "trace": like "run", recording each line run with its variables, for
+  stepping through the run.
+- "session": ignore the source and run cells sent on stdin, one after the
+  other, in one namespace that persists between them (see run_session).
+
+On exit, CPU time, peak memory and any mode results are written as JSON to
+the report descriptor, if one was given. In "run" mode a sampler records
+which line is running; on SIGUSR1 (sent by the parent when the run times
+out) the current stack and the recently sampled lines are sent first. In
+"trace" mode the trace recorded so far is sent instead.
+
+Kept free of imports from the rest of the package: it runs in a bare
+interpreter with the package directory off sys.path.
+"""
+import ast
+import collections
+import gc
+import io
+import itertools
+import json
+import linecache
+import os
+import signal
+import statistics
+import sys
+import time
+import traceback
+import types
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; runs there are unlimited and unaccounted
+    resource = None
+
+# Mode results, sent to the parent with the usage report
+REPORT = {}
+
+# Report descriptor, for modes that send messages before exiting
+REPORT_FD = None
+
+# Longest repr of a value kept in a report
+MAX_REPR_LENGTH = 500
+
+# header["limits"] key to setrlimit resource name
+_LIMITS = {
+    "memory_bytes": "RLIMIT_AS",
+    "cpu_seconds": "RLIMIT_CPU",
+    "max_processes": "RLIMIT_NPROC",
+    "max_file_bytes": "RLIMIT_FSIZE",
+}
+
+def _read_header_and_source():
+    # Read through the buffer sys.stdin wraps, so input() later continues
+    # exactly where the source ends
+    stream = sys.stdin.buffer
+    header = json.loads(stream.readline())
+    source = stream.read(header["source_length"]).decode("utf-8")
+    return header, source
+
+def apply_limits(limits) -> None:
+    """Lower this process's hard and soft limits. Unsupported limits are skipped."""
+    if resource is None or not limits:
+        return
+    for key, name in _LIMITS.items():
+        value = limits.get(key)
+        if value is None or not hasattr(resource, name):
+            continue
+        which = getattr(resource, name)
+        _, hard = resource.getrlimit(which)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        soft = value
+        if key == "cpu_seconds" and (hard == resource.RLIM_INFINITY or value < hard):
+            # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+            hard = value + 1
+        else:
+            hard = value
+        try:
+            resource.setrlimit(which, (soft, hard))
+        except (ValueError, OSError):
+            # e.g. RLIMIT_AS is not enforced on macOS
+            pass
+
+def _proc_status_bytes(field: str):
+    """Read a memory field such as VmRSS from /proc/self/status (Linux), in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _own_peak_rss():
+    """
+    Peak RSS of this process from /proc (Linux), in bytes.
+    
+    Linux carries ru_maxrss over from the forking server across exec, so
+    it can overstate a small child by the server's whole footprint.
+    """
+    return _proc_status_bytes("VmHWM")
+
+def send_message(message) -> None:
+    """Write one JSON line to the report descriptor while the mode is still running."""
+    if REPORT_FD is None:
+        return
+    data = json.dumps(message, default=repr).encode("utf-8") + b"\n"
+    while data:
+        data = data[os.write(REPORT_FD, data):]
+
+def write_report(fd, pid) -> None:
+    """
+    Send CPU time and peak RSS (in bytes) of this process and its children,
+    plus the mode's results, to the parent.
+    """
+    # A process forked by the submission must not write a second report
+    if fd is None or os.getpid() != pid:
+        return
+    report = {"details": REPORT}
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        report["cpu_time"] = usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime
+        report["max_rss_bytes"] = max(_own_peak_rss() or usage.ru_maxrss * scale, children.ru_maxrss * scale)
+    try:
+        # One JSON line; a fork server appends the exit status as another
+        data = json.dumps(report, default=repr).encode("utf-8") + b"\n"
+        while data:
+            data = data[os.write(fd, data):]
+        os.close(fd)
+    except OSError:
+        pass
+
+def _report_fd():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--report-fd":
+        return int(sys.argv[2])
+    return None
+
+def short_repr(value, limit: int = MAX_REPR_LENGTH) -> str:
+    """repr() cut to limit characters."""
+    try:
+        text = repr(value)
+    except Exception as e:
+        text = f"<repr failed: {type(e).__name__}>"
+    if len(text) > limit:
+        text = text[:limit] + "..."
+    return text
+
+def format_exception(exc) -> str:
+    """Format an exception raised by submission code, without this module's frames."""
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+        tb = tb.tb_next
+    return "".join(traceback.format_exception(type(exc), exc, tb))
+
+def run_source(source: str, filename: str, before=None, after=None) -> int:
+    """
+    Execute source as the __main__ module.
+    
+    Args:
+        source: Submission source
+        filename: Name shown in tracebacks
+        before: Called once the source has compiled, just before it runs
+        after: Called with the module namespace once it has run, even if it raised
+    
+    Returns:
+        Process exit code
+    """
+    # Let tracebacks show the submission's source lines
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    sys.argv[:] = [filename]
+    
+    namespace = {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__}
+    try:
+        code = compile(source, filename, "exec")
+        if before is not None:
+            before()
+        try:
+            exec(code, namespace)
+        finally:
+            if after is not None:
+                after(namespace)
+    except SystemExit:
+        raise
+    except BaseException as exc:
+        sys.stderr.write(format_exception(exc))
+        return 1
+    return 0
+
+class CaseTimeout(BaseException):
+    """Raised inside a test case or session cell that ran past its time limit."""
+
+def _on_case_timeout(signum, frame):
+    raise CaseTimeout()
+
+def _normalize_output(text: str) -> str:
+    # Trailing whitespace is not significant when comparing printed output
+    return "\n".join(line.rstrip() for line in text.rstrip().splitlines())
+
+def _jsonable(value):
+    """Round-trip a value through JSON so it compares equal to a JSON-decoded expectation."""
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return value
+
+def run_case(code, filename: str, case) -> dict:
+    """
+    Run one test case against compiled submission code.
+    
+    The module is executed in a fresh namespace with the case's stdin and
+    captured stdout/stderr. If the case names a function, it is then called
+    with the case's arguments.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sys.stdin = io.StringIO(case.get("stdin") or "")
+    sys.stdout, sys.stderr = stdout, stderr
+    namespace = {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__}
+    outcome = {"name": case.get("name"), "error": None, "timed_out": False}
+    timeout = case.get("timeout")
+    can_time_out = bool(timeout) and hasattr(signal, "setitimer")
+    
+    start = time.perf_counter()
+    try:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        exec(code, namespace)
+        if case.get("call"):
+            function = namespace.get(case["call"])
+            if not callable(function):
+                raise NameError(f"function '{case['call']}' is not defined")
+            value = function(*case.get("args", []), **case.get("kwargs", {}))
+            outcome["return_value"] = short_repr(value)
+            if case.get("check_return"):
+                outcome["return_matches"] = _jsonable(value) == case.get("expected_return")
+    except CaseTimeout:
+        outcome["timed_out"] = True
+        outcome["error"] = f"Timed out after {timeout} seconds"
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            outcome["error"] = f"SystemExit: {exc.code}"
+    except BaseException as exc:
+        outcome["error"] = format_exception(exc)
+    finally:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        outcome["duration"] = time.perf_counter() - start
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+    
+    outcome["stdout"] = stdout.getvalue()
+    outcome["stderr"] = stderr.getvalue()
+    passed = outcome["error"] is None
+    if passed and case.get("expected_output") is not None:
+        outcome["output_matches"] = _normalize_output(outcome["stdout"]) == _normalize_output(case["expected_output"])
+        passed = outcome["output_matches"]
+    if passed and "return_matches" in outcome:
+        passed = outcome["return_matches"]
+    outcome["passed"] = passed
+    return outcome
+
+def run_tests(source: str, filename: str, options) -> int:
+    """
+    Run the submission against every case in options["cases"].
+    
+    Returns:
+        0 once all cases ran (whether or not they passed), 1 if the source
+        does not compile
+    """
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    sys.argv[:] = [filename]
+    try:
+        code = compile(source, filename, "exec")
+    except SyntaxError as exc:
+        sys.stderr.write(format_exception(exc))
+        return 1
+    
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _on_case_timeout)
+    results = [run_case(code, filename, case) for case in options.get("cases", [])]
+    REPORT["tests"] = results
+    REPORT["passed"] = sum(1 for result in results if result["passed"])
+    REPORT["total"] = len(results)
+    return 0
+
+def run_cell(source: str, namespace, filename: str, stdin: str, timeout, max_repr: int) -> dict:
+    """
+    Run one notebook cell in a session's namespace.
+    
+    As in Jupyter, if the cell ends with a bare expression its value is
+    returned as "expression_value" and stored as `_`.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sys.stdin = io.StringIO(stdin or "")
+    sys.stdout, sys.stderr = stdout, stderr
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    outcome = {"status": "success", "error": None}
+    can_time_out = bool(timeout) and hasattr(signal, "setitimer")
+    
+    start = time.perf_counter()
+    try:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        tree = ast.parse(source, filename)
+        last = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last = ast.Expression(tree.body.pop().value)
+        exec(compile(tree, filename, "exec"), namespace)
+        if last is not None:
+            value = eval(compile(last, filename, "eval"), namespace)
+            if value is not None:
+                namespace["_"] = value
+                outcome["expression_value"] = short_repr(value, max_repr)
+    except CaseTimeout:
+        outcome["status"] = "timeout"
+        outcome["error"] = f"Timed out after {timeout} seconds"
+    except SystemExit as exc:
+        # Exiting would end the session; report it like Jupyter does instead
+        if exc.code not in (None, 0):
+            outcome["status"] = "error"
+            outcome["error"] = f"SystemExit: {exc.code}"
+    except BaseException as exc:
+        outcome["status"] = "error"
+        outcome["error"] = format_exception(exc)
+    finally:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        outcome["duration"] = time.perf_counter() - start
+        sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__
+    
+    outcome["stdout"] = stdout.getvalue()
+    outcome["stderr"] = stderr.getvalue()
+    return outcome
+
+def run_session(source: str, filename: str, options) -> int:
+    """
+    Serve notebook cells until stdin is closed.
+    
+    Each cell arrives as a JSON line {"source_length", "timeout", "stdin",
+    "delete"} followed by the cell's source. Cells share one namespace;
+    names in "delete" are removed from it before the cell runs. After each
+    cell, its outcome, the cell number, CPU time and current memory are
+    sent as one JSON line on the report descriptor.
+    """
+    stream = sys.stdin.buffer
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    max_repr = options.get("max_repr", 10000)
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _on_case_timeout)
+    
+    count = 0
+    while True:
+        line = stream.readline()
+        if not line:
+            return 0
+        frame = json.loads(line)
+        cell_source = stream.read(frame["source_length"]).decode("utf-8")
+        for name in frame.get("delete") or ():
+            namespace.pop(name, None)
+        count += 1
+        outcome = run_cell(
+            cell_source,
+            namespace,
+            f"<cell {count}>",
+            frame.get("stdin"),
+            frame.get("timeout"),
+            max_repr
+        )
+        outcome["execution_count"] = count
+        outcome["memory_bytes"] = _proc_status_bytes("VmRSS")
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            outcome["cpu_time"] = usage.ru_utime + usage.ru_stime
+        send_message(outcome)
+
+class LineProfiler:
+    """
+    Count hits and cumulative time per line of one file, with sys.settrace.
+    
+    Only frames running code from that file are traced line by line; time
+    spent in calls (to the standard library or to the file's own functions)
+    is added to the calling line. Time spent inside the trace function is
+    measured and left out of every line's time. Tracing stops once
+    max_events lines have run or the trace function has cost max_overhead
+    seconds, so a long loop is slowed down for a bounded time only.
+    """
+    
+    def __init__(self, filename: str, max_events: int, max_overhead: float):
+        self.filename = filename
+        self.max_events = max_events
+        self.max_overhead = max_overhead
+        # line number -> [hits, seconds]
+        self.lines = {}
+        self.events = 0
+        self.overhead = 0.0
+        self.truncated = None
+        # frame -> (line, time the line started, overhead at that time)
+        self._current = {}
+    
+    def _global_trace(self, frame, event, arg):
+        if self.truncated is not None or frame.f_code.co_filename != self.filename:
+            return None
+        return self._local_trace
+    
+    def _local_trace(self, frame, event, arg):
+        now = time.perf_counter()
+        if self.truncated is not None:
+            return None
+        current = self._current.pop(frame, None)
+        if current is not None:
+            line, started, overhead = current
+            self.lines[line][1] += (now - started) - (self.overhead - overhead)
+        
+        if event == "line":
+            self.events += 1
+            entry = self.lines.get(frame.f_lineno)
+            if entry is None:
+                entry = self.lines[frame.f_lineno] = [0, 0.0]
+            entry[0] += 1
+            if self.events >= self.max_events:
+                self.truncated = "max_events"
+            elif self.overhead >= self.max_overhead:
+                self.truncated = "max_overhead"
+        
+        if self.truncated is not None:
+            sys.settrace(None)
+            self._current.clear()
+            return None
+        
+        # "return" also fires when a generator yields; it resumes with "call"
+        end = time.perf_counter()
+        self.overhead += end - now
+        if event == "line" or event == "exception":
+            self._current[frame] = (frame.f_lineno, end, self.overhead)
+        return self._local_trace
+    
+    def start(self) -> None:
+        sys.settrace(self._global_trace)
+    
+    def stop(self) -> None:
+        sys.settrace(None)
+    
+    def results(self, source: str, duration: float) -> dict:
+        """
+        Per-line results for the editor. A line's percent is its share of
+        the whole run (a call's lines are also counted in the calling line).
+        """
+        source_lines = source.splitlines()
+        total = max(duration - self.overhead, 1e-9)
+        lines = []
+        for number in sorted(self.lines):
+            hits, seconds = self.lines[number]
+            seconds = max(seconds, 0.0)
+            lines.append({
+                "line": number,
+                "hits": hits,
+                "time": seconds,
+                "percent": 100.0 * seconds / total,
+                "source": source_lines[number - 1] if 0 < number <= len(source_lines) else "",
+            })
+        return {
+            "lines": lines,
+            "events": self.events,
+            "overhead": self.overhead,
+            "truncated": self.truncated is not None,
+            "truncated_reason": self.truncated,
+            "duration": duration,
+        }
+
+def run_profile(source: str, filename: str, options) -> int:
+    """
+    Run the submission like run_main, under a LineProfiler.
+    
+    options may set "max_events" (default 1,000,000 traced lines) and
+    "max_overhead" (default 1.0 second spent in the profiler).
+    """
+    profiler = LineProfiler(
+        filename,
+        options.get("max_events", 1000000),
+        options.get("max_overhead", 1.0)
+    )
+    start = time.perf_counter()
+    profiler.start()
+    try:
+        return run_source(source, filename)
+    finally:
+        profiler.stop()
+        REPORT["profile"] = profiler.results(source, time.perf_counter() - start)
+
+class _DiscardOutput(io.TextIOBase):
+    """Swallows what a timed function prints."""
+    
+    def write(self, text):
+        return len(text)
+
+def _time_function(function, generator, namespace, n: int, repeat: int, min_time: float):
+    """
+    Time function on the arguments generator builds for size n.
+    
+    Calls are batched until a batch takes min_time; the best of repeat
+    batches is kept. Each batch gets freshly generated arguments, in case
+    the function changes them (e.g. sorts a list in place).
+    
+    Returns:
+        (seconds per call, calls per batch)
+    """
+    scope = dict(namespace)
+    scope["n"] = n
+    best = None
+    number = 1
+    for _ in range(repeat):
+        args = eval(generator, scope)
+        if not isinstance(args, tuple):
+            args = (args,)
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                function(*args)
+            elapsed = time.perf_counter() - start
+            if best is not None or elapsed >= min_time or number >= 1000000:
+                break
+            number *= 10
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / number, number
+
+def run_complexity(source: str, filename: str, options) -> int:
+    """
+    Time options["function"] at input sizes growing geometrically, within
+    options["budget"] seconds.
+    
+    options["generator"] is an expression in n, evaluated in the
+    submission's namespace, giving the function's arguments as a tuple
+    (any other value, such as a list, is passed as the only argument). Also read:
+    "min_size" (default 8), "max_size" (default 2**24), "growth" (default 2),
+    "repeat" (default 3) and "min_time" (default 0.005 seconds per batch).
+    
+    Returns:
+        0 once timing stopped, 1 if the source, function or generator is unusable
+    """
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    sys.argv[:] = [filename]
+    namespace = {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__}
+    name = options.get("function")
+    try:
+        exec(compile(source, filename, "exec"), namespace)
+        function = namespace.get(name)
+        if not callable(function):
+            raise NameError(f"function '{name}' is not defined")
+        generator = compile(options.get("generator", "n"), "<generator>", "eval")
+    except SystemExit:
+        raise
+    except BaseException as exc:
+        sys.stderr.write(format_exception(exc))
+        return 1
+    
+    budget = options.get("budget", 2.0)
+    growth = max(options.get("growth", 2), 1.1)
+    max_size = options.get("max_size", 2 ** 24)
+    n = max(int(options.get("min_size", 8)), 1)
+    samples = []
+    outcome = {"function": name, "samples": samples, "stopped": "max_size"}
+    deadline = time.perf_counter() + budget
+    can_time_out = hasattr(signal, "setitimer")
+    if can_time_out:
+        # A call that overruns the budget is stopped; its size is not sampled
+        signal.signal(signal.SIGALRM, _on_case_timeout)
+        signal.setitimer(signal.ITIMER_REAL, budget)
+    sys.stdout = _DiscardOutput()
+    try:
+        while n <= max_size:
+            started = time.perf_counter()
+            seconds, number = _time_function(
+                function,
+                generator,
+                namespace,
+                n,
+                options.get("repeat", 3),
+                options.get("min_time", 0.005)
+            )
+            samples.append({"n": n, "seconds": seconds, "number": number})
+            now = time.perf_counter()
+            # The next size costs at least `growth` times as much as this one
+            if (now - started) * growth > deadline - now:
+                outcome["stopped"] = "budget"
+                break
+            n = max(int(n * growth), n + 1)
+    except CaseTimeout:
+        outcome["stopped"] = "budget"
+    except MemoryError:
+        outcome["stopped"] = "memory"
+    except BaseException as exc:
+        outcome["stopped"] = "error"
+        outcome["error"] = format_exception(exc)
+        outcome["error_size"] = n
+    finally:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        sys.stdout = sys.__stdout__
+    
+    REPORT["complexity"] = outcome
+    return 0
+
+def _run_program(code, filename: str, stdin: str, number: int) -> float:
+    """
+    Run compiled module code `number` times, each in a fresh namespace.
+    
+    Returns:
+        Seconds spent executing, excluding namespace setup and teardown
+    """
+    total = 0.0
+    for _ in range(number):
+        namespace = {"__name__": "__main__", "__file__": filename, "__builtins__": __builtins__}
+        sys.stdin = io.StringIO(stdin)
+        start = time.perf_counter()
+        try:
+            exec(code, namespace)
+        except SystemExit as exc:
+            if exc.code not in (None, 0):
+                raise
+        total += time.perf_counter() - start
+    return total
+
+def _calibrate(code, filename: str, stdin: str, min_time: float) -> int:
+    """Find how many runs make one timed batch last at least min_time."""
+    number = 1
+    while True:
+        elapsed = _run_program(code, filename, stdin, number)
+        if elapsed >= min_time or number >= 1000000:
+            return number
+        number = min(1000000, max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1))
+
+def _summarize(times, number: int) -> dict:
+    """Median, quartiles and spread of per-run times."""
+    if len(times) > 1:
+        q1, median, q3 = statistics.quantiles(times, n=4, method="inclusive")
+    else:
+        q1 = median = q3 = times[0]
+    return {
+        "median": median,
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+        "min": min(times),
+        "max": max(times),
+        "samples": len(times),
+        "runs_per_sample": number,
+    }
+
+# Rounds run in compare mode even past the soft deadline
+MIN_COMPARE_ROUNDS = 3
+
+def run_compare(source: str, filename: str, options) -> int:
+    """
+    Time the submission against options["reference"], timeit style.
+    
+    Both programs first run once with output captured, to check that they
+    run and whether their output matches. Then, with the garbage collector
+    off and output discarded, each round times one batch of each program
+    (batches sized to last "min_time", default 0.01 seconds), alternating
+    which goes first so drift affects both alike. The first "warmup"
+    rounds (default 2) are discarded; up to "rounds" (default 15) are kept,
+    fewer if "budget" (default 3.0 seconds) runs out.
+    
+    Returns:
+        0 once timing finished, 1 if either program does not compile
+    """
+    reference_filename = "reference.py"
+    reference = options.get("reference", "")
+    stdin = options.get("stdin") or ""
+    programs = []
+    for name, program_filename, program_source in (
+        ("submission", filename, source),
+        ("reference", reference_filename, reference),
+    ):
+        linecache.cache[program_filename] = (len(program_source), None, program_source.splitlines(True), program_filename)
+        try:
+            programs.append((name, program_filename, compile(program_source, program_filename, "exec")))
+        except SyntaxError as exc:
+            sys.stderr.write(format_exception(exc))
+            return 1
+    
+    budget = options.get("budget", 3.0)
+    rounds = options.get("rounds", 15)
+    warmup = options.get("warmup", 2)
+    min_time = options.get("min_time", 0.01)
+    outcome = {"rounds": 0, "warmup": warmup, "stopped": "rounds"}
+    REPORT["compare"] = outcome
+    # Stop adding rounds here, leaving room before the hard stop at the budget
+    soft_deadline = time.perf_counter() + budget * 0.8
+    can_time_out = hasattr(signal, "setitimer")
+    if can_time_out:
+        signal.signal(signal.SIGALRM, _on_case_timeout)
+        signal.setitimer(signal.ITIMER_REAL, budget)
+    
+    times = {name: [] for name, _, _ in programs}
+    numbers = {}
+    failed = None
+    try:
+        outputs = {}
+        for name, program_filename, code in programs:
+            failed = name
+            sys.stdout = io.StringIO()
+            _run_program(code, program_filename, stdin, 1)
+            outputs[name] = sys.stdout.getvalue()
+        failed = None
+        outcome["same_output"] = outputs["submission"] == outputs["reference"]
+        
+        sys.stdout = _DiscardOutput()
+        gc.collect()
+        gc.disable()
+        for name, program_filename, code in programs:
+            failed = name
+            numbers[name] = _calibrate(code, program_filename, stdin, min_time)
+        failed = None
+        
+        for index in range(warmup + rounds):
+            order = programs if index % 2 == 0 else programs[::-1]
+            for name, program_filename, code in order:
+                number = numbers[name]
+                elapsed = _run_program(code, program_filename, stdin, number) / number
+                if index >= warmup:
+                    times[name].append(elapsed)
+            if index >= warmup:
+                outcome["rounds"] += 1
+            if outcome["rounds"] >= MIN_COMPARE_ROUNDS and time.perf_counter() > soft_deadline:
+                outcome["stopped"] = "budget"
+                break
+    except CaseTimeout:
+        outcome["stopped"] = "budget"
+        if failed is not None:
+            outcome["error"] = f"The {failed} did not finish within {budget} seconds"
+            outcome["failed"] = failed
+    except BaseException as exc:
+        outcome["stopped"] = "error"
+        outcome["error"] = format_exception(exc)
+        outcome["failed"] = failed
+    finally:
+        if can_time_out:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        gc.enable()
+        sys.stdin, sys.stdout = sys.__stdin__, sys.__stdout__
+    
+    if outcome["rounds"] == 0:
+        return 0
+    # A round may have been cut short by the budget; keep complete rounds only
+    for name in times:
+        del times[name][outcome["rounds"]:]
+    submission = outcome["submission"] = _summarize(times["submission"], numbers["submission"])
+    reference_summary = outcome["reference"] = _summarize(times["reference"], numbers["reference"])
+    outcome["ratio"] = submission["median"] / reference_summary["median"] if reference_summary["median"] > 0 else None
+    # The difference is only meaningful if the interquartile ranges do not
+    # overlap, and quartiles of fewer than MIN_COMPARE_ROUNDS rounds say little
+    outcome["significant"] = outcome["rounds"] >= MIN_COMPARE_ROUNDS and (
+        submission["q3"] < reference_summary["q1"] or reference_summary["q3"] < submission["q1"]
+    )
+    return 0
+
+# Objects counted, but not looked into, when walking the program's variables
+_OPAQUE_TYPES = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.CodeType)
+
+def count_objects(namespace, max_objects: int):
+    """
+    Count the objects reachable from a module's variables, by type.
+    
+    Unlike gc.get_objects(), this includes objects the collector does not
+    track, such as numbers, strings and tuples of them. Modules, classes
+    and functions are counted but not followed.
+    
+    Returns:
+        ({type name: [count, shallow bytes]}, whether max_objects was reached)
+    """
+    stack = [value for name, value in namespace.items() if not (name.startswith("__") and name.endswith("__"))]
+    seen = set()
+    counts = {}
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        if len(seen) >= max_objects:
+            return counts, True
+        seen.add(id(obj))
+        entry = counts.get(type(obj).__name__)
+        if entry is None:
+            entry = counts[type(obj).__name__] = [0, 0]
+        entry[0] += 1
+        entry[1] += sys.getsizeof(obj, 0)
+        if not isinstance(obj, _OPAQUE_TYPES):
+            stack.extend(gc.get_referents(obj))
+    return counts, False
+
+def run_memory(source: str, filename: str, options) -> int:
+    """
+    Run the submission like run_main, tracing allocations with tracemalloc.
+    
+    Reports peak and final traced memory, the submission lines holding the
+    most memory at exit ("top_lines", up to "top" entries, default 10) and
+    the objects reachable from its variables by type (at most
+    "max_objects", default 1,000,000, are walked). "frames" (default 5)
+    is how many stack frames each allocation records to find the
+    submission line responsible for it.
+    """
+    import tracemalloc
+    top = options.get("top", 10)
+    memory = {}
+    
+    def before():
+        tracemalloc.start(options.get("frames", 5))
+    
+    def after(namespace):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memory["peak_bytes"] = peak
+        memory["current_bytes"] = current
+        
+        # Charge each allocation to the innermost frame in the submission
+        lines = {}
+        for trace in snapshot.traces:
+            for frame in reversed(trace.traceback):
+                if frame.filename == filename:
+                    entry = lines.get(frame.lineno)
+                    if entry is None:
+                        entry = lines[frame.lineno] = [0, 0]
+                    entry[0] += trace.size
+                    entry[1] += 1
+                    break
+        del snapshot
+        source_lines = source.splitlines()
+        memory["top_lines"] = [
+            {
+                "line": number,
+                "size": size,
+                "count": count,
+                "source": source_lines[number - 1] if 0 < number <= len(source_lines) else "",
+            }
+            for number, (size, count) in sorted(lines.items(), key=lambda item: -item[1][0])[:top]
+        ]
+        
+        counts, truncated = count_objects(namespace, options.get("max_objects", 1000000))
+        memory["objects"] = [
+            {"type": name, "count": count, "size": size}
+            for name, (count, size) in sorted(counts.items(), key=lambda item: -item[1][1])
+        ][:top * 2]
+        memory["objects_truncated"] = truncated
+    
+    try:
+        return run_source(source, filename, before, after)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if memory:
+            REPORT["memory"] = memory
+
+# Containers a step trace shows the first items of, with their brackets;
+# other objects appear as "<Type object>"
+_TRACED_CONTAINERS = (
+    (list, "[", "]"),
+    (tuple, "(", ")"),
+    (set, "{", "}"),
+    (frozenset, "frozenset({", "})"),
+    (collections.deque, "deque([", "])"),
+)
+
+# Items of each container shown in a step trace, and how deeply nested containers are shown
+MAX_TRACED_ITEMS = 6
+MAX_TRACED_LEVEL = 2
+
+# Variables a step trace leaves out: modules, functions and classes
+_UNTRACED_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+
+# Values that cannot change in place: while a variable holds the same one, its repr is reused
+_IMMUTABLE_TYPES = (int, float, complex, bool, type(None), str, bytes, range)
+
+# Largest int shown in a step trace; a repr of a huge int costs time
+MAX_TRACED_INT_BITS = 256
+
+class StepTracer:
+    """
+    Record each line the submission runs, with its frame's variables, for
+    stepping through a run.
+    
+    Only frames running code from the submission file are traced. Values
+    are shown with a repr that looks at the first few items of a container
+    and cuts strings to max_repr characters, so a snapshot costs the same
+    however large a value grows. Events are kept in a ring buffer
+    of max_events: a long loop keeps only its last iterations. Each event
+    stores only the variables that changed since its frame's previous
+    event. Tracing stops after max_steps lines. On SIGUSR1 (the run timed
+    out) tracing stops and the events so far are sent on the report
+    descriptor.
+    """
+    
+    def __init__(self, filename: str, max_events: int, max_steps: int, max_repr: int, max_variables: int):
+        self.filename = filename
+        self.max_events = max_events
+        self.max_steps = max_steps
+        self.max_repr = max_repr
+        self.max_variables = max_variables
+        self.steps = 0
+        self.recorded = 0
+        self.truncated = False
+        # (step, event, line, frame number, function, depth, changed, removed, value)
+        self.events = collections.deque()
+        # Live traced frame -> [frame number, depth, variables at its latest
+        # event, the immutable values they showed]
+        self._frames = {}
+        self._next_frame = 0
+        # Frame number -> its events in the buffer
+        self._buffered = collections.Counter()
+        # Frame number -> its variables just before its oldest event in the buffer
+        self._base = {}
+    
+    def _value(self, value, level: int = MAX_TRACED_LEVEL) -> str:
+        kind = type(value)
+        # Checking the exact type first saves time on the most common values
+        if kind is int or isinstance(value, int):
+            if value.bit_length() > MAX_TRACED_INT_BITS:
+                return f"<int of {value.bit_length()} bits>"
+            return repr(value)
+        if isinstance(value, (float, complex, type(None), range)):
+            return repr(value)
+        if isinstance(value, (str, bytes)):
+            if len(value) <= self.max_repr:
+                return repr(value)
+            return repr(value[:self.max_repr]) + "..."
+        
+        if isinstance(value, dict):
+            opening, closing = "{", "}"
+        else:
+            for container, opening, closing in _TRACED_CONTAINERS:
+                if isinstance(value, container):
+                    break
+            else:
+                return f"<{kind.__name__} object>"
+            if not value and isinstance(value, (set, frozenset)):
+                return f"{kind.__name__}()"
+        
+        if not value:
+            text = ""
+        elif level <= 0:
+            text = "..."
+        else:
+            if isinstance(value, dict):
+                parts = [
+                    f"{self._value(key, level - 1)}: {self._value(item, level - 1)}"
+                    for key, item in itertools.islice(value.items(), MAX_TRACED_ITEMS)
+                ]
+            else:
+                parts = [self._value(item, level - 1) for item in itertools.islice(value, MAX_TRACED_ITEMS)]
+            if len(value) > MAX_TRACED_ITEMS:
+                parts.append("...")
+            text = ", ".join(parts)
+            if kind is tuple and len(value) == 1:
+                text += ","
+        if kind.__module__ != "builtins" and kind is not collections.deque:
+            # A subclass such as a namedtuple or Counter
+            if isinstance(value, tuple):
+                return f"{kind.__name__}({text})"
+            return f"{kind.__name__}({opening}{text}{closing})"
+        return f"{opening}{text}{closing}"
+    
+    def _variables(self, frame, previous: dict, previous_values: dict):
+        """
+        Returns:
+            (name -> repr, name -> value for the immutable values)
+        """
+        variables = {}
+        values = {}
+        for name, value in frame.f_locals.items():
+            if name.startswith("__") or isinstance(value, _UNTRACED_TYPES):
+                continue
+            if len(variables) >= self.max_variables:
+                break
+            if type(value) in _IMMUTABLE_TYPES:
+                values[name] = value
+                if previous_values.get(name, previous_values) is value:
+                    variables[name] = previous[name]
+                    continue
+            variables[name] = self._value(value)
+        return variables, values
+    
+    def _drop_oldest(self) -> None:
+        _, _, _, number, _, _, changed, removed, _ = self.events.popleft()
+        self._buffered[number] -= 1
+        if not self._buffered[number]:
+            del self._buffered[number]
+            del self._base[number]
+            return
+        base = self._base[number]
+        for name in removed:
+            base.pop(name, None)
+        base.update(changed)
+    
+    def _record(self, frame, event: str, value) -> None:
+        entry = self._frames.get(frame)
+        if entry is None:
+            return
+        number, depth, previous, previous_values = entry
+        if len(self.events) >= self.max_events:
+            self._drop_oldest()
+        
+        variables, entry[3] = self._variables(frame, previous, previous_values)
+        if number in self._buffered:
+            changed = {name: text for name, text in variables.items() if previous.get(name) != text}
+            removed = tuple(name for name in previous if name not in variables)
+        else:
+            # First event of this frame in the buffer: everything is new
+            self._base[number] = {}
+            changed, removed = variables, ()
+        entry[2] = variables
+        self._buffered[number] += 1
+        self.recorded += 1
+        self.events.append((
+            self.steps, event, frame.f_lineno, number, frame.f_code.co_name, depth,
+            changed, removed, None if event == "line" else self._value(value)
+        ))
+    
+    def _global_trace(self, frame, event, arg):
+        if self.truncated or frame.f_code.co_filename != self.filename:
+            return None
+        # A generator resuming after a yield counts as a new frame
+        self._frames[frame] = [self._next_frame, len(self._frames), {}, {}]
+        self._next_frame += 1
+        return self._local_trace
+    
+    def _local_trace(self, frame, event, arg):
+        if self.truncated:
+            return None
+        if event == "line":
+            self.steps += 1
+            if self.steps > self.max_steps:
+                self.truncated = True
+                sys.settrace(None)
+                return None
+            self._record(frame, event, None)
+        elif event == "return":
+            self._record(frame, event, arg)
+            self._frames.pop(frame, None)
+        return self._local_trace
+    
+    def _report(self, signum, frame):
+        self.stop()
+        send_message({"trace": self.results()})
+    
+    def start(self) -> None:
+        if hasattr(signal, "SIGUSR1") and REPORT_FD is not None:
+            signal.signal(signal.SIGUSR1, self._report)
+        sys.settrace(self._global_trace)
+    
+    def stop(self) -> None:
+        sys.settrace(None)
+        self._frames.clear()
+    
+    def results(self) -> dict:
+        """
+        The buffered events, delta encoded: the first event of each frame
+        has all its variables under "locals", later ones only "changed"
+        values and "removed" names. A "return" event has the return value
+        under "value".
+        """
+        events = []
+        seen = set()
+        for step, event, line, number, function, depth, changed, removed, value in self.events:
+            entry = {"step": step, "event": event, "line": line, "frame": number, "function": function, "depth": depth}
+            if number in seen:
+                if changed:
+                    entry["changed"] = changed
+                if removed:
+                    entry["removed"] = list(removed)
+            else:
+                seen.add(number)
+                variables = dict(self._base[number])
+                for name in removed:
+                    variables.pop(name, None)
+                variables.update(changed)
+                entry["locals"] = variables
+            if event == "return":
+                entry["value"] = value
+            events.append(entry)
+        return {
+            "events": events,
+            "steps": self.steps,
+            "dropped": self.recorded - len(self.events),
+            "truncated": self.truncated,
+        }
+
+def run_trace(source: str, filename: str, options) -> int:
+    """
+    Run the submission like run_main, under a StepTracer.
+    
+    options may set "max_events" (default 10,000 kept), "max_steps"
+    (default 1,000,000 traced lines), "max_repr" (default 80 characters
+    per value) and "max_variables" (default 50 per frame).
+    """
+    tracer = StepTracer(
+        filename,
+        options.get("max_events", 10000),
+        options.get("max_steps", 1000000),
+        options.get("max_repr", 80),
+        options.get("max_variables", 50)
+    )
+    
+    def after(namespace):
+        tracer.stop()
+        REPORT["trace"] = tracer.results()
+    
+    return run_source(source, filename, tracer.start, after)
+
+class HangSampler:
+    """
+    Samples which submission line is running, to explain timeouts.
+    
+    A SIGPROF timer records the innermost submission line every `interval`
+    seconds of CPU time, keeping the last `window` samples. On SIGUSR1 the
+    current submission stack and a histogram of those samples ("hot
+    lines") are sent on the report descriptor.
+    """
+    
+    def __init__(self, filename: str, interval: float = 0.01, window: int = 300):
+        self.filename = filename
+        self.interval = interval
+        self.samples = collections.deque(maxlen=window)
+        self.enabled = hasattr(signal, "SIGPROF") and hasattr(signal, "SIGUSR1") and REPORT_FD is not None
+    
+    def _innermost(self, frame):
+        while frame is not None and frame.f_code.co_filename != self.filename:
+            frame = frame.f_back
+        return frame
+    
+    def _sample(self, signum, frame):
+        frame = self._innermost(frame)
+        if frame is not None:
+            self.samples.append(frame.f_lineno)
+    
+    def _report(self, signum, frame):
+        stack = [
+            {"line": entry.lineno, "function": entry.name, "source": entry.line}
+            for entry in traceback.extract_stack(frame)
+            if entry.filename == self.filename
+        ]
+        total = len(self.samples)
+        counts = collections.Counter(self.samples)
+        hot_lines = [
+            {
+                "line": line,
+                "samples": count,
+                "percent": 100.0 * count / total,
+                "source": linecache.getline(self.filename, line).strip(),
+            }
+            for line, count in counts.most_common(10)
+        ]
+        send_message({"hang": {
+            "stack": stack,
+            "hot_lines": hot_lines,
+            "samples": total,
+            "sample_interval": self.interval,
+        }})
+    
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        signal.signal(signal.SIGUSR1, self._report)
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+    
+    def stop(self) -> None:
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+def run_main(source: str, filename: str, options) -> int:
+    sampler = HangSampler(filename)
+    return run_source(source, filename, sampler.start, lambda namespace: sampler.stop())
+
+MODES = {
+    "run": run_main,
+    "tests": run_tests,
+    "profile": run_profile,
+    "complexity": run_complexity,
+    "compare": run_compare,
+    "memory": run_memory,
+    "session": run_session,
+    "trace": run_trace,
+}
+
+def main() -> int:
+    header, source = _read_header_and_source()
+    apply_limits(header.get("limits"))
+    mode = MODES[header.get("mode", "run")]
+    return mode(source, header.get("filename", "main.py"), header.get("options") or {})
+
+def _exit_code(exc: SystemExit) -> int:
+    """The status the interpreter would exit with for this SystemExit."""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    sys.stderr.write(f"{exc.code}\n")
+    return 1
+
+def serve(report_fd) -> int:
+    """
+    Run one submission read from stdin and send the report.
+    
+    Returns:
+        Exit status for the process
+    """
+    global REPORT_FD
+    REPORT_FD = report_fd
+    pid = os.getpid()
+    if hasattr(signal, "SIGUSR1"):
+        # The hang report request on timeout; only HangSampler answers it
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    try:
+        try:
+            exit_code = main()
+        except SystemExit as exc:
+            exit_code = _exit_code(exc)
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        write_report(report_fd, pid)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(serve(_report_fd()))
@@ -0,0 +1,129 @@
+"""
+Fork server (zygote) for the fork_server backend.
+
+Started as ``python -I _forkserver.py SOCKET_FD MODULES``. Imports MODULES
+(comma-separated) once, then serves requests on the unix socket SOCKET_FD.
+Each request carries four descriptors: stdin, stdout, stderr and the
+report pipe. The server forks a child that adopts them as its own and runs
+one submission through _bootstrap.serve, and replies with the child's pid.
+Children start with the modules already imported and share their pages
+copy-on-write.
+
+When a child exits, the server appends its exit status to the child's
+report pipe as a JSON line, since only the server can wait for it.
+
+Single-threaded on purpose: fork() is only safe without other threads.
+"""
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+def _load_bootstrap():
+    # The package directory is not on sys.path; load the sibling file directly
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_bootstrap.py")
+    spec = importlib.util.spec_from_file_location("_execution_bootstrap", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+bootstrap = _load_bootstrap()
+
+# Child pid -> this process's copy of the child's report pipe
+_children = {}
+
+def _reap(signum=None, frame=None) -> None:
+    """Collect exited children and append their exit status to their reports."""
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        fd = _children.pop(pid, None)
+        if fd is None:
+            continue
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+        try:
+            os.write(fd, json.dumps({"returncode": returncode}).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+        os.close(fd)
+
+def _run_child(server: socket.socket, fds) -> None:
+    """Become the submission process. Never returns."""
+    exit_code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+        # Own session and process group, so a timeout can kill everything it starts
+        os.setsid()
+        server.close()
+        for fd in _children.values():
+            os.close(fd)
+        stdin_fd, stdout_fd, stderr_fd, report_fd = fds
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in (stdin_fd, stdout_fd, stderr_fd):
+            os.close(fd)
+        exit_code = bootstrap.serve(report_fd)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(exit_code)
+
+def serve_forever(server: socket.socket) -> None:
+    signal.signal(signal.SIGCHLD, _reap)
+    while True:
+        try:
+            message, fds, _, _ = socket.recv_fds(server, 16, 4)
+        except OSError:
+            return
+        if not message:
+            # The backend closed its end
+            return
+        if len(fds) != 4:
+            for fd in fds:
+                os.close(fd)
+            server.sendall(b"error\n")
+            continue
+        
+        # Hold SIGCHLD until the child is registered, or a quick exit
+        # would be reaped before its report pipe is known
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+        try:
+            pid = os.fork()
+            if pid == 0:
+                _run_child(server, fds)
+            _children[pid] = fds[3]
+            for fd in fds[:3]:
+                os.close(fd)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+        server.sendall(f"{pid}\n".encode("ascii"))
+
+def main() -> None:
+    server = socket.socket(fileno=int(sys.argv[1]))
+    modules = [name for name in (sys.argv[2] if len(sys.argv) > 2 else "").split(",") if name]
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            sys.stderr.write(f"WARNING: fork server could not preload {name}: {e}\n")
+    # Keep the garbage collector from touching (and so copying) shared pages in children
+    gc.collect()
+    gc.freeze()
+    serve_forever(server)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Execution backends.
+"""
+from .base import ExecutionBackend
+from .subprocess_backend import SubprocessBackend
+from .warm_pool import WarmPoolBackend
+from .dry_run import DryRunBackend
+from .fork_server import ForkServerBackend
+
+__all__ = [
+    "ExecutionBackend",
+    "SubprocessBackend",
+    "WarmPoolBackend",
+    "DryRunBackend",
+    "ForkServerBackend",
+]
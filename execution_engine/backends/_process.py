@@ -0,0 +1,419 @@
+"""
+Helpers for running a submission in a child interpreter over pipes.
+
+The child runs _bootstrap.py, which reads a JSON header line, the source,
+and then treats the rest of stdin as the program's input. Nothing touches
+the filesystem.
+
+Each child leads its own process group, so a timeout kills everything it
+started. It sends its CPU time, peak memory and any mode results (such as
+test case outcomes) as JSON on a separate report pipe. Before a timed-out
+"run" or "trace" child is killed, it is sent SIGUSR1 and given a moment to
+report where it was stuck, or the trace recorded so far.
+"""
+import json
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+from ..schema import (
+    ExecutionRequest,
+    ExecutionResult,
+    STATUS_SUCCESS,
+    STATUS_ERROR,
+    STATUS_TIMEOUT,
+    STATUS_CANCELLED,
+    MODE_RUN,
+    MODE_TRACE,
+)
+
+BOOTSTRAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "_bootstrap.py")
+
+# Process groups and descriptor passing are POSIX-only
+POSIX = os.name == "posix"
+
+# Seconds between checks of a request's cancel event
+CANCEL_POLL_INTERVAL = 0.1
+
+# Seconds a timed-out child gets to report where it hung before it is killed
+HANG_REPORT_TIMEOUT = 0.5
+
+# Modes whose child answers SIGUSR1, and the report keys it answers with
+TIMEOUT_REPORT_MODES = (MODE_RUN, MODE_TRACE)
+TIMEOUT_REPORT_KEYS = ("hang", "trace")
+
+def bootstrap_command(python_executable: str = sys.executable) -> List[str]:
+    """Command line that starts a child waiting for a submission on stdin."""
+    # -I keeps the package directory and the server's environment off sys.path
+    return [python_executable, "-I", BOOTSTRAP_PATH]
+
+def spawn(python_executable: str = sys.executable, capture_output: bool = True) -> subprocess.Popen:
+    """
+    Start a bootstrap child in a new session, with a report pipe.
+    
+    The read end of the pipe is kept as process.report_fd (None where
+    descriptor passing is unsupported). Without capture_output, the
+    child's stdout and stderr are discarded.
+    """
+    output = subprocess.PIPE if capture_output else subprocess.DEVNULL
+    if not POSIX:
+        process = subprocess.Popen(
+            bootstrap_command(python_executable),
+            stdin=subprocess.PIPE,
+            stdout=output,
+            stderr=output
+        )
+        process.report_fd = None
+        return process
+    
+    read_fd, write_fd = os.pipe()
+    try:
+        process = subprocess.Popen(
+            bootstrap_command(python_executable) + ["--report-fd", str(write_fd)],
+            stdin=subprocess.PIPE,
+            stdout=output,
+            stderr=output,
+            pass_fds=(write_fd,),
+            start_new_session=True
+        )
+    except BaseException:
+        os.close(read_fd)
+        raise
+    finally:
+        os.close(write_fd)
+    process.report_fd = read_fd
+    return process
+
+def kill_group(process: subprocess.Popen) -> None:
+    """Kill the child and anything it started."""
+    if POSIX:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass
+    process.kill()
+
+def discard(process: subprocess.Popen) -> None:
+    """Kill an unused child and release its pipes."""
+    kill_group(process)
+    process.communicate()
+    _close_report(process)
+
+def _close_report(process: subprocess.Popen) -> None:
+    fd = getattr(process, "report_fd", None)
+    if fd is not None:
+        os.close(fd)
+        process.report_fd = None
+
+def report_details(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Mode results from a parsed report, with what a timed-out child reported."""
+    details = report.get("details") or {}
+    for key in TIMEOUT_REPORT_KEYS:
+        if key in report:
+            details[key] = report[key]
+    return details
+
+def parse_report(data: bytes) -> Dict[str, Any]:
+    """
+    Merge the JSON lines written to a report pipe.
+    
+    The child writes one line when it finishes; a fork server adds a line
+    with the exit status. An unterminated line (child killed mid-write) is ignored.
+    """
+    report: Dict[str, Any] = {}
+    for line in data.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            report.update(json.loads(line))
+        except ValueError:
+            continue
+    return report
+
+class _ReportReader(threading.Thread):
+    """
+    Drains the report pipe while the child runs.
+    
+    A report larger than the pipe buffer would otherwise block the child
+    on exit while the parent waits for it to exit. The reader takes over
+    the process's end of the pipe and closes it when done.
+    """
+    
+    # Seconds to wait for the pipe to close once the child has exited
+    JOIN_TIMEOUT = 1.0
+    
+    def __init__(self, process: subprocess.Popen):
+        super().__init__(daemon=True)
+        self.fd = process.report_fd
+        process.report_fd = None
+        self.chunks: List[bytes] = []
+        # Set once a complete line has arrived or the pipe has closed
+        self.line_received = threading.Event()
+    
+    def run(self) -> None:
+        try:
+            while True:
+                chunk = os.read(self.fd, 65536)
+                if not chunk:
+                    break
+                self.chunks.append(chunk)
+                if b"\n" in chunk:
+                    self.line_received.set()
+        except OSError:
+            pass
+        finally:
+            os.close(self.fd)
+            self.line_received.set()
+    
+    def result(self) -> Dict[str, Any]:
+        """Parse the report; empty if the child was killed before writing it."""
+        # A descendant that escaped the process group may still hold the
+        # write end open; do not wait for it
+        self.join(self.JOIN_TIMEOUT)
+        if self.is_alive():
+            return {}
+        return parse_report(b"".join(self.chunks))
+
+def _read_proc_usage(pid: int) -> Dict[str, Any]:
+    """
+    Sample CPU time and peak RSS of a live process from /proc (Linux only).
+    
+    Used just before killing a child that timed out, since it never gets to
+    report its own usage.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        usage: Dict[str, Any] = {"cpu_time": (int(fields[11]) + int(fields[12])) / ticks}
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    usage["max_rss_bytes"] = int(line.split()[1]) * 1024
+                    break
+        return usage
+    except (OSError, ValueError, IndexError):
+        return {}
+
+def build_payload(request: ExecutionRequest) -> bytes:
+    """Encode the header, source and program input sent to the child's stdin."""
+    source = request.code.encode("utf-8")
+    header: Dict[str, Any] = {"source_length": len(source), "mode": request.mode}
+    if request.options:
+        header["options"] = request.options
+    if request.limits is not None:
+        header["limits"] = request.limits.for_timeout(request.timeout)
+    return json.dumps(header).encode("utf-8") + b"\n" + source + request.stdin.encode("utf-8")
+
+def decode_output(output) -> str:
+    """Decode captured output, which may be bytes, str or None."""
+    if output is None:
+        return ""
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output
+
+def communicate(
+    process: subprocess.Popen,
+    request: ExecutionRequest,
+    backend_name: str,
+    start: float
+) -> ExecutionResult:
+    """
+    Send the request to a started bootstrap child and collect its result.
+    """
+    payload = build_payload(request)
+    reader = None
+    if getattr(process, "report_fd", None) is not None:
+        reader = _ReportReader(process)
+        reader.start()
+    deadline = start + request.timeout
+    cancelled = False
+    while True:
+        remaining = max(deadline - time.perf_counter(), 0)
+        if request.cancel_event is not None:
+            wait = min(remaining, CANCEL_POLL_INTERVAL)
+        else:
+            wait = remaining
+        try:
+            # Popen.communicate may be retried after a timeout without losing
+            # output; the input is only passed on the first call
+            stdout, stderr = process.communicate(payload, timeout=wait)
+            break
+        except subprocess.TimeoutExpired:
+            payload = None
+            cancelled = request.cancel_event is not None and request.cancel_event.is_set()
+            if cancelled or time.perf_counter() >= deadline:
+                break
+    
+    if process.returncode is None:
+        if not cancelled and reader is not None and request.mode in TIMEOUT_REPORT_MODES and POSIX:
+            # Ask the child what it was doing (see _bootstrap.HangSampler and StepTracer)
+            try:
+                os.kill(process.pid, signal.SIGUSR1)
+                reader.line_received.wait(HANG_REPORT_TIMEOUT)
+            except ProcessLookupError:
+                pass
+        usage = _read_proc_usage(process.pid)
+        kill_group(process)
+        stdout, stderr = process.communicate()
+        report = reader.result() if reader is not None else {}
+        return ExecutionResult(
+            status=STATUS_CANCELLED if cancelled else STATUS_TIMEOUT,
+            stdout=decode_output(stdout),
+            stderr=decode_output(stderr),
+            duration=time.perf_counter() - start,
+            backend=backend_name,
+            cpu_time=usage.get("cpu_time"),
+            max_rss_bytes=usage.get("max_rss_bytes"),
+            details=report_details(report)
+        )
+    
+    # Stop anything the submission left running in its group
+    kill_group(process)
+    
+    report = reader.result() if reader is not None else {}
+    status = STATUS_SUCCESS if process.returncode == 0 else STATUS_ERROR
+    if POSIX and process.returncode == -signal.SIGXCPU:
+        # RLIMIT_CPU reached: report it the same way as a wall-clock timeout
+        status = STATUS_TIMEOUT
+    return ExecutionResult(
+        status=status,
+        stdout=decode_output(stdout),
+        stderr=decode_output(stderr),
+        returncode=process.returncode,
+        duration=time.perf_counter() - start,
+        backend=backend_name,
+        cpu_time=report.get("cpu_time"),
+        max_rss_bytes=report.get("max_rss_bytes"),
+        details=report_details(report)
+    )
+
+def communicate_fds(
+    pid: int,
+    stdin_fd: int,
+    stdout_fd: int,
+    stderr_fd: int,
+    report_fd: int,
+    request: ExecutionRequest,
+    backend_name: str,
+    start: float
+) -> ExecutionResult:
+    """
+    Run the request on a child that is not our own subprocess.
+    
+    Used by the fork server backend: the child was forked by the server, so
+    it is reached only through its pipes and its process group. Its exit
+    status arrives on the report pipe. Takes ownership of the descriptors.
+    """
+    payload = build_payload(request)
+    os.set_blocking(stdin_fd, False)
+    selector = selectors.DefaultSelector()
+    selector.register(stdin_fd, selectors.EVENT_WRITE)
+    chunks: Dict[int, List[bytes]] = {stdout_fd: [], stderr_fd: [], report_fd: []}
+    for fd in chunks:
+        selector.register(fd, selectors.EVENT_READ)
+    
+    deadline = start + request.timeout
+    stopped_status = None
+    stop_deadline = None
+    # Set once a timed-out child has been asked for its hang report
+    hang_deadline = None
+    usage: Dict[str, Any] = {}
+    offset = 0
+    try:
+        while selector.get_map():
+            now = time.perf_counter()
+            if stopped_status is None:
+                if request.cancel_event is not None and request.cancel_event.is_set():
+                    stopped_status = STATUS_CANCELLED
+                elif now >= deadline and hang_deadline is None and request.mode in TIMEOUT_REPORT_MODES:
+                    # Ask the child what it was doing (see _bootstrap.HangSampler and StepTracer)
+                    hang_deadline = now + HANG_REPORT_TIMEOUT
+                    try:
+                        os.kill(pid, signal.SIGUSR1)
+                    except ProcessLookupError:
+                        pass
+                elif now >= deadline and (hang_deadline is None or now >= hang_deadline
+                                          or b"\n" in b"".join(chunks[report_fd])):
+                    stopped_status = STATUS_TIMEOUT
+                if stopped_status is not None:
+                    usage = _read_proc_usage(pid)
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except (ProcessLookupError, PermissionError):
+                        pass
+                    stop_deadline = now + _ReportReader.JOIN_TIMEOUT
+            elif now >= stop_deadline:
+                # A descendant that escaped the process group holds a pipe open
+                break
+            
+            if stopped_status is not None:
+                wait = stop_deadline - now
+            elif hang_deadline is not None:
+                wait = min(hang_deadline - now, CANCEL_POLL_INTERVAL)
+            elif request.cancel_event is not None:
+                wait = min(deadline - now, CANCEL_POLL_INTERVAL)
+            else:
+                wait = deadline - now
+            
+            for key, _ in selector.select(max(wait, 0)):
+                fd = key.fd
+                if fd == stdin_fd:
+                    try:
+                        offset += os.write(fd, payload[offset:offset + 65536])
+                    except BlockingIOError:
+                        continue
+                    except BrokenPipeError:
+                        offset = len(payload)
+                    if offset >= len(payload):
+                        selector.unregister(fd)
+                        os.close(fd)
+                    continue
+                data = os.read(fd, 65536)
+                if data:
+                    chunks[fd].append(data)
+                else:
+                    selector.unregister(fd)
+                    os.close(fd)
+    finally:
+        for key in list(selector.get_map().values()):
+            selector.unregister(key.fd)
+            os.close(key.fd)
+        selector.close()
+    
+    if stopped_status is None:
+        # Stop anything the submission left running in its group
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    report = parse_report(b"".join(chunks[report_fd]))
+    returncode = report.get("returncode")
+    if stopped_status is not None:
+        status = stopped_status
+    elif returncode == 0:
+        status = STATUS_SUCCESS
+    elif POSIX and returncode == -signal.SIGXCPU:
+        status = STATUS_TIMEOUT
+    else:
+        status = STATUS_ERROR
+    return ExecutionResult(
+        status=status,
+        stdout=decode_output(b"".join(chunks[stdout_fd])),
+        stderr=decode_output(b"".join(chunks[stderr_fd])),
+        returncode=returncode if stopped_status is None else None,
+        duration=time.perf_counter() - start,
+        backend=backend_name,
+        cpu_time=report.get("cpu_time", usage.get("cpu_time")),
+        max_rss_bytes=report.get("max_rss_bytes", usage.get("max_rss_bytes")),
+        details=report_details(report)
+    )
@@ -0,0 +1,27 @@
+"""
+Interface implemented by every execution backend.
+"""
+from abc import ABC, abstractmethod
+
+from ..schema import ExecutionRequest, ExecutionResult
+
+class ExecutionBackend(ABC):
+    """Runs a prepared request and reports the raw outcome."""
+    
+    # Name used to select the backend and to label metrics
+    name = "base"
+    
+    # Whether the engine may serve this backend's results from its cache
+    cacheable = True
+    
+    @abstractmethod
+    def run(self, request: ExecutionRequest) -> ExecutionResult:
+        """
+        Run request.code and return its result.
+        
+        Display handling and metrics are done by the engine; backends only
+        run the code they are given.
+        """
+    
+    def close(self) -> None:
+        """Release processes or other resources held by the backend."""
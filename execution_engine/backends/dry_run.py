@@ -0,0 +1,34 @@
+"""
+In-process dry-run backend: syntax check only, nothing is executed.
+"""
+import time
+import traceback
+
+from .base import ExecutionBackend
+from ..schema import ExecutionRequest, ExecutionResult, STATUS_SUCCESS, STATUS_ERROR
+
+class DryRunBackend(ExecutionBackend):
+    """Compiles the code in the server process without running it."""
+    
+    name = "dry_run"
+    # Compiling is cheaper than hashing and copying a cached result
+    cacheable = False
+    
+    def run(self, request: ExecutionRequest) -> ExecutionResult:
+        start = time.perf_counter()
+        try:
+            compile(request.code, "main.py", "exec")
+        except (SyntaxError, ValueError) as e:
+            return ExecutionResult(
+                status=STATUS_ERROR,
+                stderr="".join(traceback.format_exception_only(type(e), e)),
+                returncode=1,
+                duration=time.perf_counter() - start,
+                backend=self.name
+            )
+        return ExecutionResult(
+            status=STATUS_SUCCESS,
+            returncode=0,
+            duration=time.perf_counter() - start,
+            backend=self.name
+        )
@@ -0,0 +1,140 @@
+"""
+Fork-server backend: children forked from a zygote with modules pre-imported.
+
+A long-lived server process (_forkserver.py) imports a configurable set of
+standard modules once. For each run the backend creates the child's pipes
+and passes them to the server over a unix socket; the server forks a child
+that adopts them. Startup is a fork instead of an interpreter launch, and
+the pre-imported modules are shared copy-on-write.
+
+Every child gets a fresh namespace, its own session and the same resource
+limits as the other backends. POSIX only.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from ._process import communicate_fds
+from .base import ExecutionBackend
+from ..schema import ExecutionRequest, ExecutionResult
+
+FORKSERVER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "_forkserver.py")
+
+# Modules imported by the server before it forks (override with EXECUTION_FORKSERVER_PRELOAD)
+DEFAULT_PRELOAD = [
+    "json",
+    "random",
+    "collections",
+    "datetime",
+    "math",
+    "itertools",
+    "functools",
+    "re",
+    "string",
+    "statistics",
+]
+
+class ForkServerBackend(ExecutionBackend):
+    """Runs each submission in a child forked from a pre-warmed server."""
+    
+    name = "fork_server"
+    
+    def __init__(self, preload: Optional[List[str]] = None, python_executable: str = sys.executable):
+        self.preload = list(DEFAULT_PRELOAD if preload is None else preload)
+        self.python_executable = python_executable
+        self._lock = threading.Lock()
+        self._server: Optional[subprocess.Popen] = None
+        self._socket: Optional[socket.socket] = None
+    
+    def _start_server(self) -> None:
+        """Start the fork server. Called with the lock held."""
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._server = subprocess.Popen(
+                [
+                    self.python_executable,
+                    "-I",
+                    FORKSERVER_PATH,
+                    str(theirs.fileno()),
+                    ",".join(self.preload)
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                pass_fds=(theirs.fileno(),)
+            )
+        except BaseException:
+            ours.close()
+            raise
+        finally:
+            theirs.close()
+        self._socket = ours
+    
+    def _stop_server(self) -> None:
+        """Stop the fork server. Called with the lock held."""
+        if self._socket is not None:
+            # The server exits when its socket closes
+            self._socket.close()
+            self._socket = None
+        if self._server is not None:
+            try:
+                self._server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._server.kill()
+                self._server.wait()
+            self._server = None
+    
+    def start(self) -> None:
+        """Start the server ahead of the first run."""
+        with self._lock:
+            if self._server is None or self._server.poll() is not None:
+                self._stop_server()
+                self._start_server()
+    
+    def _fork(self, fds: List[int]) -> int:
+        """Ask the server to fork a child on these descriptors and return its pid."""
+        with self._lock:
+            for attempt in range(2):
+                if self._server is None or self._server.poll() is not None:
+                    self._stop_server()
+                    self._start_server()
+                try:
+                    socket.send_fds(self._socket, [b"R"], fds)
+                    reply = b""
+                    while not reply.endswith(b"\n"):
+                        chunk = self._socket.recv(64)
+                        if not chunk:
+                            raise ConnectionError("fork server closed the connection")
+                        reply += chunk
+                    return int(reply)
+                except (OSError, ValueError):
+                    # The server died or answered with an error; start a fresh one once
+                    self._stop_server()
+                    if attempt:
+                        raise RuntimeError("Fork server is not responding")
+        raise RuntimeError("Fork server is not responding")
+    
+    def run(self, request: ExecutionRequest) -> ExecutionResult:
+        start = time.perf_counter()
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        report_r, report_w = os.pipe()
+        try:
+            pid = self._fork([stdin_r, stdout_w, stderr_w, report_w])
+        except BaseException:
+            for fd in (stdin_w, stdout_r, stderr_r, report_r):
+                os.close(fd)
+            raise
+        finally:
+            # The child has its own copies now
+            for fd in (stdin_r, stdout_w, stderr_w, report_w):
+                os.close(fd)
+        return communicate_fds(pid, stdin_w, stdout_r, stderr_r, report_r, request, self.name, start)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._stop_server()
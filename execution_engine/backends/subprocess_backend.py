@@ -0,0 +1,22 @@
+"""
+Cold-start backend: one fresh interpreter per run.
+"""
+import sys
+import time
+
+from ._process import spawn, communicate
+from .base import ExecutionBackend
+from ..schema import ExecutionRequest, ExecutionResult
+
+class SubprocessBackend(ExecutionBackend):
+    """Starts the server's interpreter and sends it the code and input over stdin."""
+    
+    name = "subprocess"
+    
+    def __init__(self, python_executable: str = sys.executable):
+        self.python_executable = python_executable
+    
+    def run(self, request: ExecutionRequest) -> ExecutionResult:
+        start = time.perf_counter()
+        process = spawn(self.python_executable)
+        return communicate(process, request, self.name, start)
@@ -0,0 +1,68 @@
+"""
+Warm-pool backend: interpreters started ahead of time, one per run.
+
+Each pooled process has already paid interpreter startup and is blocked
+reading the bootstrap header from stdin. A run takes one process, feeds it
+the source, and a replacement is started in the background. Processes are
+never reused, so runs cannot see each other's state.
+"""
+import collections
+import subprocess
+import sys
+import threading
+import time
+from typing import Deque
+
+from ._process import spawn, discard, communicate
+from .base import ExecutionBackend
+from ..schema import ExecutionRequest, ExecutionResult
+
+class WarmPoolBackend(ExecutionBackend):
+    """Keeps `size` idle interpreters ready to run a submission."""
+    
+    name = "warm_pool"
+    
+    def __init__(self, size: int = 4, python_executable: str = sys.executable):
+        self.size = size
+        self.python_executable = python_executable
+        self._idle: Deque[subprocess.Popen] = collections.deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._idle.append(self._spawn())
+    
+    def _spawn(self) -> subprocess.Popen:
+        return spawn(self.python_executable)
+    
+    def _replenish(self) -> None:
+        process = self._spawn()
+        with self._lock:
+            if self._closed or len(self._idle) >= self.size:
+                discard(process)
+                return
+            self._idle.append(process)
+    
+    def _acquire(self) -> subprocess.Popen:
+        with self._lock:
+            while self._idle:
+                process = self._idle.popleft()
+                if process.poll() is None:
+                    break
+                discard(process)
+            else:
+                process = None
+        threading.Thread(target=self._replenish, daemon=True).start()
+        return process if process is not None else self._spawn()
+    
+    def run(self, request: ExecutionRequest) -> ExecutionResult:
+        start = time.perf_counter()
+        process = self._acquire()
+        return communicate(process, request, self.name, start)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for process in idle:
+            discard(process)
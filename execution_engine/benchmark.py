@@ -0,0 +1,115 @@
+"""
+Startup latency benchmark for the execution backends.
+
+    python -m execution_engine.benchmark --runs 200
+
+Runs the same snippet repeatedly on each backend, one run at a time, and
+reports p50/p99 wall-clock latency. The default snippet imports the modules
+teaching examples typically use, so the fork server's pre-imports count.
+The result cache is not involved: backends are called directly.
+"""
+import argparse
+import json
+import math
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from .backends import ExecutionBackend, SubprocessBackend, WarmPoolBackend, ForkServerBackend
+from .schema import ExecutionRequest, ResourceLimits
+
+DEFAULT_SNIPPET = """\
+import json, random, collections, datetime, math
+counts = collections.Counter(random.randint(1, 6) for _ in range(100))
+print(json.dumps({"sides": len(counts), "sqrt2": math.sqrt(2), "year": datetime.date.today().year > 2000}))
+"""
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+def benchmark_backend(
+    backend: ExecutionBackend,
+    code: str,
+    runs: int,
+    warmup: int = 3,
+    limits: Optional[ResourceLimits] = None
+) -> Dict[str, float]:
+    """
+    Time sequential runs of code on one backend.
+    
+    Returns:
+        Latency summary in milliseconds, plus the number of failed runs
+    """
+    request = ExecutionRequest(code=code, timeout=30, limits=limits)
+    for _ in range(warmup):
+        backend.run(request)
+    
+    samples = []
+    failures = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = backend.run(request)
+        samples.append((time.perf_counter() - start) * 1000)
+        if not result.ok:
+            failures += 1
+    
+    return {
+        "runs": runs,
+        "failures": failures,
+        "p50_ms": percentile(samples, 0.50),
+        "p99_ms": percentile(samples, 0.99),
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": min(samples),
+    }
+
+def run_benchmark(code: str = DEFAULT_SNIPPET, runs: int = 100, pool_size: int = 4) -> Dict[str, Dict[str, float]]:
+    """
+    Compare cold spawn, warm pool and fork server latency.
+    
+    Returns:
+        Backend name to latency summary
+    """
+    limits = ResourceLimits.from_env()
+    results = {}
+    for backend in (SubprocessBackend(), WarmPoolBackend(size=pool_size), ForkServerBackend()):
+        try:
+            if isinstance(backend, ForkServerBackend):
+                backend.start()
+            elif isinstance(backend, WarmPoolBackend):
+                # Let the pool fill before timing it
+                time.sleep(1.0)
+            results[backend.name] = benchmark_backend(backend, code, runs, limits=limits)
+        finally:
+            backend.close()
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare execution backend startup latency.")
+    parser.add_argument("--runs", type=int, default=100, help="Timed runs per backend")
+    parser.add_argument("--pool-size", type=int, default=4, help="Warm pool size")
+    parser.add_argument("--code", help="File with the snippet to run (default: an import-heavy example)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    
+    code = DEFAULT_SNIPPET
+    if args.code:
+        with open(args.code, encoding="utf-8") as f:
+            code = f.read()
+    
+    results = run_benchmark(code, runs=args.runs, pool_size=args.pool_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{'backend':<12} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'failures':>9}")
+    for name, summary in results.items():
+        print(
+            f"{name:<12} {summary['p50_ms']:>9.2f} {summary['p99_ms']:>9.2f} "
+            f"{summary['mean_ms']:>9.2f} {summary['failures']:>9}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Job brokers: the hand-off point between API processes and execution workers.
+
+API processes enqueue requests; workers (``python -m execution_engine.worker``)
+claim them, heartbeat while they run, and store the result. A job whose
+worker stops heartbeating is put back on the queue for another worker.
+
+SQLiteBroker is the bundled implementation. It uses WAL mode, which does not
+work over network filesystems, so the API processes and workers sharing its
+database must run on the same host. Spreading workers across machines needs
+a network broker implementing the Broker interface.
+"""
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from .schema import JOB_QUEUED, JOB_RUNNING, JOB_CANCELLED, JOB_FAILED, FINAL_JOB_STATUSES
+
+class Broker(ABC):
+    """Queue of execution jobs shared by API processes and workers."""
+    
+    @abstractmethod
+    def enqueue(self, job_id: str, request: Dict[str, Any]) -> None:
+        """Add a job holding a serialized ExecutionRequest."""
+    
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Take the oldest queued job for a worker.
+        
+        Returns:
+            (job_id, serialized request), or None if nothing is queued
+        """
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        Record that a worker is still running a job.
+        
+        Returns:
+            True if cancellation of the job has been requested
+        """
+    
+    @abstractmethod
+    def complete(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Store a job's final status and serialized ExecutionResult."""
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's record, or None if it is unknown."""
+    
+    @abstractmethod
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job. A queued job is cancelled at once; a running job's
+        worker sees the request on its next heartbeat.
+        
+        Returns:
+            The job's record, or None if it is unknown
+        """
+    
+    @abstractmethod
+    def requeue_stale(self, heartbeat_timeout: float, max_attempts: int) -> int:
+        """
+        Put running jobs whose worker has stopped heartbeating back on the queue.
+        
+        Jobs already claimed max_attempts times are failed instead.
+        
+        Returns:
+            Number of jobs requeued or failed
+        """
+    
+    @abstractmethod
+    def evict_finished(self, older_than: float) -> int:
+        """Delete final jobs that finished more than older_than seconds ago."""
+    
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Count jobs by status."""
+
+class SQLiteBroker(Broker):
+    """Broker backed by one SQLite database in WAL mode."""
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS execution_jobs (
+                id TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker_id TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                started REAL,
+                heartbeat REAL,
+                finished REAL,
+                result TEXT,
+                error TEXT
+            )
+            ''')
+            conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_execution_jobs_status_created
+            ON execution_jobs (status, created)
+            ''')
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; multi-statement changes use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["request"] = json.loads(record["request"])
+        record["result"] = json.loads(record["result"]) if record["result"] else None
+        record["cancel_requested"] = bool(record["cancel_requested"])
+        return record
+    
+    def enqueue(self, job_id: str, request: Dict[str, Any]) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO execution_jobs (id, request, status, created) VALUES (?, ?, ?, ?)',
+                (job_id, json.dumps(request), JOB_QUEUED, time.time())
+            )
+        finally:
+            conn.close()
+    
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        conn = self._connect()
+        try:
+            # The write lock makes select-then-update atomic across workers
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    'SELECT id, request FROM execution_jobs WHERE status = ? ORDER BY created LIMIT 1',
+                    (JOB_QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                now = time.time()
+                conn.execute(
+                    '''
+                    UPDATE execution_jobs
+                    SET status = ?, worker_id = ?, attempts = attempts + 1, started = ?, heartbeat = ?
+                    WHERE id = ?
+                    ''',
+                    (JOB_RUNNING, worker_id, now, now, row["id"])
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return row["id"], json.loads(row["request"])
+        finally:
+            conn.close()
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE execution_jobs SET heartbeat = ? WHERE id = ? AND worker_id = ? AND status = ?',
+                (time.time(), job_id, worker_id, JOB_RUNNING)
+            )
+            row = conn.execute(
+                'SELECT cancel_requested FROM execution_jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+            return bool(row and row["cancel_requested"])
+        finally:
+            conn.close()
+    
+    def complete(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        conn = self._connect()
+        try:
+            # Ignored if the job was requeued and claimed by another worker meanwhile
+            conn.execute(
+                '''
+                UPDATE execution_jobs SET status = ?, result = ?, error = ?, finished = ?
+                WHERE id = ? AND worker_id = ? AND status = ?
+                ''',
+                (
+                    status,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    worker_id,
+                    JOB_RUNNING
+                )
+            )
+        finally:
+            conn.close()
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM execution_jobs WHERE id = ?', (job_id,)).fetchone()
+            return self._row_to_record(row) if row is not None else None
+        finally:
+            conn.close()
+    
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'UPDATE execution_jobs SET status = ?, finished = ? WHERE id = ? AND status = ?',
+                    (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED)
+                )
+                conn.execute(
+                    'UPDATE execution_jobs SET cancel_requested = 1 WHERE id = ? AND status = ?',
+                    (job_id, JOB_RUNNING)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            row = conn.execute('SELECT * FROM execution_jobs WHERE id = ?', (job_id,)).fetchone()
+            return self._row_to_record(row) if row is not None else None
+        finally:
+            conn.close()
+    
+    def requeue_stale(self, heartbeat_timeout: float, max_attempts: int) -> int:
+        cutoff = time.time() - heartbeat_timeout
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                failed = conn.execute(
+                    '''
+                    UPDATE execution_jobs SET status = ?, error = ?, finished = ?
+                    WHERE status = ? AND heartbeat < ? AND attempts >= ?
+                    ''',
+                    (JOB_FAILED, "Execution worker stopped responding", time.time(), JOB_RUNNING, cutoff, max_attempts)
+                ).rowcount
+                requeued = conn.execute(
+                    '''
+                    UPDATE execution_jobs SET status = ?, worker_id = NULL, started = NULL, heartbeat = NULL
+                    WHERE status = ? AND heartbeat < ?
+                    ''',
+                    (JOB_QUEUED, JOB_RUNNING, cutoff)
+                ).rowcount
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return failed + requeued
+        finally:
+            conn.close()
+    
+    def evict_finished(self, older_than: float) -> int:
+        conn = self._connect()
+        try:
+            placeholders = ", ".join("?" for _ in FINAL_JOB_STATUSES)
+            return conn.execute(
+                f'DELETE FROM execution_jobs WHERE status IN ({placeholders}) AND finished < ?',
+                (*FINAL_JOB_STATUSES, time.time() - older_than)
+            ).rowcount
+        finally:
+            conn.close()
+    
+    def counts(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM execution_jobs GROUP BY status').fetchall()
+            return {row["status"]: row["n"] for row in rows}
+        finally:
+            conn.close()
+
+def broker_from_url(url: str) -> Broker:
+    """
+    Create a broker from a URL such as ``sqlite:////var/lib/app/jobs.db``
+    (absolute path) or ``sqlite:///jobs.db`` (relative to the working directory).
+    
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported execution broker URL: {url}")
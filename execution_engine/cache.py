@@ -0,0 +1,207 @@
+"""
+Result cache for deterministic submissions.
+
+Students re-run unchanged code and starter code is run over and over with
+identical output. A request is eligible for caching only if its AST shows
+no source of nondeterminism (clock, randomness, files, the OS, hash-ordered
+sets, ...). Since some nondeterminism cannot be seen statically (for
+example the default repr of an object includes its address), an entry is
+only served once two runs have produced the same result.
+
+Entries are keyed by ENGINE_VERSION, backend, mode, code, stdin, mode
+options and resource limits, and evicted least recently used first under an entry and byte cap.
+"""
+import ast
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dataclasses import asdict
+
+from .schema import ExecutionRequest, ExecutionResult, STATUS_SUCCESS, STATUS_ERROR, MODE_RUN, MODE_TESTS
+
+# Modules whose use makes output depend on more than code and stdin
+NONDETERMINISTIC_MODULES = {
+    "random", "secrets", "uuid", "time", "datetime", "calendar", "zoneinfo",
+    "os", "sys", "platform", "getpass", "socket", "ssl", "urllib", "http",
+    "subprocess", "multiprocessing", "threading", "concurrent", "asyncio",
+    "signal", "resource", "tempfile", "shutil", "glob", "pathlib", "io",
+    "fileinput", "sqlite3", "importlib", "gc", "tracemalloc", "timeit",
+    "builtins", "ctypes", "inspect",
+}
+
+# Builtins whose results vary between processes or touch the outside world
+NONDETERMINISTIC_BUILTINS = {
+    "open", "id", "hash", "eval", "exec", "compile", "__import__",
+    "globals", "locals", "vars", "breakpoint", "help",
+    # Iteration order of sets of strings changes with hash randomization
+    "set", "frozenset",
+}
+
+# Results with these statuses depend only on the code and input
+CACHEABLE_STATUSES = (STATUS_SUCCESS, STATUS_ERROR)
+
+# Modes whose results are worth reusing; profiling modes must measure every run
+CACHEABLE_MODES = (MODE_RUN, MODE_TESTS)
+
+def is_cacheable(request: ExecutionRequest) -> bool:
+    """Check whether a request's result may be served from the cache."""
+    return request.mode in CACHEABLE_MODES and is_deterministic(request.code)
+
+def is_deterministic(code: str) -> bool:
+    """
+    Check whether code's output can only depend on its source and stdin.
+    
+    Conservative: anything that might be nondeterministic, including code
+    that does not parse, is rejected.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return False
+    
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and (node.module or "").split(".")[0] in NONDETERMINISTIC_MODULES:
+                return False
+        elif isinstance(node, ast.Name):
+            if node.id in NONDETERMINISTIC_BUILTINS:
+                return False
+        elif isinstance(node, ast.Attribute):
+            # e.g. ().__class__.__base__.__subclasses__()
+            if node.attr.startswith("__") and node.attr.endswith("__"):
+                return False
+        elif isinstance(node, (ast.Set, ast.SetComp)):
+            return False
+    return True
+
+def cache_key(request: ExecutionRequest, backend: str, engine_version: str) -> str:
+    """Hash everything that can change the result of a request."""
+    parts = {
+        "engine_version": engine_version,
+        "backend": backend,
+        "mode": request.mode,
+        "code": request.code,
+        "stdin": request.stdin,
+        "options": request.options,
+        "limits": asdict(request.limits) if request.limits is not None else None,
+    }
+    encoded = json.dumps(parts, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def _result_size(result: ExecutionResult) -> int:
+    """Approximate memory held by a cached result, in bytes."""
+    size = len(result.stdout) + len(result.stderr)
+    if result.details:
+        size += len(json.dumps(result.details, default=repr))
+    return size + 256
+
+def _without_timings(value):
+    """Drop per-case "duration" values, which differ between identical runs."""
+    if isinstance(value, dict):
+        return {key: _without_timings(item) for key, item in value.items() if key != "duration"}
+    if isinstance(value, list):
+        return [_without_timings(item) for item in value]
+    return value
+
+def _same_output(a: ExecutionResult, b: ExecutionResult) -> bool:
+    return (
+        a.status == b.status
+        and a.stdout == b.stdout
+        and a.stderr == b.stderr
+        and a.returncode == b.returncode
+        and _without_timings(a.details) == _without_timings(b.details)
+    )
+
+class ResultCache:
+    """Thread-safe LRU cache of execution results with an entry and byte cap."""
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (result, confirmed by a second identical run)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, key: str, timeout: float) -> Optional[ExecutionResult]:
+        """
+        Get a copy of a confirmed result.
+        
+        A result that took longer than timeout to produce is not returned,
+        since the same request would now time out.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry[1] or entry[0].duration > timeout:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return copy.deepcopy(entry[0])
+    
+    def put(self, key: str, result: ExecutionResult) -> None:
+        """Record a fresh result. The first identical repeat confirms it."""
+        if result.status not in CACHEABLE_STATUSES:
+            return
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and _same_output(entry[0], result):
+                self._entries[key] = (entry[0], True)
+                self._entries.move_to_end(key)
+                return
+            
+            self._remove(key)
+            self._entries[key] = (copy.deepcopy(result), False)
+            self._sizes[key] = size
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: str) -> None:
+        """Drop an entry. Called with the lock held."""
+        if key in self._entries:
+            del self._entries[key]
+            self._bytes -= self._sizes.pop(key)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+def cache_from_env() -> Optional[ResultCache]:
+    """
+    Build the cache from EXECUTION_CACHE_ENTRIES (default 1024; 0 disables
+    caching) and EXECUTION_CACHE_MAX_MB (default 64).
+    """
+    max_entries = int(os.environ.get("EXECUTION_CACHE_ENTRIES", "1024"))
+    if max_entries <= 0:
+        return None
+    max_mb = float(os.environ.get("EXECUTION_CACHE_MAX_MB", "64"))
+    return ResultCache(max_entries=max_entries, max_bytes=int(max_mb * 1024 * 1024))
@@ -0,0 +1,82 @@
+"""
+Empirical complexity: fit timings at growing input sizes to complexity classes.
+
+The child ("complexity" mode) times a function at geometrically growing
+sizes n. Each class below is fitted as seconds = a + b * f(n) by least
+squares on relative error, since timings span orders of magnitude; the
+class with the smallest error wins, with ties going to the simpler class.
+"""
+import math
+from typing import Any, Callable, Dict, List, Tuple
+
+# Complexity classes from simplest to most complex
+COMPLEXITY_CLASSES: List[Tuple[str, Callable[[float], float]]] = [
+    ("O(1)", lambda n: 0.0),
+    ("O(log n)", lambda n: math.log(n) if n > 1 else 0.0),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log(n) if n > 1 else 0.0),
+    ("O(n^2)", lambda n: float(n) * n),
+]
+
+# Fewest sizes worth fitting
+MIN_SAMPLES = 4
+
+# A simpler class is preferred unless a more complex one fits this much better
+SIMPLER_CLASS_TOLERANCE = 1.1
+
+def _fit(xs: List[float], ys: List[float]) -> Tuple[float, float]:
+    """
+    Weighted least squares for y = a + b * x with weights 1 / y**2.
+    
+    Returns:
+        (a, b), both non-negative
+    """
+    weights = [1.0 / (y * y) for y in ys]
+    s = sum(weights)
+    sx = sum(w * x for w, x in zip(weights, xs))
+    sy = sum(w * y for w, y in zip(weights, ys))
+    sxx = sum(w * x * x for w, x in zip(weights, xs))
+    sxy = sum(w * x * y for w, x, y in zip(weights, xs, ys))
+    denominator = s * sxx - sx * sx
+    if denominator <= 0:
+        return sy / s, 0.0
+    b = (s * sxy - sx * sy) / denominator
+    a = (sy - b * sx) / s
+    if b < 0:
+        # Time falls with n: no growth at all
+        return sy / s, 0.0
+    if a < 0:
+        return 0.0, sxy / sxx
+    return a, b
+
+def fit_complexity(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fit timing samples ({"n", "seconds"}) to each complexity class.
+    
+    Returns:
+        {"best_fit": class name or None, "fits": [{"complexity",
+        "constant", "coefficient", "error"}] ordered best first}. error is
+        the root mean square of the relative residuals.
+    """
+    points = [(sample["n"], sample["seconds"]) for sample in samples if sample["seconds"] > 0]
+    if len(points) < MIN_SAMPLES:
+        return {
+            "best_fit": None,
+            "fits": [],
+            "reason": f"Need at least {MIN_SAMPLES} input sizes to fit, got {len(points)}"
+        }
+    
+    ys = [seconds for _, seconds in points]
+    fits = []
+    for name, growth in COMPLEXITY_CLASSES:
+        xs = [growth(n) for n, _ in points]
+        a, b = _fit(xs, ys)
+        error = math.sqrt(sum(((y - (a + b * x)) / y) ** 2 for x, y in zip(xs, ys)) / len(ys))
+        fits.append({"complexity": name, "constant": a, "coefficient": b, "error": error})
+    
+    smallest = min(fit["error"] for fit in fits)
+    best = next(fit for fit in fits if fit["error"] <= smallest * SIMPLER_CLASS_TOLERANCE)
+    return {
+        "best_fit": best["complexity"],
+        "fits": sorted(fits, key=lambda fit: fit["error"])
+    }
@@ -0,0 +1,95 @@
+"""
+Name-level dependencies between notebook cells.
+
+A cell depends on an earlier cell if it reads a name the earlier cell
+defines at module level. When a cell changes, the cells to re-run are the
+later ones that read, directly or through other re-run cells, a name it
+defined before or defines now.
+
+The analysis is static and conservative about reads (a name read anywhere
+in a cell, including inside its functions, counts). Mutating an object
+through a method call, such as items.append(x), is not seen as defining it.
+"""
+import ast
+from typing import Iterable, List, Set, Tuple
+
+# Nodes that open a scope of their own; names bound inside them are local
+_NESTED_SCOPES = (ast.Lambda, ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)
+
+def _base_name(node):
+    """The variable at the root of an attribute or subscript chain, e.g. `a` in a.b[0]."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+def _visit(node, module_scope: bool, defines: Set[str], reads: Set[str]) -> None:
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if module_scope:
+                defines.add(child.name)
+            _visit(child, False, defines, reads)
+            continue
+        if isinstance(child, _NESTED_SCOPES):
+            _visit(child, False, defines, reads)
+            continue
+        
+        if isinstance(child, (ast.Import, ast.ImportFrom)):
+            if module_scope:
+                for alias in child.names:
+                    if alias.name != "*":
+                        defines.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(child, ast.Global):
+            # Assigned from inside a function, but the binding is module level
+            defines.update(child.names)
+        elif isinstance(child, ast.Name):
+            if isinstance(child.ctx, ast.Load):
+                reads.add(child.id)
+            elif module_scope:
+                defines.add(child.id)
+        elif isinstance(child, (ast.Attribute, ast.Subscript)) and not isinstance(child.ctx, ast.Load):
+            # a.b = ... or a[0] = ... changes what later readers of `a` see
+            name = _base_name(child)
+            if module_scope and name is not None:
+                defines.add(name)
+        elif isinstance(child, ast.AugAssign) and isinstance(child.target, ast.Name):
+            reads.add(child.target.id)
+        elif isinstance(child, ast.ExceptHandler) and child.name and module_scope:
+            defines.add(child.name)
+        _visit(child, module_scope, defines, reads)
+
+def analyze_cell(code: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Find the module-level names a cell defines and the names it reads.
+    
+    Returns:
+        (defines, reads); both empty if the cell does not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return set(), set()
+    defines: Set[str] = set()
+    reads: Set[str] = set()
+    _visit(tree, True, defines, reads)
+    return defines, reads
+
+def downstream(cells: List[Tuple[Set[str], Set[str]]], start: int, changed: Iterable[str]) -> List[int]:
+    """
+    Find the cells to re-run after the cell at index start changed.
+    
+    Args:
+        cells: (defines, reads) of every cell, in notebook order
+        start: Index of the changed cell
+        changed: Names the changed cell defined before or defines now
+    
+    Returns:
+        Indices of the later cells that depend on the change, in order
+    """
+    changed = set(changed)
+    affected = []
+    for index in range(start + 1, len(cells)):
+        defines, reads = cells[index]
+        if reads & changed:
+            affected.append(index)
+            changed |= defines
+    return affected
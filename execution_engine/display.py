@@ -0,0 +1,56 @@
+"""
+Jupyter-style display of a trailing bare expression.
+
+If the last statement of a submission is an expression such as a variable
+name, the engine appends code that prints its repr after a marker, then
+splits the marker back out of the output.
+"""
+import ast
+from typing import Optional, Tuple
+
+EXPRESSION_MARKER = "__EXPRESSION_RESULT__:"
+
+def is_expression(line: str) -> bool:
+    """Check if a line of code is just an expression (like a variable name)."""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return False
+    
+    try:
+        tree = ast.parse(line)
+        return (len(tree.body) == 1 and
+                isinstance(tree.body[0], ast.Expr) and
+                not isinstance(tree.body[0].value, ast.Call))
+    except SyntaxError:
+        return False
+
+def add_expression_display(code: str) -> Tuple[str, Optional[str]]:
+    """
+    Append code that prints the value of a trailing expression.
+    
+    Returns:
+        (code to run, the trailing expression or None)
+    """
+    code_lines = code.strip().split('\n')
+    non_empty_lines = [line for line in code_lines if line.strip() and not line.strip().startswith('#')]
+    
+    if non_empty_lines and is_expression(non_empty_lines[-1]):
+        expression = non_empty_lines[-1].strip()
+        return code + f"\n\nprint('\\n{EXPRESSION_MARKER}')\nprint(repr({expression}))", expression
+    
+    return code, None
+
+def split_expression_output(stdout: str) -> Tuple[str, Optional[str]]:
+    """
+    Separate regular output from the displayed expression value.
+    
+    Returns:
+        (regular output, expression value or None if no marker was printed)
+    """
+    if EXPRESSION_MARKER not in stdout:
+        return stdout, None
+    
+    parts = stdout.split(EXPRESSION_MARKER)
+    regular_output = parts[0].strip()
+    expr_value = parts[1].strip() if len(parts) > 1 else ""
+    return regular_output, expr_value
@@ -0,0 +1,278 @@
+"""
+The execution engine: picks a backend, applies display handling and records metrics.
+"""
+import dataclasses
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .backends import ExecutionBackend, SubprocessBackend, WarmPoolBackend, DryRunBackend, ForkServerBackend
+from .cache import ResultCache, cache_from_env, cache_key, is_cacheable
+from .complexity import fit_complexity
+from .display import add_expression_display, split_expression_output
+from .metrics import ExecutionMetrics, metrics as default_metrics
+from .schema import (
+    ExecutionRequest,
+    ExecutionResult,
+    ResourceLimits,
+    TestCase,
+    MODE_TESTS,
+    MODE_COMPLEXITY,
+    MODE_COMPARE,
+    STATUS_SUCCESS,
+)
+
+# Bumped whenever a change could alter the output of the same submission;
+# part of every result cache key
+ENGINE_VERSION = "4"
+
+# Seconds allowed on top of a mode's own time limits (test cases, complexity
+# budget) for interpreter startup
+TEST_STARTUP_ALLOWANCE = 2.0
+
+class ExecutionEngine:
+    """Front door for running submissions on any registered backend."""
+    
+    def __init__(
+        self,
+        backends: Dict[str, ExecutionBackend],
+        default_backend: str,
+        metrics: ExecutionMetrics = default_metrics,
+        limits: Optional[ResourceLimits] = None,
+        cache: Optional[ResultCache] = None
+    ):
+        if default_backend not in backends:
+            raise ValueError(f"Unknown default backend: {default_backend}")
+        self.backends = dict(backends)
+        self.default_backend = default_backend
+        self.metrics = metrics
+        # Applied to requests that do not set their own
+        self.limits = limits
+        # Results of deterministic submissions; None disables caching
+        self.cache = cache
+    
+    def register(self, backend: ExecutionBackend) -> None:
+        """Add or replace a backend under its name."""
+        self.backends[backend.name] = backend
+    
+    def execute(self, request: ExecutionRequest) -> ExecutionResult:
+        """
+        Run a request and return its result. Blocking.
+        
+        Raises:
+            ValueError: If the request names an unknown backend
+        """
+        backend_name = request.backend or self.default_backend
+        backend = self.backends.get(backend_name)
+        if backend is None:
+            raise ValueError(f"Unknown execution backend: {backend_name}")
+        
+        expression = None
+        run_request = request
+        if request.limits is None and self.limits is not None:
+            run_request = dataclasses.replace(run_request, limits=self.limits)
+        if request.display_last_expression:
+            code, expression = add_expression_display(request.code)
+            if expression is not None:
+                run_request = dataclasses.replace(
+                    run_request,
+                    code=code,
+                    backend=backend_name,
+                    display_last_expression=False
+                )
+        
+        key = None
+        result = None
+        if self.cache is not None and backend.cacheable and is_cacheable(run_request):
+            key = cache_key(run_request, backend_name, ENGINE_VERSION)
+            start = time.perf_counter()
+            result = self.cache.get(key, run_request.timeout)
+            if result is not None:
+                # Served without starting a process
+                result.duration = time.perf_counter() - start
+                result.details["cached"] = True
+                self.metrics.record_cache_hit(backend_name)
+        
+        if result is None:
+            result = self._run(backend, backend_name, run_request)
+            if key is not None:
+                self.cache.put(key, result)
+        
+        if expression is not None and result.status == STATUS_SUCCESS:
+            output, value = split_expression_output(result.stdout)
+            if value is not None:
+                result.stdout = output
+                result.expression = expression
+                result.expression_value = value
+        
+        return result
+    
+    def _run(self, backend: ExecutionBackend, backend_name: str, request: ExecutionRequest) -> ExecutionResult:
+        """Run a request on a backend, recording metrics."""
+        self.metrics.started()
+        result = None
+        try:
+            result = backend.run(request)
+        finally:
+            if result is not None:
+                self.metrics.record(
+                    backend_name,
+                    result.status,
+                    result.duration,
+                    cpu_time=result.cpu_time,
+                    max_rss_bytes=result.max_rss_bytes
+                )
+            else:
+                self.metrics.record(backend_name, "exception", 0.0)
+        return result
+    
+    def run_tests(
+        self,
+        code: str,
+        cases: List[TestCase],
+        case_timeout: float = 2.0,
+        backend: Optional[str] = None
+    ) -> ExecutionResult:
+        """
+        Check code against many test cases in a single child interpreter.
+        
+        Each case gets a fresh namespace, its own stdin and captured output,
+        and its own time limit. Per-case outcomes are in
+        result.details["tests"], with totals in details["passed"] and
+        details["total"].
+        
+        Args:
+            code: Submission source
+            cases: Test cases to run, in order
+            case_timeout: Seconds per case, for cases that do not set one
+            backend: Backend name; None uses the engine default
+        """
+        case_options = []
+        for case in cases:
+            options = dataclasses.asdict(case)
+            options["timeout"] = case.timeout or case_timeout
+            case_options.append(options)
+        request = ExecutionRequest(
+            code=code,
+            timeout=sum(case["timeout"] for case in case_options) + TEST_STARTUP_ALLOWANCE,
+            backend=backend,
+            mode=MODE_TESTS,
+            options={"cases": case_options}
+        )
+        return self.execute(request)
+    
+    def measure_complexity(
+        self,
+        code: str,
+        function: str,
+        generator: str,
+        budget: float = 2.0,
+        backend: Optional[str] = None,
+        **options
+    ) -> ExecutionResult:
+        """
+        Time a function at geometrically growing input sizes and fit the
+        timings to complexity classes.
+        
+        The samples, why timing stopped and the fits are in
+        result.details["complexity"] (see complexity.fit_complexity).
+        
+        Args:
+            code: Submission source defining the function
+            function: Name of the function to time
+            generator: Expression in n giving the function's argument, or a tuple of arguments, e.g. "(list(range(n)), -1)"
+            budget: Seconds to spend timing
+            backend: Backend name; None uses the engine default
+            **options: Other settings of the child's complexity mode (min_size, max_size, growth, ...)
+        """
+        request = ExecutionRequest(
+            code=code,
+            timeout=budget + TEST_STARTUP_ALLOWANCE,
+            backend=backend,
+            mode=MODE_COMPLEXITY,
+            options=dict(options, function=function, generator=generator, budget=budget)
+        )
+        result = self.execute(request)
+        complexity = result.details.get("complexity")
+        if complexity is not None:
+            complexity.update(fit_complexity(complexity["samples"]))
+        return result
+    
+    def compare(
+        self,
+        code: str,
+        reference: str,
+        stdin: str = "",
+        budget: float = 3.0,
+        backend: Optional[str] = None,
+        **options
+    ) -> ExecutionResult:
+        """
+        Time a submission against a reference solution in one child interpreter.
+        
+        Per-program medians and quartiles, the median ratio (submission /
+        reference) and whether the difference is beyond the noise are in
+        result.details["compare"].
+        
+        Args:
+            code: Submission source
+            reference: Reference solution source
+            stdin: Input given to every run of both programs
+            budget: Seconds to spend timing
+            backend: Backend name; None uses the engine default
+            **options: Other settings of the child's compare mode (rounds, warmup, min_time)
+        """
+        request = ExecutionRequest(
+            code=code,
+            timeout=budget + TEST_STARTUP_ALLOWANCE,
+            backend=backend,
+            mode=MODE_COMPARE,
+            options=dict(options, reference=reference, stdin=stdin, budget=budget)
+        )
+        return self.execute(request)
+    
+    def close(self) -> None:
+        for backend in self.backends.values():
+            backend.close()
+
+_engine: Optional[ExecutionEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> ExecutionEngine:
+    """
+    Get the process-wide engine, creating it on first use.
+    
+    Configured by EXECUTION_BACKEND (default "subprocess"),
+    EXECUTION_POOL_SIZE (warm pool size, default 4; 0 disables the pool)
+    and EXECUTION_FORKSERVER_PRELOAD (comma-separated modules the fork
+    server imports; the fork server is only available on POSIX and is
+    started on first use unless it is the default). Resource limits come from ResourceLimits.from_env() and the result
+    cache from cache_from_env().
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            backends: Dict[str, ExecutionBackend] = {
+                SubprocessBackend.name: SubprocessBackend(),
+                DryRunBackend.name: DryRunBackend(),
+            }
+            pool_size = int(os.environ.get("EXECUTION_POOL_SIZE", "4"))
+            if pool_size > 0:
+                backends[WarmPoolBackend.name] = WarmPoolBackend(size=pool_size)
+            default_backend = os.environ.get("EXECUTION_BACKEND", SubprocessBackend.name)
+            if os.name == "posix":
+                preload = os.environ.get("EXECUTION_FORKSERVER_PRELOAD")
+                fork_server = ForkServerBackend(
+                    preload=[name.strip() for name in preload.split(",")] if preload is not None else None
+                )
+                if default_backend == ForkServerBackend.name:
+                    fork_server.start()
+                backends[ForkServerBackend.name] = fork_server
+            _engine = ExecutionEngine(
+                backends,
+                default_backend=default_backend,
+                limits=ResourceLimits.from_env(),
+                cache=cache_from_env()
+            )
+        return _engine
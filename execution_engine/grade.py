@@ -0,0 +1,82 @@
+"""
+Grade a class's submissions from the command line.
+
+    python -m execution_engine.grade --cases cases.json submissions/
+
+Each .py file is one student's submission, named after the file. Cases are
+a JSON list of objects with TestCase fields. Prints one JSON line per
+student as they finish, then a summary line, and the throughput on stderr.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+from .engine import get_engine
+from .grading import Submission, grade_batch
+from .schema import TestCase
+
+def load_submissions(paths: List[str]) -> List[Submission]:
+    """
+    Read submissions from .py files, or every .py file in a directory.
+    Each student is named after their file, without the extension.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".py")
+            )
+        else:
+            files.append(path)
+    
+    submissions = []
+    for file in files:
+        with open(file, encoding="utf-8", errors="replace") as f:
+            submissions.append(Submission(os.path.splitext(os.path.basename(file))[0], f.read()))
+    return submissions
+
+def load_cases(path: str) -> List[TestCase]:
+    """
+    Read test cases from a JSON list of objects with TestCase fields. A
+    case's return value is checked when it has an "expected_return" key.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    cases = []
+    for index, case in enumerate(data):
+        case = dict(case)
+        case.setdefault("name", f"case {index + 1}")
+        case.setdefault("check_return", "expected_return" in case)
+        cases.append(TestCase(**case))
+    return cases
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Grade many submissions against an exercise's test cases.")
+    parser.add_argument("paths", nargs="+", help="Submission .py files, or directories of them")
+    parser.add_argument("--cases", required=True, help="JSON file with the test cases")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Default seconds per case")
+    parser.add_argument("--workers", type=int, help="Submissions run at once (default: CPU count)")
+    parser.add_argument("--backend", help="Execution backend (default: EXECUTION_BACKEND)")
+    args = parser.parse_args()
+    
+    submissions = load_submissions(args.paths)
+    cases = load_cases(args.cases)
+    engine = get_engine()
+    try:
+        # One JSON line per student as they finish, then the summary
+        for record in grade_batch(submissions, cases, args.timeout, args.backend, args.workers, engine):
+            print(json.dumps(record), flush=True)
+            if record["type"] == "summary":
+                print(
+                    f"Graded {record['submissions']} submissions ({record['unique']} unique) "
+                    f"in {record['duration']:.2f} s: {record['submissions_per_second']:.1f} submissions/s, "
+                    f"{record['passed']} passed every case",
+                    file=sys.stderr
+                )
+    finally:
+        engine.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Batch grading: check a whole class's submissions for one exercise at once.
+
+Submissions are grouped by a fingerprint of their syntax tree, so copies
+that differ only in comments or formatting are run once. The unique ones
+are checked against the exercise's test cases on a pool of threads sized
+to the CPU count, each driving one sandboxed child process, and results
+are yielded per student as they finish, followed by a summary with the
+throughput in submissions per second. The command line front end is
+execution_engine.grade.
+"""
+import ast
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from .engine import ExecutionEngine, get_engine
+from .schema import ExecutionResult, TestCase
+
+@dataclass
+class Submission:
+    """One student's code for the exercise being graded."""
+    student: str
+    code: str
+
+def fingerprint(code: str) -> str:
+    """
+    Hash code's syntax tree, so that formatting and comments do not count.
+    
+    Code that does not parse is hashed as text, with surrounding whitespace removed.
+    """
+    try:
+        text = ast.dump(ast.parse(code))
+    except (SyntaxError, ValueError):
+        text = code.strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def grade_result(result: ExecutionResult, total: int) -> Dict[str, Any]:
+    """Score a test run: the fraction of cases passed."""
+    if "tests" not in result.details:
+        # The code did not compile, or the whole run was stopped
+        return {
+            "status": result.status,
+            "passed": 0,
+            "total": total,
+            "score": 0.0,
+            "error": result.stderr or f"Run ended with status {result.status}",
+            "usage": result.usage()
+        }
+    passed = result.details["passed"]
+    return {
+        "status": result.status,
+        "passed": passed,
+        "total": result.details["total"],
+        "score": passed / result.details["total"] if result.details["total"] else 0.0,
+        "cases": result.details["tests"],
+        "usage": result.usage()
+    }
+
+def grade_batch(
+    submissions: List[Submission],
+    cases: List[TestCase],
+    case_timeout: float = 2.0,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+    engine: Optional[ExecutionEngine] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Check every submission against the test cases, concurrently.
+    
+    Yields one {"type": "result", "student", "fingerprint", "duplicate",
+    "status", "passed", "total", "score", ...} record per submission, in
+    the order they finish, then a {"type": "summary"} record. A duplicate
+    is a submission whose fingerprint matched an earlier one and shares
+    its result. Closing the iterator early cancels the runs not yet started.
+    
+    Args:
+        submissions: Submissions to grade
+        cases: Test cases of the exercise
+        case_timeout: Seconds per case, for cases that do not set one
+        backend: Backend name; None uses the engine default
+        workers: Submissions run at once; None uses the CPU count
+        engine: Engine to run on; None uses get_engine()
+    """
+    engine = engine or get_engine()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    
+    # Fingerprint -> students whose submissions share it, in submission order
+    groups: Dict[str, List[Submission]] = {}
+    for submission in submissions:
+        groups.setdefault(fingerprint(submission.code), []).append(submission)
+    
+    fully_passed = 0
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grading")
+    try:
+        futures = {
+            executor.submit(engine.run_tests, group[0].code, cases, case_timeout, backend): key
+            for key, group in groups.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                grade = grade_result(future.result(), len(cases))
+            except Exception as e:
+                grade = {"status": "error", "passed": 0, "total": len(cases), "score": 0.0, "error": str(e)}
+            for index, submission in enumerate(groups[key]):
+                if grade["total"] and grade["passed"] == grade["total"]:
+                    fully_passed += 1
+                yield {
+                    "type": "result",
+                    "student": submission.student,
+                    "fingerprint": key,
+                    "duplicate": index > 0,
+                    **grade
+                }
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    duration = time.perf_counter() - start
+    yield {
+        "type": "summary",
+        "submissions": len(submissions),
+        "unique": len(groups),
+        "passed": fully_passed,
+        "workers": workers,
+        "duration": duration,
+        "submissions_per_second": len(submissions) / duration if duration > 0 else 0.0
+    }
@@ -0,0 +1,297 @@
+"""
+Asynchronous execution jobs.
+
+Submitting a request returns a Job straight away. JobQueue runs jobs on a
+bounded pool of local threads, each driving one sandboxed child process;
+BrokerJobQueue hands them to standalone workers through a Broker instead.
+Finished jobs are kept for a TTL so clients can poll for the result, then
+evicted.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from .broker import Broker, broker_from_url
+from .engine import ExecutionEngine, get_engine
+from .schema import (
+    ExecutionRequest,
+    ExecutionResult,
+    STATUS_CANCELLED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_FINISHED,
+    JOB_CANCELLED,
+    JOB_FAILED,
+    FINAL_JOB_STATUSES,
+)
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting to run."""
+
+@dataclass
+class Job:
+    """A request submitted for asynchronous execution."""
+    id: str
+    request: ExecutionRequest
+    status: str = JOB_QUEUED
+    result: Optional[ExecutionResult] = None
+    # Set if the engine raised instead of returning a result
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    # Set once the job reaches a final status
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    
+    @property
+    def is_done(self) -> bool:
+        return self.done.is_set()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error,
+            "result": self.result.to_dict() if self.result is not None else None,
+        }
+
+class JobQueue:
+    """Runs execution requests on a bounded worker pool and tracks their results."""
+    
+    def __init__(
+        self,
+        engine: ExecutionEngine,
+        max_workers: int = 4,
+        max_pending: int = 100,
+        ttl: float = 600.0
+    ):
+        """
+        Args:
+            engine: Engine the jobs are run on
+            max_workers: Jobs running at once
+            max_pending: Jobs queued or running before submit is refused
+            ttl: Seconds a finished job is kept for polling
+        """
+        self.engine = engine
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="execution-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+    
+    def _evict_expired(self) -> None:
+        """Drop finished jobs older than the TTL. Called with the lock held."""
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished is not None and job.finished < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+    
+    def submit(self, request: ExecutionRequest) -> Job:
+        """
+        Queue a request and return its job without waiting for it to run.
+        
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._evict_expired()
+            pending = sum(1 for job in self._jobs.values() if not job.is_done)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} execution jobs are already pending")
+            
+            if request.cancel_event is None:
+                request.cancel_event = threading.Event()
+            job = Job(id=uuid.uuid4().hex, request=request)
+            self._jobs[job.id] = job
+        
+        self._executor.submit(self._run, job)
+        return job
+    
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.is_done:
+                # Cancelled while still queued
+                return
+            job.status = JOB_RUNNING
+            job.started = time.time()
+        
+        try:
+            result = self.engine.execute(job.request)
+            status = JOB_CANCELLED if result.status == STATUS_CANCELLED else JOB_FINISHED
+            error = None
+        except Exception as e:
+            result, status, error = None, JOB_FAILED, str(e)
+        
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = status
+            job.finished = time.time()
+            job.done.set()
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id, or None if it is unknown or has expired."""
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. A queued job never starts; a running job's child is killed.
+        
+        Returns:
+            The job, or None if it is unknown or has expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_done:
+                return job
+            job.request.cancel_event.set()
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finished = time.time()
+                job.done.set()
+        return job
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """
+        Block until a job is done or the timeout passes.
+        
+        Returns:
+            The job in its current state, or None if it is unknown
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+    
+    def stats(self) -> Dict[str, int]:
+        """Count the tracked jobs by status."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+    
+    def close(self) -> None:
+        """Cancel unfinished jobs and stop the worker pool."""
+        with self._lock:
+            job_ids = [job_id for job_id, job in self._jobs.items() if not job.is_done]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+class BrokerJobQueue:
+    """
+    JobQueue interface on top of a Broker, for jobs run by standalone workers.
+    
+    Nothing executes in this process; see execution_engine.worker.
+    """
+    
+    # Seconds between broker polls while waiting for a job
+    POLL_INTERVAL = 0.2
+    
+    def __init__(self, broker: Broker, max_pending: int = 100, ttl: float = 600.0):
+        self.broker = broker
+        self.max_pending = max_pending
+        self.ttl = ttl
+    
+    @staticmethod
+    def _to_job(record: Dict[str, Any]) -> Job:
+        job = Job(
+            id=record["id"],
+            request=ExecutionRequest.from_dict(record["request"]),
+            status=record["status"],
+            result=ExecutionResult.from_dict(record["result"]) if record["result"] else None,
+            error=record["error"],
+            created=record["created"],
+            started=record["started"],
+            finished=record["finished"]
+        )
+        if job.status in FINAL_JOB_STATUSES:
+            job.done.set()
+        return job
+    
+    def submit(self, request: ExecutionRequest) -> Job:
+        """
+        Queue a request for the workers.
+        
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        self.broker.evict_finished(self.ttl)
+        counts = self.broker.counts()
+        pending = counts.get(JOB_QUEUED, 0) + counts.get(JOB_RUNNING, 0)
+        if pending >= self.max_pending:
+            raise JobQueueFull(f"{pending} execution jobs are already pending")
+        
+        job_id = uuid.uuid4().hex
+        self.broker.enqueue(job_id, request.to_dict())
+        return self._to_job(self.broker.get(job_id))
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        record = self.broker.get(job_id)
+        return self._to_job(record) if record is not None else None
+    
+    def cancel(self, job_id: str) -> Optional[Job]:
+        record = self.broker.cancel(job_id)
+        return self._to_job(record) if record is not None else None
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job.is_done:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(self.POLL_INTERVAL)
+    
+    def stats(self) -> Dict[str, int]:
+        return self.broker.counts()
+    
+    def close(self) -> None:
+        pass
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """
+    Get the process-wide job queue, creating it on first use.
+    
+    Jobs run on local threads unless EXECUTION_BROKER_URL names a broker
+    (e.g. sqlite:////var/lib/app/jobs.db), in which case they go to
+    standalone workers. Configured by EXECUTION_JOB_WORKERS (local threads,
+    default 4), EXECUTION_JOB_MAX_PENDING (default 100) and
+    EXECUTION_JOB_TTL_SECONDS (default 600).
+    
+    Returns:
+        A JobQueue or BrokerJobQueue
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            max_pending = int(os.environ.get("EXECUTION_JOB_MAX_PENDING", "100"))
+            ttl = float(os.environ.get("EXECUTION_JOB_TTL_SECONDS", "600"))
+            broker_url = os.environ.get("EXECUTION_BROKER_URL")
+            if broker_url:
+                _job_queue = BrokerJobQueue(broker_from_url(broker_url), max_pending=max_pending, ttl=ttl)
+            else:
+                _job_queue = JobQueue(
+                    get_engine(),
+                    max_workers=int(os.environ.get("EXECUTION_JOB_WORKERS", "4")),
+                    max_pending=max_pending,
+                    ttl=ttl
+                )
+        return _job_queue
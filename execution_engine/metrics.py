@@ -0,0 +1,67 @@
+"""
+Execution metrics shared by all backends and routers in a process.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+class ExecutionMetrics:
+    """Thread-safe counters of runs, CPU time and peak memory per backend and status."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backends: Dict[str, Dict[str, Any]] = {}
+        self._in_flight = 0
+        self._cache_hits: Dict[str, int] = {}
+    
+    def started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+    
+    def record(
+        self,
+        backend: str,
+        status: str,
+        duration: float,
+        cpu_time: Optional[float] = None,
+        max_rss_bytes: Optional[int] = None
+    ) -> None:
+        """Record a finished run, with its CPU time and peak memory when known."""
+        with self._lock:
+            self._in_flight -= 1
+            stats = self._backends.setdefault(backend, {
+                "runs": 0,
+                "statuses": {},
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "total_cpu_seconds": 0.0,
+                "max_rss_bytes": 0,
+            })
+            stats["runs"] += 1
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            if cpu_time is not None:
+                stats["total_cpu_seconds"] += cpu_time
+            if max_rss_bytes is not None:
+                stats["max_rss_bytes"] = max(stats["max_rss_bytes"], max_rss_bytes)
+    
+    def record_cache_hit(self, backend: str) -> None:
+        """Record a request answered from the result cache instead of a run."""
+        with self._lock:
+            self._cache_hits[backend] = self._cache_hits.get(backend, 0) + 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a copy of the current counters."""
+        with self._lock:
+            backends = {}
+            for name, stats in self._backends.items():
+                backends[name] = dict(stats, statuses=dict(stats["statuses"]))
+                backends[name]["mean_seconds"] = stats["total_seconds"] / stats["runs"]
+            return {
+                "in_flight": self._in_flight,
+                "backends": backends,
+                "cache_hits": dict(self._cache_hits)
+            }
+
+# Metrics for this process
+metrics = ExecutionMetrics()
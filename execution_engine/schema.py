@@ -0,0 +1,188 @@
+"""
+Request and result types shared by every execution backend.
+"""
+import math
+import os
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+# Result statuses
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_CANCELLED = "cancelled"
+
+# Execution modes understood by the child bootstrap
+MODE_RUN = "run"
+MODE_TESTS = "tests"
+MODE_PROFILE = "profile"
+MODE_COMPLEXITY = "complexity"
+MODE_COMPARE = "compare"
+MODE_MEMORY = "memory"
+MODE_SESSION = "session"
+MODE_TRACE = "trace"
+
+# Asynchronous job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+FINAL_JOB_STATUSES = (JOB_FINISHED, JOB_CANCELLED, JOB_FAILED)
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    """Read an integer setting; an empty value means no limit."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    value = value.strip()
+    return int(value) if value else None
+
+@dataclass
+class ResourceLimits:
+    """
+    Hard limits applied to the child interpreter with setrlimit.
+    
+    None leaves a limit at the server's own value.
+    """
+    # RLIMIT_AS: address space, in bytes
+    memory_bytes: Optional[int] = None
+    # RLIMIT_CPU: CPU seconds; None derives it from the request timeout
+    cpu_seconds: Optional[int] = None
+    # RLIMIT_NPROC: processes for the user; 0 forbids fork and threads
+    max_processes: Optional[int] = None
+    # RLIMIT_FSIZE: largest file the program may write, in bytes
+    max_file_bytes: Optional[int] = None
+    
+    @classmethod
+    def from_env(cls) -> "ResourceLimits":
+        """
+        Build the default limits from the environment.
+        
+        EXECUTION_MEMORY_LIMIT_MB (default 512), EXECUTION_CPU_LIMIT_SECONDS
+        (default: timeout rounded up, plus one), EXECUTION_MAX_PROCESSES
+        (default 0) and EXECUTION_MAX_FILE_MB (default 10). An empty value
+        disables that limit.
+        """
+        memory_mb = _env_int("EXECUTION_MEMORY_LIMIT_MB", 512)
+        file_mb = _env_int("EXECUTION_MAX_FILE_MB", 10)
+        return cls(
+            memory_bytes=memory_mb * 1024 * 1024 if memory_mb is not None else None,
+            cpu_seconds=_env_int("EXECUTION_CPU_LIMIT_SECONDS", None),
+            max_processes=_env_int("EXECUTION_MAX_PROCESSES", 0),
+            max_file_bytes=file_mb * 1024 * 1024 if file_mb is not None else None
+        )
+    
+    def for_timeout(self, timeout: float) -> Dict[str, Optional[int]]:
+        """Get the limits to send to the child for a run with this timeout."""
+        limits = asdict(self)
+        if limits["cpu_seconds"] is None:
+            # A CPU-bound loop is stopped by the kernel even if the parent is slow to notice
+            limits["cpu_seconds"] = math.ceil(timeout) + 1
+        return limits
+
+@dataclass
+class TestCase:
+    """
+    One input to check a submission against in MODE_TESTS.
+    
+    The submission is run with `stdin`; if `call` names a function it is
+    then called with `args` and `kwargs`. A case passes if nothing raised,
+    the output matches `expected_output` (when given) and the return value
+    equals `expected_return` (when `check_return` is set).
+    """
+    name: Optional[str] = None
+    stdin: str = ""
+    call: Optional[str] = None
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    expected_output: Optional[str] = None
+    expected_return: Any = None
+    check_return: bool = False
+    # Seconds; None uses the run's per-case default
+    timeout: Optional[float] = None
+
+@dataclass
+class ExecutionRequest:
+    """A piece of Python source to run."""
+    code: str
+    timeout: float = 5.0
+    # Text the program reads from standard input
+    stdin: str = ""
+    # Backend name; None uses the engine default
+    backend: Optional[str] = None
+    # Show the value of a trailing bare expression, as Jupyter does
+    display_last_expression: bool = False
+    # Limits for the child process; None uses the engine's limits
+    limits: Optional[ResourceLimits] = None
+    # How the child runs the code (MODE_RUN, MODE_TESTS, ...) and the mode's settings
+    mode: str = MODE_RUN
+    options: Dict[str, Any] = field(default_factory=dict)
+    # Set to stop the run early; backends poll it while the child runs
+    cancel_event: Optional[threading.Event] = field(default=None, repr=False, compare=False)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form, for sending the request to another process."""
+        return {
+            "code": self.code,
+            "timeout": self.timeout,
+            "stdin": self.stdin,
+            "backend": self.backend,
+            "display_last_expression": self.display_last_expression,
+            "limits": asdict(self.limits) if self.limits is not None else None,
+            "mode": self.mode,
+            "options": self.options,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExecutionRequest":
+        limits = data.get("limits")
+        return cls(
+            code=data["code"],
+            timeout=data.get("timeout", 5.0),
+            stdin=data.get("stdin", ""),
+            backend=data.get("backend"),
+            display_last_expression=data.get("display_last_expression", False),
+            limits=ResourceLimits(**limits) if limits is not None else None,
+            mode=data.get("mode", MODE_RUN),
+            options=data.get("options") or {}
+        )
+
+@dataclass
+class ExecutionResult:
+    """The outcome of running an ExecutionRequest."""
+    status: str
+    stdout: str = ""
+    stderr: str = ""
+    returncode: Optional[int] = None
+    # Wall-clock seconds spent by the backend
+    duration: float = 0.0
+    backend: str = ""
+    # CPU seconds (user + system) and peak resident memory of the child, when known
+    cpu_time: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    # Jupyter-style display of the trailing expression, if requested and present
+    expression: Optional[str] = None
+    expression_value: Optional[str] = None
+    # Backend-specific extras
+    details: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_SUCCESS
+    
+    def usage(self) -> Dict[str, Any]:
+        """Resource accounting for this run."""
+        return {
+            "wall_time": self.duration,
+            "cpu_time": self.cpu_time,
+            "max_rss_bytes": self.max_rss_bytes
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExecutionResult":
+        return cls(**data)
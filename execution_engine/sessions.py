@@ -0,0 +1,498 @@
+"""
+Persistent notebook sessions.
+
+A session is a long-lived sandboxed interpreter (the bootstrap's "session"
+mode) whose namespace survives between cells, so running cell 5 does not
+mean re-running cells 1-4. Cells may be given ids: editing an identified
+cell re-runs it and only the later cells that depend on it (see
+dependencies). Each session has a memory cap and a CPU budget for its
+whole life. Sessions idle for longer than a TTL are closed, and
+the least recently used session is closed when a new one would exceed the
+session cap.
+"""
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .backends._process import POSIX, spawn, discard, kill_group
+from .dependencies import analyze_cell, downstream
+from .schema import ResourceLimits, MODE_SESSION, STATUS_ERROR, STATUS_TIMEOUT
+
+# Seconds a cell may overrun its timeout before the session is killed. The
+# child stops a cell with SIGALRM; this covers code the alarm cannot interrupt.
+RESPONSE_GRACE = 2.0
+
+class SessionClosed(Exception):
+    """Raised when running a cell on a session whose interpreter has exited."""
+
+@dataclass
+class Cell:
+    """A notebook cell kept by a session so it can be re-run when its inputs change."""
+    id: str
+    code: str
+    stdin: str = ""
+    timeout: float = 5.0
+    # Module-level names the cell binds, and names it reads
+    defines: Set[str] = field(default_factory=set)
+    reads: Set[str] = field(default_factory=set)
+    execution_count: Optional[int] = None
+    status: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cell_id": self.id,
+            "defines": sorted(self.defines),
+            "reads": sorted(self.reads),
+            "execution_count": self.execution_count,
+            "status": self.status,
+        }
+
+class Session:
+    """One sandboxed interpreter that runs cells against a persistent namespace."""
+    
+    def __init__(self, session_id: str, limits: ResourceLimits, python_executable: str = sys.executable):
+        """
+        Args:
+            session_id: Identifier clients use to address the session
+            limits: Limits for the interpreter; cpu_seconds is the session's whole budget
+            python_executable: Interpreter to start
+        
+        Raises:
+            SessionClosed: If the interpreter could not be started
+        """
+        self.id = session_id
+        self.limits = limits
+        self.created = time.time()
+        self.last_used = self.created
+        self.execution_count = 0
+        self.memory_bytes: Optional[int] = None
+        self.cpu_time: Optional[float] = None
+        # Held while a cell runs; cells of one session run one at a time
+        self.lock = threading.Lock()
+        # Identified cells in notebook order, and a lock held while they change or re-run
+        self.cells: "OrderedDict[str, Cell]" = OrderedDict()
+        self.cells_lock = threading.Lock()
+        self._buffer = b""
+        self._closed = False
+        
+        self.process = spawn(python_executable, capture_output=False)
+        header = {"source_length": 0, "mode": MODE_SESSION, "limits": asdict(limits)}
+        try:
+            self.process.stdin.write(json.dumps(header).encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+        except OSError:
+            self._terminate()
+            raise SessionClosed("Session interpreter failed to start")
+    
+    @property
+    def alive(self) -> bool:
+        return not self._closed and self.process.poll() is None
+    
+    @property
+    def busy(self) -> bool:
+        """Whether a cell or a re-run of dependent cells is in progress."""
+        return self.lock.locked() or self.cells_lock.locked()
+    
+    def _terminate(self) -> None:
+        """Kill the interpreter and release its pipes."""
+        if not self._closed:
+            self._closed = True
+            discard(self.process)
+    
+    def _read_response(self, deadline: float) -> Optional[Dict[str, Any]]:
+        """
+        Read the next JSON line from the report pipe.
+        
+        Returns:
+            The decoded line, or None if the deadline passed or the interpreter exited
+        """
+        fd = self.process.report_fd
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 65536)
+            if not data:
+                return None
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+    
+    def execute(self, code: str, stdin: str = "", timeout: float = 5.0, delete: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Run a cell in the session's namespace.
+        
+        Args:
+            code: The cell's source
+            stdin: Input for the cell
+            timeout: Seconds the cell may run
+            delete: Names removed from the namespace before the cell runs
+        
+        Returns:
+            The cell's outcome: status, stdout, stderr, error, expression_value
+            (if the cell ended with an expression), execution_count, duration,
+            memory_bytes, cpu_time and whether the session is still alive
+        
+        Raises:
+            SessionClosed: If the interpreter has already exited
+        """
+        with self.lock:
+            if not self.alive:
+                raise SessionClosed(f"Session {self.id} has ended")
+            self.last_used = time.time()
+            source = code.encode("utf-8")
+            frame = {"source_length": len(source), "timeout": timeout, "stdin": stdin}
+            if delete:
+                frame["delete"] = sorted(delete)
+            start = time.perf_counter()
+            try:
+                self.process.stdin.write(json.dumps(frame).encode("utf-8") + b"\n" + source)
+                self.process.stdin.flush()
+                response = self._read_response(start + timeout + RESPONSE_GRACE)
+            except (OSError, ValueError):
+                response = None
+            
+            if response is None:
+                try:
+                    # The pipe can close a moment before the exit is visible
+                    returncode = self.process.wait(timeout=0.5)
+                except subprocess.TimeoutExpired:
+                    returncode = None
+                self._terminate()
+                if returncode is None:
+                    error = f"Cell did not stop after {timeout} seconds; the session has ended"
+                    status = STATUS_TIMEOUT
+                elif POSIX and returncode == -signal.SIGXCPU:
+                    error = "Session used up its CPU time budget; the session has ended"
+                    status = STATUS_TIMEOUT
+                else:
+                    # e.g. killed for memory, or the cell called os._exit()
+                    error = f"Session interpreter exited with status {returncode}; the session has ended"
+                    status = STATUS_ERROR
+                return {
+                    "status": status,
+                    "stdout": "",
+                    "stderr": "",
+                    "error": error,
+                    "duration": time.perf_counter() - start,
+                    "session_alive": False
+                }
+            
+            self.execution_count = response.get("execution_count", self.execution_count + 1)
+            self.memory_bytes = response.get("memory_bytes")
+            self.cpu_time = response.get("cpu_time")
+            self.last_used = time.time()
+            response["session_alive"] = True
+            return response
+    
+    def _run_cells(self, cells: List[Cell], delete: Set[str]) -> List[Dict[str, Any]]:
+        """Run cells in order, stopping if the session ends. Called with cells_lock held."""
+        outcomes = []
+        for cell in cells:
+            outcome = self.execute(cell.code, cell.stdin, cell.timeout, delete)
+            delete = set()
+            outcome["cell_id"] = cell.id
+            cell.execution_count = outcome.get("execution_count")
+            cell.status = outcome["status"]
+            outcomes.append(outcome)
+            if not outcome["session_alive"]:
+                break
+        return outcomes
+    
+    def run_cell(self, cell_id: str, code: str, stdin: str = "", timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """
+        Add or edit an identified cell and run it, then re-run the later
+        cells that depend on it.
+        
+        A new cell is appended to the notebook. Names the cell defined
+        before the edit but no longer does are removed from the namespace.
+        
+        Returns:
+            Outcomes (see execute) of the cells run, in order, each with its cell_id
+        
+        Raises:
+            SessionClosed: If the interpreter has already exited
+        """
+        defines, reads = analyze_cell(code)
+        with self.cells_lock:
+            cell = self.cells.get(cell_id)
+            if cell is None:
+                cell = self.cells[cell_id] = Cell(id=cell_id, code=code)
+                previous: Set[str] = set()
+            else:
+                previous = cell.defines
+            cell.code, cell.stdin, cell.timeout = code, stdin, timeout
+            cell.defines, cell.reads = defines, reads
+            
+            order = list(self.cells.values())
+            start = order.index(cell)
+            affected = downstream([(c.defines, c.reads) for c in order], start, previous | defines)
+            return self._run_cells([cell] + [order[index] for index in affected], previous - defines)
+    
+    def delete_cell(self, cell_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Remove an identified cell, drop the names it defined and re-run the
+        later cells that depended on them.
+        
+        Returns:
+            Outcomes of the cells re-run, or None if the cell is unknown
+        """
+        with self.cells_lock:
+            cell = self.cells.get(cell_id)
+            if cell is None:
+                return None
+            order = list(self.cells.values())
+            start = order.index(cell)
+            affected = downstream([(c.defines, c.reads) for c in order], start, cell.defines)
+            del self.cells[cell_id]
+            if not affected:
+                if cell.defines and self.alive:
+                    # Nothing to re-run; drop the names with an empty cell
+                    self.execute("", delete=cell.defines)
+                return []
+            return self._run_cells([order[index] for index in affected], cell.defines)
+    
+    def close(self) -> None:
+        """End the session, interrupting a running cell."""
+        # Killing first makes a running cell return, releasing the lock
+        if not self._closed:
+            kill_group(self.process)
+        with self.lock:
+            self._terminate()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "created": self.created,
+            "last_used": self.last_used,
+            "execution_count": self.execution_count,
+            "memory_bytes": self.memory_bytes,
+            "cpu_time": self.cpu_time,
+            "alive": self.alive,
+            "cells": [cell.to_dict() for cell in self.cells.values()],
+        }
+
+class SessionManager:
+    """Bounded set of live sessions with idle expiry and LRU eviction."""
+    
+    def __init__(
+        self,
+        max_sessions: int = 20,
+        idle_ttl: float = 900.0,
+        limits: Optional[ResourceLimits] = None,
+        python_executable: str = sys.executable
+    ):
+        """
+        Args:
+            max_sessions: Live sessions kept; creating one more closes the least recently used
+            idle_ttl: Seconds without a cell after which a session is closed
+            limits: Limits for each session's interpreter
+            python_executable: Interpreter sessions run in
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.limits = limits if limits is not None else ResourceLimits()
+        self.python_executable = python_executable
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+    
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(min(60.0, max(self.idle_ttl / 2, 1.0))):
+            self.evict_idle()
+    
+    def create(self) -> Session:
+        """
+        Start a new session.
+        
+        Raises:
+            RuntimeError: If sessions are not supported on this platform
+            SessionClosed: If the interpreter could not be started
+        """
+        if not POSIX:
+            raise RuntimeError("Execution sessions require a POSIX platform")
+        self.evict_idle()
+        session = Session(uuid.uuid4().hex, self.limits, self.python_executable)
+        victims: List[Session] = []
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                _, victim = self._sessions.popitem(last=False)
+                victims.append(victim)
+            self._evicted += len(victims)
+        for victim in victims:
+            victim.close()
+        return session
+    
+    def get(self, session_id: str) -> Optional[Session]:
+        """Get a live session and mark it most recently used."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+    
+    def execute(self, session_id: str, code: str, stdin: str = "", timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        """
+        Run a cell in a session.
+        
+        Returns:
+            The cell's outcome (see Session.execute), or None if the session is unknown
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+        try:
+            outcome = session.execute(code, stdin, timeout)
+        except SessionClosed:
+            outcome = None
+        self._forget_if_ended(session)
+        return outcome
+    
+    def run_cell(
+        self,
+        session_id: str,
+        cell_id: str,
+        code: str,
+        stdin: str = "",
+        timeout: float = 5.0
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Add or edit an identified cell and re-run what depends on it.
+        
+        Returns:
+            Outcomes of the cells run (see Session.run_cell), or None if the session is unknown
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+        try:
+            outcomes = session.run_cell(cell_id, code, stdin, timeout)
+        except SessionClosed:
+            outcomes = None
+        self._forget_if_ended(session)
+        return outcomes
+    
+    def delete_cell(self, session_id: str, cell_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Remove an identified cell and re-run the cells that depended on it.
+        
+        Returns:
+            Outcomes of the cells re-run, or None if the session or cell is unknown
+        """
+        session = self.get(session_id)
+        if session is None:
+            return None
+        try:
+            outcomes = session.delete_cell(cell_id)
+        except SessionClosed:
+            outcomes = []
+        self._forget_if_ended(session)
+        return outcomes
+    
+    def _forget_if_ended(self, session: Session) -> None:
+        """Drop a session whose interpreter has exited, so clients start a new one."""
+        if not session.alive:
+            with self._lock:
+                if self._sessions.get(session.id) is session:
+                    del self._sessions[session.id]
+    
+    def close(self, session_id: str) -> bool:
+        """
+        End a session.
+        
+        Returns:
+            False if the session is unknown
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+    
+    def evict_idle(self) -> int:
+        """
+        Close sessions idle for longer than the TTL, and any whose interpreter died.
+        
+        Returns:
+            Number of sessions closed
+        """
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            expired = [
+                session for session in self._sessions.values()
+                if not session.busy and (session.last_used < cutoff or not session.alive)
+            ]
+            for session in expired:
+                del self._sessions[session.id]
+            self._expired += len(expired)
+        for session in expired:
+            session.close()
+        return len(expired)
+    
+    def sessions(self) -> List[Session]:
+        with self._lock:
+            return list(self._sessions.values())
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "live": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
+    
+    def close_all(self) -> None:
+        """Stop the reaper and end every session."""
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+_session_manager: Optional[SessionManager] = None
+_session_manager_lock = threading.Lock()
+
+def get_session_manager() -> SessionManager:
+    """
+    Get the process-wide session manager, creating it on first use.
+    
+    Configured by EXECUTION_MAX_SESSIONS (default 20),
+    EXECUTION_SESSION_IDLE_SECONDS (default 900), EXECUTION_SESSION_MEMORY_MB
+    (memory cap per session, default 256) and EXECUTION_SESSION_CPU_SECONDS
+    (CPU budget per session, default 600). Other limits come from the
+    execution environment defaults.
+    """
+    global _session_manager
+    with _session_manager_lock:
+        if _session_manager is None:
+            memory_mb = int(os.environ.get("EXECUTION_SESSION_MEMORY_MB", "256"))
+            limits = ResourceLimits.from_env()
+            limits.memory_bytes = memory_mb * 1024 * 1024
+            limits.cpu_seconds = int(os.environ.get("EXECUTION_SESSION_CPU_SECONDS", "600"))
+            _session_manager = SessionManager(
+                max_sessions=int(os.environ.get("EXECUTION_MAX_SESSIONS", "20")),
+                idle_ttl=float(os.environ.get("EXECUTION_SESSION_IDLE_SECONDS", "900")),
+                limits=limits
+            )
+        return _session_manager
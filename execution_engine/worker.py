@@ -0,0 +1,181 @@
+"""
+Standalone execution worker.
+
+Pulls jobs from a broker and runs them on the local engine, so execution
+can be moved off the API hosts and scaled separately:
+
+    python -m execution_engine.worker --broker sqlite:////var/lib/app/jobs.db --concurrency 8
+
+While a job runs, the worker heartbeats it and watches for cancellation.
+Every worker also requeues jobs whose worker has stopped heartbeating.
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from .broker import Broker, broker_from_url
+from .engine import ExecutionEngine, get_engine
+from .schema import ExecutionRequest, STATUS_CANCELLED, JOB_FINISHED, JOB_CANCELLED, JOB_FAILED
+
+class Worker:
+    """Claims jobs from a broker and runs up to `concurrency` of them at once."""
+    
+    def __init__(
+        self,
+        broker: Broker,
+        engine: ExecutionEngine,
+        concurrency: int = 4,
+        poll_interval: float = 0.2,
+        heartbeat_interval: float = 2.0,
+        heartbeat_timeout: float = 10.0,
+        max_attempts: int = 3,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Args:
+            broker: Where jobs come from and results go
+            engine: Engine the jobs run on
+            concurrency: Jobs run at once
+            poll_interval: Seconds to wait before polling an empty queue again
+            heartbeat_interval: Seconds between heartbeats of running jobs
+            heartbeat_timeout: Seconds without a heartbeat before a job is requeued
+            max_attempts: Claims after which a job whose worker died is failed
+            worker_id: Identifier stored with claimed jobs (default host:pid:random)
+        """
+        self.broker = broker
+        self.engine = engine
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(concurrency)
+        # Stops claiming jobs
+        self._stop = threading.Event()
+        # Stops heartbeats; set only once running jobs have drained, so
+        # they are not requeued while the worker finishes them
+        self._heartbeat_stop = threading.Event()
+    
+    def _run_job(self, job_id: str, request: ExecutionRequest) -> None:
+        try:
+            result = self.engine.execute(request)
+            status = JOB_CANCELLED if result.status == STATUS_CANCELLED else JOB_FINISHED
+            self.broker.complete(job_id, self.worker_id, status, result=result.to_dict())
+        except Exception as e:
+            traceback.print_exc()
+            self.broker.complete(job_id, self.worker_id, JOB_FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._slots.release()
+    
+    def _fail_job(self, job_id: str, error: str) -> None:
+        """Mark a claimed job failed without running it."""
+        try:
+            self.broker.complete(job_id, self.worker_id, JOB_FAILED, error=error)
+        except Exception as e:
+            print(f"Error failing job {job_id}: {str(e)}")
+    
+    def _heartbeat_loop(self) -> None:
+        """Heartbeat running jobs, pass on cancellations and requeue stale jobs."""
+        while not self._heartbeat_stop.wait(self.heartbeat_interval):
+            with self._lock:
+                running = list(self._running.items())
+            for job_id, cancel_event in running:
+                try:
+                    if self.broker.heartbeat(job_id, self.worker_id):
+                        cancel_event.set()
+                except Exception as e:
+                    print(f"Error sending heartbeat for job {job_id}: {str(e)}")
+            try:
+                self.broker.requeue_stale(self.heartbeat_timeout, self.max_attempts)
+            except Exception as e:
+                print(f"Error requeueing stale jobs: {str(e)}")
+    
+    def run(self) -> None:
+        """Process jobs until stop() is called."""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="execution-worker")
+        try:
+            while not self._stop.is_set():
+                # Only claim a job when there is a free slot to run it
+                if not self._slots.acquire(timeout=self.poll_interval):
+                    continue
+                try:
+                    claimed = self.broker.claim(self.worker_id)
+                except Exception as e:
+                    print(f"Error claiming job: {str(e)}")
+                    claimed = None
+                if claimed is None:
+                    self._slots.release()
+                    self._stop.wait(self.poll_interval)
+                    continue
+                
+                job_id, data = claimed
+                try:
+                    request = ExecutionRequest.from_dict(data)
+                except Exception as e:
+                    # E.g. a job enqueued by a different engine version
+                    self._slots.release()
+                    self._fail_job(job_id, f"Invalid job request: {str(e)}")
+                    continue
+                request.cancel_event = threading.Event()
+                with self._lock:
+                    self._running[job_id] = request.cancel_event
+                executor.submit(self._run_job, job_id, request)
+        finally:
+            executor.shutdown(wait=True)
+            self._stop.set()
+            self._heartbeat_stop.set()
+            heartbeat.join()
+    
+    def stop(self) -> None:
+        """
+        Stop claiming jobs; run() returns once running jobs have finished.
+        They keep heartbeating meanwhile, so no other worker requeues them.
+        """
+        self._stop.set()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run code execution jobs from a broker.")
+    parser.add_argument(
+        "--broker",
+        default=os.environ.get("EXECUTION_BROKER_URL"),
+        help="Broker URL, e.g. sqlite:////var/lib/app/jobs.db (default: EXECUTION_BROKER_URL)"
+    )
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="Jobs run at once")
+    parser.add_argument("--heartbeat-interval", type=float, default=2.0)
+    parser.add_argument("--heartbeat-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+    if not args.broker:
+        parser.error("--broker or EXECUTION_BROKER_URL is required")
+    
+    worker = Worker(
+        broker_from_url(args.broker),
+        get_engine(),
+        concurrency=args.concurrency,
+        heartbeat_interval=args.heartbeat_interval,
+        heartbeat_timeout=args.heartbeat_timeout
+    )
+    # Finish running jobs on SIGTERM instead of leaving them to be requeued
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    print(f"Execution worker {worker.worker_id} started with concurrency {args.concurrency}")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+    finally:
+        get_engine().close()
+
+if __name__ == "__main__":
+    main()
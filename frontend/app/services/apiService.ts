@@ -74,6 +74,17 @@ export const updateTokenUsage = async (tokenData: any) => {
   }
 };
 
+// Send many usage records in one round trip instead of one request per OpenAI call
+export const updateTokenUsageBatch = async (records: any[]) => {
+  try {
+    const response = await api.post('/tokens/batch', records);
+    return response.data;
+  } catch (error) {
+    console.error('Error updating token usage batch:', error);
+    throw error;
+  }
+};
+
 // API function for executing code
 export const executeCode = async (code: string) => {
   try {
@@ -94,5 +105,6 @@ export default {
   fetchExercise,
   fetchTokenUsage,
   updateTokenUsage,
+  updateTokenUsageBatch,
   executeCode,
 }; 
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Request validation of the code execution routes.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import code_execution
+
+CASE = {"stdin": "2\n", "expected_output": "4\n"}
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(code_execution.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+@pytest.mark.parametrize("timeout", [None, 0, -1, code_execution.MAX_TIMEOUT + 1])
+def test_execute_code_rejects_unbounded_timeouts(client, timeout):
+    response = client.post("/api/execute_code", json={"code": "print(1)", "timeout": timeout})
+    assert response.status_code == 422
+
+def test_execute_code_defaults_the_timeout(client):
+    response = client.post("/api/execute_code", json={"code": "print(6 * 7)"})
+    assert response.status_code == 200
+    assert response.json()["output"] == "42\n"
+
+@pytest.mark.parametrize("body", [
+    {"timeout": code_execution.MAX_CASE_TIMEOUT + 1},
+    {"timeout": None},
+    {"cases": [dict(CASE, timeout=0)]},
+    {"cases": [dict(CASE, timeout=code_execution.MAX_CASE_TIMEOUT + 1)]},
+])
+def test_case_timeouts_are_bounded(client, body):
+    submission = {"student": "ada", "code": "print(int(input()) ** 2)"}
+    grading = dict({"submissions": [submission], "cases": [CASE]}, **body)
+    assert client.post("/api/grade_batch", json=grading).status_code == 422
+    tests = dict({"code": submission["code"], "cases": [CASE]}, **body)
+    assert client.post("/api/execute_tests", json=tests).status_code == 422
+
+def test_grade_batch_caps_the_number_of_cases(client):
+    response = client.post("/api/grade_batch", json={
+        "submissions": [{"student": "ada", "code": "print(4)"}],
+        "cases": [CASE] * (code_execution.MAX_BATCH_CASES + 1)
+    })
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+"""
+Feedback payload codecs and shared dictionaries.
+"""
+import json
+import zlib
+
+import pytest
+
+from app.database import compression
+from app.database.compression import (
+    CODEC_NONE,
+    CODEC_ZLIB,
+    CODEC_ZSTD,
+    ZSTD_AVAILABLE,
+    compress,
+    decompress,
+    train_dictionary,
+)
+
+SAMPLES = [
+    json.dumps({
+        "correctness": "INCORRECT" if index % 2 else "CORRECT",
+        "overall_feedback": f"Your loop in exercise {index} runs one step too far.",
+        "detailed_feedback": "Check the range bounds; range(n) stops at n - 1.",
+        "alternative_solutions": [f"for i in range({index}):\n    print(i)"],
+        "mistakes": [{"description": "Off-by-one error", "suggestion": "Use range(len(items))"}],
+    })
+    for index in range(40)
+]
+
+CODECS = [CODEC_ZLIB, pytest.param(CODEC_ZSTD, marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason="zstandard not installed"))]
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_without_dictionary(codec):
+    text = SAMPLES[0] + " unicode: é ✓"
+    assert decompress(compress(text, codec), codec) == text
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_with_trained_dictionary(codec):
+    dictionary = train_dictionary(SAMPLES[:32], codec, size=4096)
+    assert dictionary
+    for text in SAMPLES[32:]:
+        blob = compress(text, codec, dictionary)
+        assert decompress(blob, codec, dictionary) == text
+
+def test_zlib_dictionary_shrinks_small_payloads():
+    dictionary = train_dictionary(SAMPLES[:32], CODEC_ZLIB)
+    assert len(dictionary) <= compression.ZLIB_MAX_DICT_SIZE
+    plain = sum(len(compress(text, CODEC_ZLIB)) for text in SAMPLES[32:])
+    trained = sum(len(compress(text, CODEC_ZLIB, dictionary)) for text in SAMPLES[32:])
+    assert trained < plain
+
+def test_zlib_payload_needs_its_dictionary():
+    dictionary = train_dictionary(SAMPLES[:32], CODEC_ZLIB)
+    blob = compress(SAMPLES[33], CODEC_ZLIB, dictionary)
+    with pytest.raises(zlib.error):
+        decompress(blob, CODEC_ZLIB)
+
+def test_too_few_samples_give_no_dictionary():
+    assert train_dictionary(SAMPLES[:3], CODEC_ZLIB) is None
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        compress("text", "lz4")
+
+@pytest.mark.parametrize("setting, expected", [
+    ("", CODEC_NONE),
+    ("ZLIB", CODEC_ZLIB),
+    ("bogus", CODEC_NONE),
+    ("zstd", CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB),
+])
+def test_configured_codec(setting, expected, monkeypatch):
+    monkeypatch.setenv("FEEDBACK_COMPRESSION", setting)
+    assert compression.get_configured_codec() == expected
+
+def test_misconfigured_codec_warns_once(monkeypatch, capsys):
+    monkeypatch.setattr(compression, "_resolved_codecs", {})
+    monkeypatch.setenv("FEEDBACK_COMPRESSION", "bogus")
+    for _ in range(3):
+        compression.get_configured_codec()
+    assert capsys.readouterr().out.count("WARNING") == 1
@@ -0,0 +1,62 @@
+"""
+Name-level dependencies between notebook cells.
+"""
+from execution_engine.dependencies import analyze_cell, downstream
+
+def test_module_level_bindings_are_defined():
+    defines, reads = analyze_cell(
+        "import numpy as np\n"
+        "from math import sqrt\n"
+        "x = 1\n"
+        "def f(a):\n"
+        "    local = a + y\n"
+        "    return local\n"
+        "class C:\n"
+        "    pass\n"
+        "for i in range(3):\n"
+        "    pass\n"
+    )
+    assert defines == {"np", "sqrt", "x", "f", "C", "i"}
+    # Reads inside functions count; names bound inside them are not module level
+    assert {"y", "range"} <= reads
+    assert "local" not in defines
+
+def test_attribute_and_item_assignment_define_the_base_name():
+    defines, reads = analyze_cell("config.debug = True\nitems[0] = 1\n")
+    assert defines == {"config", "items"}
+
+def test_augmented_assignment_reads_and_defines():
+    defines, reads = analyze_cell("total += 1\n")
+    assert "total" in defines
+    assert "total" in reads
+
+def test_comprehension_variables_are_local():
+    defines, reads = analyze_cell("squares = [n * n for n in values]\n")
+    assert defines == {"squares"}
+    assert "values" in reads
+
+def test_global_statement_defines_the_name():
+    defines, _ = analyze_cell("def reset():\n    global counter\n    counter = 0\n")
+    assert defines == {"reset", "counter"}
+
+def test_unparseable_cell_has_no_names():
+    assert analyze_cell("def (:\n") == (set(), set())
+
+def test_downstream_follows_transitive_reads():
+    cells = [analyze_cell(code) for code in (
+        "x = 1",
+        "y = x + 1",
+        "print('unrelated')",
+        "z = y * 2",
+        "print(z)",
+    )]
+    assert downstream(cells, 0, {"x"}) == [1, 3, 4]
+
+def test_downstream_only_looks_at_later_cells():
+    cells = [analyze_cell(code) for code in ("print(x)", "x = 1", "print(x)")]
+    assert downstream(cells, 1, {"x"}) == [2]
+
+def test_downstream_includes_names_no_longer_defined():
+    # The edited cell used to define `old`; readers of it must re-run and fail
+    cells = [analyze_cell(code) for code in ("new = 1", "print(old)", "print(new)")]
+    assert downstream(cells, 0, cells[0][0] | {"old"}) == [1, 2]
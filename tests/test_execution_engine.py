@@ -0,0 +1,130 @@
+"""
+Running submissions in child interpreters: input, limits and modes.
+"""
+import pytest
+
+from execution_engine import (
+    DryRunBackend,
+    ExecutionEngine,
+    ExecutionRequest,
+    ResourceLimits,
+    SubprocessBackend,
+    TestCase as Case,  # Not "Test*", so pytest does not collect it
+    MODE_MEMORY,
+    MODE_PROFILE,
+    MODE_TRACE,
+    STATUS_ERROR,
+    STATUS_SUCCESS,
+    STATUS_TIMEOUT,
+)
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = ExecutionEngine(
+        {SubprocessBackend.name: SubprocessBackend(), DryRunBackend.name: DryRunBackend()},
+        SubprocessBackend.name
+    )
+    yield engine
+    engine.close()
+
+def run(engine, code, **fields):
+    fields.setdefault("timeout", 5)
+    return engine.execute(ExecutionRequest(code=code, **fields))
+
+def test_stdin_is_fed_to_input(engine):
+    result = run(engine, "name = input()\nprint(f'Hello, {name}!')\nprint(input()[::-1])", stdin="Ada\nabc\n")
+    assert result.status == STATUS_SUCCESS
+    assert result.stdout == "Hello, Ada!\ncba\n"
+    assert result.backend == SubprocessBackend.name
+    assert result.usage()["cpu_time"] is not None
+
+def test_exceptions_are_reported_on_stderr(engine):
+    result = run(engine, "print('before')\n1 / 0\n")
+    assert result.status == STATUS_ERROR
+    assert result.stdout == "before\n"
+    assert "ZeroDivisionError" in result.stderr
+
+def test_timeout_reports_where_the_code_was_stuck(engine):
+    result = run(engine, "x = 0\nwhile True:\n    x += 1\n", timeout=0.5)
+    assert result.status == STATUS_TIMEOUT
+    assert result.duration < 5
+    hang = result.details["hang"]
+    assert hang["stack"][-1]["line"] in (2, 3)
+    assert hang["hot_lines"][0]["line"] in (2, 3)
+
+def test_memory_limit_stops_large_allocations(engine):
+    result = run(
+        engine,
+        "data = bytearray(512 * 1024 * 1024)\nprint('allocated')\n",
+        limits=ResourceLimits(memory_bytes=128 * 1024 * 1024)
+    )
+    assert result.status == STATUS_ERROR
+    assert "MemoryError" in result.stderr
+    assert "allocated" not in result.stdout
+
+def test_last_expression_is_displayed(engine):
+    result = run(engine, "x = 20\nx + 22", display_last_expression=True)
+    assert result.status == STATUS_SUCCESS
+    assert result.expression_value == "42"
+
+def test_dry_run_only_checks_syntax(engine):
+    assert run(engine, "while True: pass", backend=DryRunBackend.name).status == STATUS_SUCCESS
+    result = run(engine, "def f(:\n", backend=DryRunBackend.name)
+    assert result.status == STATUS_ERROR
+    assert "SyntaxError" in result.stderr
+
+def test_unknown_backend_is_rejected(engine):
+    with pytest.raises(ValueError):
+        run(engine, "print(1)", backend="no-such-backend")
+
+def test_test_cases_run_in_one_interpreter(engine):
+    code = "def add(a, b):\n    return a + b\n\ndef spin():\n    while True:\n        pass\n\nprint(int(input()) * 2)\n"
+    result = engine.run_tests(code, [
+        Case(name="double", stdin="21\n", expected_output="42\n"),
+        Case(name="add", stdin="0\n", call="add", args=[1, 2], expected_return=3, check_return=True),
+        Case(name="wrong return", stdin="0\n", call="add", args=[1, 1], expected_return=3, check_return=True),
+        Case(name="raises", stdin="0\n", call="add", args=[1, "x"]),
+        Case(name="slow", stdin="0\n", call="spin", timeout=0.2),
+    ], case_timeout=2)
+    cases = {case["name"]: case for case in result.details["tests"]}
+    assert [cases[name]["passed"] for name in ("double", "add", "wrong return", "raises")] == [True, True, False, False]
+    assert "TypeError" in cases["raises"]["error"]
+    assert cases["slow"]["passed"] is False
+    assert cases["slow"]["timed_out"] is True
+    assert (result.details["passed"], result.details["total"]) == (2, 5)
+
+CODE = "def total(n):\n    t = 0\n    for i in range(n):\n        t += i\n    return t\n\nprint(total(10))\n"
+
+def test_profile_counts_line_hits(engine):
+    result = run(engine, CODE, mode=MODE_PROFILE)
+    hits = {line["line"]: line["hits"] for line in result.details["profile"]["lines"]}
+    assert result.stdout == "45\n"
+    assert hits[4] == 10
+
+def test_memory_mode_reports_peak_and_allocating_lines(engine):
+    result = run(engine, "blocks = [bytearray(1024) for _ in range(1000)]\n", mode=MODE_MEMORY)
+    memory = result.details["memory"]
+    assert memory["peak_bytes"] >= 1000 * 1024
+    assert memory["top_lines"][0]["line"] == 1
+
+def test_trace_records_lines_and_changed_variables(engine):
+    result = run(engine, CODE, mode=MODE_TRACE)
+    trace = result.details["trace"]
+    events = trace["events"]
+    # Steps count lines; call returns are numbered with the line they return from
+    lines = [event["step"] for event in events if event["event"] == "line"]
+    assert lines == list(range(1, trace["steps"] + 1))
+    assert [event["value"] for event in events if event["event"] == "return"][0] == "45"
+    changes = [event.get("changed", {}).get("t") for event in events if event["function"] == "total"]
+    assert "45" in changes
+
+def test_complexity_fits_are_ranked_by_error(engine):
+    result = engine.measure_complexity(
+        "def f(xs):\n    return sum(xs)\n", "f", "list(range(n))", budget=1
+    )
+    complexity = result.details["complexity"]
+    assert len(complexity["samples"]) >= 3
+    errors = [fit["error"] for fit in complexity["fits"]]
+    assert errors == sorted(errors)
+    assert complexity["best_fit"] == complexity["fits"][0]["complexity"]
+    assert complexity["best_fit"] != "O(1)"
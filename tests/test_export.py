@@ -0,0 +1,58 @@
+"""
+Streaming exports under concurrent load.
+
+StreamingResponse may advance a response body on a different worker thread
+for every chunk, while SQLite connections only work on the thread that
+opened them. Exports longer than one database batch must still arrive
+whole while other requests run.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import token_db
+from app.routes import export
+
+ROWS = 1200  # More than the 500-row batches the exports fetch
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(token_db, "DB_PATH", str(tmp_path / "token_usage.db"))
+    asyncio.run(token_db.save_token_usage_batch([
+        {
+            "prompt_tokens": 10,
+            "completion_tokens": 5,
+            "total_tokens": 15,
+            "model": "gpt-4o-mini",
+            "endpoint": "mark_exercise",
+            "exercise_id": f"exercise-{index}",
+        }
+        for index in range(ROWS)
+    ]))
+    app = FastAPI()
+    app.include_router(export.router, prefix="/api")
+    with TestClient(app) as client:
+        yield client
+
+def test_token_usage_export_is_complete_under_concurrent_requests(client):
+    def export_rows(_):
+        response = client.get("/api/export/token_usage", params={"format": "ndjson"})
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.text.splitlines()]
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        exports = list(pool.map(export_rows, range(32)))
+    
+    for rows in exports:
+        assert len(rows) == ROWS
+        assert [row["exercise_id"] for row in rows] == [f"exercise-{index}" for index in range(ROWS)]
+
+def test_csv_export_is_complete(client):
+    response = client.get("/api/export/token_usage", params={"format": "csv"})
+    assert response.status_code == 200
+    # Header row plus one row per record
+    assert len(response.text.splitlines()) == ROWS + 1
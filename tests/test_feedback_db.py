@@ -0,0 +1,172 @@
+"""
+Feedback history pages, full-text search and stored summaries.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.database import feedback_db
+
+EXERCISES = ("loops", "strings", "recursion")
+
+def save(exercise_id, text, correctness="INCORRECT"):
+    return asyncio.run(feedback_db.save_feedback_to_db(
+        exercise_id=exercise_id,
+        code="print('hello')",
+        feedback={"correctness": correctness, "overall_feedback": text},
+        model="gpt-4o-mini"
+    ))
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "feedback.db")
+    monkeypatch.setattr(feedback_db, "DB_PATH", path)
+    monkeypatch.delenv("FEEDBACK_COMPRESSION", raising=False)
+    return path
+
+@pytest.fixture
+def feedback(db_path):
+    """45 rows over three exercises; every row mentions "loop" 1 to 5 times."""
+    return [
+        save(EXERCISES[index % 3], "off by one " + "loop " * (index % 5 + 1))
+        for index in range(45)
+    ]
+
+def all_pages(fetch):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(cursor)
+        items += page["items"]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+def test_history_pages_cover_every_row_newest_first(feedback):
+    items, pages = all_pages(lambda cursor: asyncio.run(
+        feedback_db.get_feedback_page("loops", limit=4, cursor=cursor)
+    ))
+    expected = [row_id for index, row_id in enumerate(feedback) if index % 3 == 0]
+    assert [item["id"] for item in items] == expected[::-1]
+    assert pages == 4
+    assert items[0]["feedback"]["overall_feedback"].startswith("off by one")
+
+def test_summary_only_pages_skip_the_payload(feedback):
+    page = asyncio.run(feedback_db.get_feedback_page("loops", limit=2, summary_only=True))
+    assert set(page["items"][0]) == {"id", "exercise_id", "timestamp", "correctness", "summary"}
+    assert page["items"][0]["correctness"] == "INCORRECT"
+
+def test_history_cursor_rejects_garbage(feedback):
+    with pytest.raises(ValueError):
+        asyncio.run(feedback_db.get_feedback_page("loops", cursor="not-a-cursor"))
+
+def test_search_pages_match_a_single_ranked_query(feedback):
+    for exercise_id in (None, "strings"):
+        items, _ = all_pages(lambda cursor: asyncio.run(
+            feedback_db.search_feedback("loop", exercise_id=exercise_id, limit=4, cursor=cursor)
+        ))
+        everything = asyncio.run(feedback_db.search_feedback("loop", exercise_id=exercise_id, limit=100))
+        assert everything["next_cursor"] is None
+        assert [item["id"] for item in items] == [item["id"] for item in everything["items"]]
+        assert len(items) == (45 if exercise_id is None else 15)
+        if exercise_id is not None:
+            assert {item["exercise_id"] for item in items} == {exercise_id}
+        scores = [item["score"] for item in items]
+        assert scores == sorted(scores)
+        assert "<mark>" in items[0]["snippet"]
+
+def test_search_cursor_ignores_rows_saved_while_paging(feedback):
+    first = asyncio.run(feedback_db.search_feedback("recursion", limit=100))
+    assert first["items"] == []
+    
+    page = asyncio.run(feedback_db.search_feedback("by", limit=10))
+    added = save("loops", "off by one again")
+    seen = [item["id"] for item in page["items"]]
+    cursor = page["next_cursor"]
+    while cursor:
+        page = asyncio.run(feedback_db.search_feedback("by", limit=10, cursor=cursor))
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    assert added not in seen
+    assert sorted(seen) == sorted(feedback)
+
+def test_search_stops_after_max_pages(feedback, monkeypatch):
+    monkeypatch.setattr(feedback_db, "MAX_SEARCH_PAGES", 3)
+    items, pages = all_pages(lambda cursor: asyncio.run(
+        feedback_db.search_feedback("loop", limit=5, cursor=cursor)
+    ))
+    assert pages == 3
+    assert len(items) == 15
+
+def test_search_rejects_empty_queries_and_bad_cursors(feedback):
+    with pytest.raises(ValueError):
+        asyncio.run(feedback_db.search_feedback('  ""  '))
+    with pytest.raises(ValueError):
+        asyncio.run(feedback_db.search_feedback("loop", cursor="not-a-cursor"))
+
+def test_search_matches_punctuation_literally(db_path):
+    save("loops", "Classic off-by-one error in the range bounds")
+    save("loops", "Nothing to see here")
+    results = asyncio.run(feedback_db.search_feedback("off-by-one"))
+    assert len(results["items"]) == 1
+
+@pytest.mark.parametrize("feedback, expected", [
+    ({"correctness": "CORRECT", "overall_feedback": "Well done"}, ("CORRECT", "Well done")),
+    # Fallback returned by openai_service when the client is unavailable
+    (
+        {"correct": False, "feedback": "AI evaluation is not available.", "error": "not installed"},
+        ("ERROR", "AI evaluation is not available.")
+    ),
+    ({"correct": True, "feedback": "Looks right"}, ("CORRECT", "Looks right")),
+    ({"correct": False, "feedback": "Wrong output"}, ("INCORRECT", "Wrong output")),
+    ("not a dict", (None, None)),
+])
+def test_summarize(feedback, expected):
+    assert feedback_db._summarize(feedback) == expected
+
+def test_summary_backfill_survives_malformed_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+    CREATE TABLE feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exercise_id TEXT NOT NULL,
+        code TEXT NOT NULL,
+        feedback TEXT NOT NULL,
+        timestamp TEXT NOT NULL
+    )
+    ''')
+    conn.executemany(
+        'INSERT INTO feedback (exercise_id, code, feedback, timestamp) VALUES (?, ?, ?, ?)',
+        [
+            ("loops", "x", "{not json", "2024-01-01T00:00:00"),
+            ("loops", "x", '{"correctness": "CORRECT", "overall_feedback": "Good loop"}', "2024-01-02T00:00:00"),
+        ]
+    )
+    conn.commit()
+    conn.close()
+    
+    asyncio.run(feedback_db.init_db())
+    
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT id, correctness, summary FROM feedback ORDER BY id').fetchall()
+    conn.close()
+    assert rows == [(1, None, None), (2, "CORRECT", "Good loop")]
+    assert [item["id"] for item in asyncio.run(feedback_db.search_feedback("loop"))["items"]] == [2]
+
+def test_compressed_rows_read_back_unchanged(feedback, monkeypatch):
+    before = asyncio.run(feedback_db.get_feedback_page("loops", limit=100))["items"]
+    
+    stats = asyncio.run(feedback_db.compress_existing_feedback(codec="zlib"))
+    assert stats["rows"] == 45
+    assert stats["dict_id"] is not None
+    
+    # New rows are written compressed with the trained dictionary
+    monkeypatch.setenv("FEEDBACK_COMPRESSION", "zlib")
+    added = save("loops", "off by one loop, compressed on save")
+    
+    after = asyncio.run(feedback_db.get_feedback_page("loops", limit=100))["items"]
+    assert after[1:] == before
+    assert after[0]["id"] == added
+    assert after[0]["feedback"]["overall_feedback"] == "off by one loop, compressed on save"
+    assert added in [item["id"] for item in asyncio.run(feedback_db.search_feedback("compressed"))["items"]]
@@ -0,0 +1,49 @@
+"""
+Batch grading of a class's submissions.
+"""
+import pytest
+
+from execution_engine import ExecutionEngine, SubprocessBackend, Submission, TestCase as Case, fingerprint, grade_batch
+
+CASES = [
+    Case(name="small", stdin="2\n", expected_output="4\n"),
+    Case(name="large", stdin="12\n", expected_output="144\n"),
+]
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = ExecutionEngine({SubprocessBackend.name: SubprocessBackend()}, SubprocessBackend.name)
+    yield engine
+    engine.close()
+
+def test_fingerprint_ignores_comments_and_formatting():
+    assert fingerprint("x = int(input())\nprint(x * x)\n") == fingerprint(
+        "# square it\nx=int( input() )\n\nprint(x*x)  # done\n"
+    )
+    assert fingerprint("print(x * x)") != fingerprint("print(x + x)")
+    # Unparseable code is compared as text
+    assert fingerprint("def (:\n") == fingerprint("  def (:  ")
+
+def test_grade_batch_scores_each_student_and_runs_duplicates_once(engine):
+    submissions = [
+        Submission("ada", "x = int(input())\nprint(x * x)\n"),
+        Submission("bob", "x = int(input())\nprint(x + x)\n"),
+        Submission("cy", "# copied\nx=int(input())\nprint(x*x)\n"),
+        Submission("dee", "print(\n"),
+    ]
+    records = list(grade_batch(submissions, CASES, case_timeout=2, workers=2, engine=engine))
+    results = {record["student"]: record for record in records if record["type"] == "result"}
+    summary = records[-1]
+    
+    assert set(results) == {"ada", "bob", "cy", "dee"}
+    assert (results["ada"]["passed"], results["ada"]["score"]) == (2, 1.0)
+    # 2 + 2 == 2 * 2, so only the small case passes
+    assert (results["bob"]["passed"], results["bob"]["score"]) == (1, 0.5)
+    assert results["cy"]["fingerprint"] == results["ada"]["fingerprint"]
+    assert [results["ada"]["duplicate"], results["cy"]["duplicate"]] == [False, True]
+    assert results["dee"]["score"] == 0.0
+    assert "SyntaxError" in results["dee"]["error"]
+    
+    assert summary["type"] == "summary"
+    assert (summary["submissions"], summary["unique"], summary["passed"]) == (4, 3, 2)
+    assert summary["submissions_per_second"] > 0
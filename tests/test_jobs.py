@@ -0,0 +1,103 @@
+"""
+The SQLite job broker and the standalone execution worker.
+"""
+import threading
+import time
+
+import pytest
+
+from execution_engine import ExecutionEngine, ExecutionRequest, SQLiteBroker, SubprocessBackend
+from execution_engine.schema import JOB_CANCELLED, JOB_FAILED, JOB_FINISHED, JOB_QUEUED, JOB_RUNNING
+from execution_engine.worker import Worker
+
+@pytest.fixture
+def broker(tmp_path):
+    return SQLiteBroker(str(tmp_path / "jobs.db"))
+
+def request(code, timeout=5):
+    return ExecutionRequest(code=code, timeout=timeout).to_dict()
+
+def test_jobs_are_claimed_oldest_first_and_once(broker):
+    broker.enqueue("first", request("print(1)"))
+    broker.enqueue("second", request("print(2)"))
+    assert broker.claim("worker-a")[0] == "first"
+    assert broker.claim("worker-b")[0] == "second"
+    assert broker.claim("worker-a") is None
+    assert broker.counts() == {JOB_RUNNING: 2}
+
+def test_cancelling_a_queued_job_is_immediate(broker):
+    broker.enqueue("job", request("print(1)"))
+    assert broker.cancel("job")["status"] == JOB_CANCELLED
+    assert broker.claim("worker") is None
+
+def test_running_job_sees_cancellation_on_heartbeat(broker):
+    broker.enqueue("job", request("print(1)"))
+    broker.claim("worker")
+    assert broker.heartbeat("job", "worker") is False
+    broker.cancel("job")
+    assert broker.heartbeat("job", "worker") is True
+
+def test_stale_jobs_are_requeued_then_failed(broker):
+    broker.enqueue("job", request("print(1)"))
+    broker.claim("dead-worker")
+    time.sleep(0.05)
+    assert broker.requeue_stale(heartbeat_timeout=0.01, max_attempts=2) == 1
+    assert broker.get("job")["status"] == JOB_QUEUED
+    
+    broker.claim("another-dead-worker")
+    time.sleep(0.05)
+    broker.requeue_stale(heartbeat_timeout=0.01, max_attempts=2)
+    assert broker.get("job")["status"] == JOB_FAILED
+
+def test_late_completion_from_a_requeued_worker_is_ignored(broker):
+    broker.enqueue("job", request("print(1)"))
+    broker.claim("slow-worker")
+    time.sleep(0.05)
+    broker.requeue_stale(heartbeat_timeout=0.01, max_attempts=3)
+    broker.claim("new-worker")
+    broker.complete("job", "slow-worker", JOB_FINISHED, result={"status": "success"})
+    assert broker.get("job")["status"] == JOB_RUNNING
+
+def run_worker(broker, job_ids, **options):
+    engine = ExecutionEngine({SubprocessBackend.name: SubprocessBackend()}, SubprocessBackend.name)
+    worker = Worker(broker, engine, concurrency=2, poll_interval=0.05, heartbeat_interval=0.1, **options)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if all(broker.get(job_id)["status"] not in (JOB_QUEUED, JOB_RUNNING) for job_id in job_ids):
+                break
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+        thread.join(timeout=30)
+        engine.close()
+    assert not thread.is_alive()
+
+def test_worker_runs_jobs_and_fails_undecodable_ones(broker):
+    broker.enqueue("bad", {"not": "a request"})
+    broker.enqueue("good", request("print('ran')"))
+    run_worker(broker, ["bad", "good"])
+    
+    bad = broker.get("bad")
+    assert bad["status"] == JOB_FAILED
+    assert "Invalid job request" in bad["error"]
+    good = broker.get("good")
+    assert good["status"] == JOB_FINISHED
+    assert good["result"]["stdout"] == "ran\n"
+
+def test_stopping_worker_keeps_heartbeating_while_jobs_drain(broker):
+    broker.enqueue("slow", request("import time\ntime.sleep(1)\nprint('done')"))
+    engine = ExecutionEngine({SubprocessBackend.name: SubprocessBackend()}, SubprocessBackend.name)
+    worker = Worker(broker, engine, concurrency=1, poll_interval=0.05, heartbeat_interval=0.1, heartbeat_timeout=0.5)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    while broker.get("slow")["status"] == JOB_QUEUED:
+        time.sleep(0.02)
+    worker.stop()
+    thread.join(timeout=30)
+    engine.close()
+    # Another worker's requeue pass must not have taken the job back
+    assert broker.get("slow")["status"] == JOB_FINISHED
+    assert broker.get("slow")["attempts"] == 1
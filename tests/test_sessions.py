@@ -0,0 +1,55 @@
+"""
+Stateful notebook sessions and dependency-driven cell re-runs.
+"""
+import pytest
+
+from execution_engine import SessionManager
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(max_sessions=2, idle_ttl=60)
+    yield manager
+    manager.close_all()
+
+def test_state_persists_between_cells(manager):
+    session = manager.create()
+    assert manager.execute(session.id, "x = 40")["status"] == "success"
+    outcome = manager.execute(session.id, "print(x + 2)")
+    assert outcome["stdout"] == "42\n"
+    assert outcome["execution_count"] == 2
+
+def test_editing_a_cell_reruns_its_dependents(manager):
+    session = manager.create()
+    manager.run_cell(session.id, "a", "base = 1")
+    manager.run_cell(session.id, "b", "double = base * 2\nprint(double)")
+    manager.run_cell(session.id, "c", "print('independent')")
+    
+    outcomes = manager.run_cell(session.id, "a", "base = 5")
+    assert [outcome["cell_id"] for outcome in outcomes] == ["a", "b"]
+    assert outcomes[1]["stdout"] == "10\n"
+
+def test_deleting_a_cell_drops_its_names(manager):
+    session = manager.create()
+    manager.run_cell(session.id, "a", "base = 1")
+    manager.run_cell(session.id, "b", "print(base)")
+    
+    outcomes = manager.delete_cell(session.id, "a")
+    assert [outcome["cell_id"] for outcome in outcomes] == ["b"]
+    assert outcomes[0]["status"] != "success"
+    assert "NameError" in outcomes[0]["error"]
+
+def test_timed_out_cell_leaves_the_session_usable(manager):
+    session = manager.create()
+    manager.execute(session.id, "kept = 'yes'")
+    outcome = manager.execute(session.id, "while True:\n    pass", timeout=0.5)
+    assert outcome["status"] == "timeout"
+    assert outcome["session_alive"] is True
+    assert manager.execute(session.id, "print(kept)")["stdout"] == "yes\n"
+
+def test_least_recently_used_session_is_evicted(manager):
+    first = manager.create()
+    second = manager.create()
+    manager.get(first.id)
+    manager.create()
+    assert manager.get(second.id) is None
+    assert manager.get(first.id) is not None
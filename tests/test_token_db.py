@@ -0,0 +1,48 @@
+"""
+Versioned model pricing and the costs recorded with token usage.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.database import token_db
+
+@pytest.fixture
+def cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr(token_db, "DB_PATH", str(tmp_path / "token_usage.db"))
+    asyncio.run(token_db.init_db())
+    conn = sqlite3.connect(token_db.DB_PATH)
+    yield conn.cursor()
+    conn.close()
+
+def test_longest_model_prefix_wins(cursor):
+    # "gpt-4o-mini" also starts with "gpt-4o" and "gpt-4"
+    assert token_db._find_pricing(cursor, "gpt-4o-mini-2024-07-18", "2025-01-01") == (0.00015, 0.0006)
+    assert token_db._find_pricing(cursor, "gpt-4-0613", "2025-01-01") == (0.03, 0.06)
+
+def test_newest_version_effective_at_the_timestamp(cursor):
+    assert token_db._find_pricing(cursor, "gpt-4o", "2024-06-01") == (0.005, 0.015)
+    assert token_db._find_pricing(cursor, "gpt-4o", "2024-10-01") == (0.0025, 0.01)
+    assert token_db._find_pricing(cursor, "gpt-4o", "2025-06-01T12:00:00") == (0.0025, 0.01)
+
+def test_usage_before_the_first_version_uses_the_oldest(cursor):
+    assert token_db._find_pricing(cursor, "gpt-4o", "2023-01-01") == (0.005, 0.015)
+
+def test_unknown_model_is_not_priced(cursor):
+    assert token_db._find_pricing(cursor, "claude-unknown", "2025-01-01") is None
+
+def test_new_pricing_versions_apply_from_their_date(cursor):
+    asyncio.run(token_db.add_pricing("gpt-4o", 0.002, 0.008, "2025-03-01"))
+    assert token_db._find_pricing(cursor, "gpt-4o", "2025-02-28") == (0.0025, 0.01)
+    assert token_db._find_pricing(cursor, "gpt-4o", "2025-03-01") == (0.002, 0.008)
+
+def test_recorded_usage_carries_its_cost(cursor):
+    asyncio.run(token_db.save_token_usage_batch([
+        {"prompt_tokens": 2000, "completion_tokens": 1000, "total_tokens": 3000, "model": "gpt-4o-mini"},
+        {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20, "model": "unpriced-model"},
+    ]))
+    totals = asyncio.run(token_db.get_model_totals())
+    assert totals["gpt-4o-mini"]["cost_usd"] == pytest.approx(2 * 0.00015 + 1 * 0.0006)
+    assert totals["gpt-4o-mini"]["requests"] == 1
+    assert totals["unpriced-model"]["cost_usd"] == 0